@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+异步dr.com客户端模块
+AsyncDrcomClient 与 DrcomClient 的登录、注销、状态查询语义相同，但全部基于asyncio的非阻塞套接字，
+探测、登录竞速和多个账号都可以在同一个事件循环中并发进行，不需要为每个操作占用一个线程：
+
+    async def main():
+        clients = [AsyncDrcomClient(config) for config in configs]
+        results = await asyncio.gather(*(client.login() for client in clients))
+
+BlockingDrcomClient 是它的同步包装，所有实例共用一个后台事件循环线程，
+可以代替 DrcomClient 交给 ConnectionSupervisor 或 MultiAccountSupervisor 使用（守护进程的 --async 参数）
+"""
+
+import asyncio
+import logging
+import threading
+
+from drcom import BaseDrcomClient
+from probe import ProbeEngine, HttpProbe, parse_probe, probes_from_config
+from async_http import AsyncHttpClient
+from portal_parser import parse_html, declared_encodings
+
+logger = logging.getLogger('AsyncDrcomClient')
+
+
+class AsyncDrcomClient(BaseDrcomClient):
+    """登录、注销和状态查询的控制流程都在 BaseDrcomClient 中，这里只负责在事件循环中执行网络操作"""
+    def __init__(self, config):
+        super().__init__(config)
+        # 认证服务器和外网探测分别使用独立的连接池
+        self.http = AsyncHttpClient(self.binding, pool_maxsize=4)
+        targets = probes_from_config(config)
+        self.probe_http = AsyncHttpClient(self.binding, pool_maxsize=max(4, len(targets or ())))
+        self.probe_engine = ProbeEngine(targets, rtt_tracker=self.rtt)
+        # 在第一次使用时创建，绑定到当时运行的事件循环
+        self._status_lock = None
+
+    async def warm_up(self, timeout=3):
+        """预先建立到认证服务器和HTTP探测目标的连接，返回成功建立的连接数"""
+        tasks = [self.http.prewarm(self.status_url, timeout)]
+        for target in self.probe_engine.targets:
+            try:
+                probe = parse_probe(target, self.probe_engine.timeout)
+            except ValueError:
+                continue
+            if isinstance(probe, HttpProbe):
+                tasks.append(self.probe_http.prewarm(probe.target, timeout))
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.fast_login.connect)
+        except OSError as e:
+            logger.debug(f"快速登录预先建立连接失败: {str(e)}")
+        return sum(1 for result in results if not isinstance(result, BaseException))
+
+    def pool_stats(self):
+        return {
+            'portal': self.http.pool_stats.to_dict(),
+            'probe': self.probe_http.pool_stats.to_dict(),
+        }
+
+    async def _drive(self, flow):
+        """在事件循环中执行控制流程，返回流程的结果"""
+        done, value = self._advance(flow)
+        while not done:
+            try:
+                result = await getattr(self, f'_do_{value[0]}')(*value[1:])
+            except Exception as e:
+                done, value = self._advance(flow, error=e)
+            else:
+                done, value = self._advance(flow, result)
+        return value
+
+    async def _do_http(self, method, url, timeouts, kwargs):
+        return await self.http.request(method, url, timeouts=timeouts, **kwargs)
+
+    async def _do_title(self, timeouts, deadline):
+        # 截止时间已包含在 timeouts 中，由 AsyncHttpClient 执行
+        response = await self.http.request('GET', self.status_url, timeouts=timeouts,
+                                           headers={'User-Agent': self._user_agent()},
+                                           stop=b'</title>', limit=self.status_read_limit)
+        if response.status_code != 200:
+            return response.status_code, None
+        return response.status_code, parse_html(response.content, declared_encodings(response))
+
+    async def _do_status(self, max_age):
+        return await self.get_portal_status(max_age)
+
+    async def _do_probe(self):
+        return await self.probe_engine.run_async(self.probe_http)
+
+    async def _do_strategies(self):
+        return await self.login_engine.run_async(self)
+
+    async def _do_fast_login(self, timeout):
+        # 快速登录只是在保持的连接上写一次请求、读几百字节，耗时受 timeout 限制，放到线程池中执行
+        return await asyncio.get_running_loop().run_in_executor(None, self.fast_login.send, timeout)
+
+    async def get_portal_status(self, max_age=None):
+        """获取认证页面状态，在有效期内直接返回缓存；并发的查询只发出一次请求"""
+        if self._status_lock is None:
+            self._status_lock = asyncio.Lock()
+        async with self._status_lock:
+            status = self._cached_status(max_age)
+            if status is None:
+                status = self._store_status(await self._drive(self._portal_status_flow()))
+            return status
+
+    def invalidate_status(self):
+        """使认证页面状态缓存失效，需要在客户端所在的事件循环中调用"""
+        self._status_cache = None
+
+    async def login_via_post(self):
+        """使用POST表单方式登录"""
+        return await self._drive(self._login_via_post_flow())
+
+    async def login_via_get(self):
+        """使用JSONP GET方式登录"""
+        return await self._drive(self._login_via_get_flow())
+
+    async def login(self):
+        """登录校园网"""
+        return await self._drive(self._login_flow())
+
+    async def logout(self):
+        """注销登录"""
+        return await self._drive(self._logout_flow())
+
+    async def is_connected(self, max_age=None):
+        """检查是否已连接，max_age 的含义与 DrcomClient.is_connected 相同"""
+        return await self._drive(self._is_connected_flow(max_age))
+
+    async def check_network(self):
+        """检查网络状态"""
+        return await self._drive(self._check_network_flow())
+
+    def close(self):
+        """关闭空闲连接，需要在客户端所在的事件循环中调用"""
+        self.http.close()
+        self.probe_http.close()
+        self.fast_login.close()
+
+
+class EventLoopThread:
+    """在后台线程中运行的事件循环，同步代码通过 run() 提交协程并等待结果"""
+    def __init__(self, name='drcom-loop'):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name=name)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coroutine, timeout=None):
+        """在事件循环中执行协程，阻塞直到完成并返回结果"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    def call(self, function, *args):
+        """在事件循环线程中执行普通函数并返回结果"""
+        async def wrapper():
+            return function(*args)
+        return self.run(wrapper())
+
+    def stop(self, timeout=1):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
+
+
+_shared_loop = None
+_shared_loop_lock = threading.Lock()
+
+
+def shared_loop():
+    """所有同步包装共用的后台事件循环"""
+    global _shared_loop
+    with _shared_loop_lock:
+        if _shared_loop is None:
+            _shared_loop = EventLoopThread()
+        return _shared_loop
+
+
+class BlockingDrcomClient:
+    """AsyncDrcomClient 的同步包装，方法与 DrcomClient 相同"""
+    def __init__(self, config, loop_thread=None):
+        self.config = config
+        self.loop_thread = loop_thread or shared_loop()
+        self.client = AsyncDrcomClient(config)
+
+    @property
+    def binding(self):
+        return self.client.binding
+
+    @property
+    def last_probe(self):
+        return self.client.last_probe
+
+    @property
+    def breaker(self):
+        return self.client.breaker
+
+    def warm_up(self, timeout=3):
+        return self.loop_thread.run(self.client.warm_up(timeout))
+
+    def get_portal_status(self, max_age=None):
+        return self.loop_thread.run(self.client.get_portal_status(max_age))
+
+    def invalidate_status(self):
+        self.loop_thread.call(self.client.invalidate_status)
+
+    def login(self):
+        return self.loop_thread.run(self.client.login())
+
+    def logout(self):
+        return self.loop_thread.run(self.client.logout())
+
+    def is_connected(self, max_age=None):
+        return self.loop_thread.run(self.client.is_connected(max_age))
+
+    def check_network(self):
+        return self.loop_thread.run(self.client.check_network())
+
+    def rtt_stats(self):
+        return self.loop_thread.call(self.client.rtt_stats)
+
+    def pool_stats(self):
+        return self.loop_thread.call(self.client.pool_stats)
+
+    def close(self):
+        self.loop_thread.call(self.client.close)
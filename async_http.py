@@ -0,0 +1,360 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+异步HTTP模块
+基于asyncio的非阻塞套接字实现的最小HTTP/1.1客户端，供异步客户端访问认证服务器和探测外网：
+    - 按主机保持长连接，请求结束后连接放回连接池，统计方式与 http_pool 相同
+    - 支持出口绑定（SourceBinding）、Content-Length/chunked 正文和gzip/deflate解压
+    - 可以只读取正文开头（例如读到</title>为止），剩余内容很少时读完以便复用连接
+    - 错误以requests的异常类型抛出，调用方的异常处理与同步客户端相同
+
+连接属于创建它的事件循环，同一个客户端对象只应在一个事件循环中使用
+"""
+
+import ssl
+import time
+import zlib
+import socket
+import asyncio
+import logging
+import requests
+from urllib.parse import urlencode, urlsplit
+
+from http_pool import KEEPALIVE_OPTIONS, PoolStats
+
+logger = logging.getLogger('AsyncHttp')
+
+# 响应头的最大长度
+MAX_HEADER_SIZE = 64 * 1024
+# 没有限制读取长度时，正文的最大长度
+MAX_BODY_SIZE = 4 * 1024 * 1024
+# 剩余正文不超过该字节数时读完，以便连接放回连接池复用
+DRAIN_LIMIT = 4 * 1024
+# 复用的连接失效时可以换新连接重发的请求方法，POST等请求可能已被服务器处理，不能重发
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'TRACE'])
+
+
+class AsyncResponse:
+    """一次HTTP响应，headers 的键为小写"""
+    def __init__(self, url, status_code, reason, headers, content, complete=True):
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+        # 正文是否完整读取（只读取开头时为False）
+        self.complete = complete
+
+    @property
+    def encoding(self):
+        """响应头声明的编码，没有声明时为None"""
+        for part in self.headers.get('content-type', '').split(';')[1:]:
+            name, _, value = part.partition('=')
+            if name.strip().lower() == 'charset' and value.strip():
+                return value.strip().strip('"\'')
+        return None
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', 'replace')
+
+    def __repr__(self):
+        return f"<AsyncResponse [{self.status_code}]>"
+
+
+async def open_connection(host, port, binding=None, ssl_context=None, server_hostname=None):
+    """建立TCP连接，绑定了源地址或网卡时从指定的线路发出"""
+    if not binding:
+        reader, writer = await asyncio.open_connection(host, port, ssl=ssl_context, server_hostname=server_hostname,
+                                                       limit=MAX_HEADER_SIZE)
+    else:
+        loop = asyncio.get_running_loop()
+        error = None
+        for family, type_, proto, _, address in await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM):
+            sock = socket.socket(family, type_, proto)
+            sock.setblocking(False)
+            try:
+                binding.apply(sock)
+                await loop.sock_connect(sock, address)
+                break
+            except OSError as e:
+                sock.close()
+                error = e
+            except BaseException:
+                sock.close()
+                raise
+        else:
+            raise error or OSError(f"无法解析地址: {host}")
+        reader, writer = await asyncio.open_connection(sock=sock, ssl=ssl_context, server_hostname=server_hostname,
+                                                       limit=MAX_HEADER_SIZE)
+    sock = writer.get_extra_info('socket')
+    if sock is not None:
+        for option in KEEPALIVE_OPTIONS:
+            try:
+                sock.setsockopt(*option)
+            except OSError:
+                pass
+    return reader, writer
+
+
+def _close(writer):
+    try:
+        writer.close()
+    except Exception:
+        pass
+
+
+def _decode_content(content, encoding):
+    """按 Content-Encoding 解压正文，数据损坏时与requests一样抛出 ContentDecodingError"""
+    encoding = encoding.strip().lower()
+    if encoding in ('', 'identity'):
+        return content
+    try:
+        if encoding in ('gzip', 'x-gzip'):
+            return zlib.decompress(content, 16 + zlib.MAX_WBITS)
+        if encoding == 'deflate':
+            try:
+                return zlib.decompress(content)
+            except zlib.error:
+                # 部分服务器发送不带zlib头的原始deflate数据
+                return zlib.decompress(content, -zlib.MAX_WBITS)
+    except zlib.error as e:
+        raise requests.exceptions.ContentDecodingError(f"无法解压 {encoding} 正文: {str(e)}")
+    raise requests.exceptions.ContentDecodingError(f"不支持的Content-Encoding: {encoding}")
+
+
+class AsyncHttpClient:
+    """异步HTTP客户端，binding 为出口绑定（SourceBinding）"""
+    def __init__(self, binding=None, pool_maxsize=4, headers=None):
+        self.binding = binding
+        # 每个主机最多保留的空闲连接数
+        self.pool_maxsize = pool_maxsize
+        self.headers = dict(headers or {})
+        # 统计信息，与 http_pool 的连接池统计格式相同
+        self.pool_stats = PoolStats()
+        # (scheme, 主机, 端口) -> [(reader, writer)]
+        self._idle = {}
+        self._ssl_context = None
+
+    def _ssl(self):
+        if self._ssl_context is None:
+            self._ssl_context = ssl.create_default_context()
+        return self._ssl_context
+
+    def _take(self, key):
+        """取出一个仍然可用的空闲连接"""
+        connections = self._idle.get(key)
+        while connections:
+            reader, writer = connections.pop()
+            # 服务器已关闭的连接不能复用
+            if reader.at_eof() or writer.is_closing():
+                _close(writer)
+                continue
+            return reader, writer
+        return None
+
+    def _put(self, key, connection):
+        connections = self._idle.setdefault(key, [])
+        if len(connections) < self.pool_maxsize:
+            connections.append(connection)
+        else:
+            _close(connection[1])
+
+    async def _connect(self, key, timeout):
+        scheme, host, port = key
+        start = time.monotonic()
+        try:
+            ssl_context = self._ssl() if scheme == 'https' else None
+            return await asyncio.wait_for(
+                open_connection(host, port, self.binding, ssl_context, host if ssl_context else None), timeout)
+        except asyncio.TimeoutError:
+            raise requests.exceptions.ConnectTimeout(f"连接 {host}:{port} 超时")
+        except OSError as e:
+            raise requests.exceptions.ConnectionError(f"无法连接 {host}:{port}: {str(e)}")
+        finally:
+            self.pool_stats.record_connect(time.monotonic() - start)
+
+    async def prewarm(self, url, timeout=3):
+        """预先建立到url所在主机的连接并放回连接池"""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+        if self._idle.get(key):
+            return
+        self._put(key, await self._connect(key, timeout))
+
+    def _build(self, method, parts, headers, body):
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+        headers = dict(self.headers, **headers)
+        lines = [f'{method} {target} HTTP/1.1', f'Host: {parts.netloc}']
+        headers.setdefault('Accept-Encoding', 'gzip, deflate')
+        headers.setdefault('Accept', '*/*')
+        headers['Connection'] = 'keep-alive'
+        if body or method in ('POST', 'PUT'):
+            headers['Content-Length'] = str(len(body))
+        lines += [f'{name}: {value}' for name, value in headers.items()]
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+    @staticmethod
+    async def _read_head(reader):
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.LimitOverrunError:
+            raise requests.exceptions.ConnectionError("响应头过长")
+        lines = head.decode('latin-1').split('\r\n')
+        version, _, rest = lines[0].partition(' ')
+        code, _, reason = rest.partition(' ')
+        if not version.startswith('HTTP/') or not code.isdigit():
+            raise requests.exceptions.ConnectionError(f"无效的响应: {lines[0][:64]!r}")
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, _, value = line.partition(':')
+                name = name.strip().lower()
+                headers[name] = f'{headers[name]}, {value.strip()}' if name in headers else value.strip()
+        return version, int(code), reason, headers
+
+    @staticmethod
+    async def _read_body(reader, headers, stop, limit):
+        """读取正文，返回 (正文, 是否完整读完)
+
+        stop 为提前结束的标记（不区分大小写），limit 为最多读取的字节数；
+        提前结束时剩余内容不超过 DRAIN_LIMIT 则读完，以便复用连接
+        """
+        body = bytearray()
+        limit = limit or MAX_BODY_SIZE
+        # 需要查找结束标记时每次少读一些，找到后不再继续读取
+        read_size = 4096 if stop is not None else 65536
+
+        def enough(search_from):
+            return len(body) >= limit or (stop is not None and stop in body[search_from:].lower())
+
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            while True:
+                line = await reader.readline()
+                try:
+                    size = int(line.split(b';')[0].strip(), 16)
+                except ValueError:
+                    raise requests.exceptions.ChunkedEncodingError(f"无效的chunk长度: {line[:32]!r}")
+                if size == 0:
+                    # 跳过trailer
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    return bytes(body), True
+                search_from = max(0, len(body) - len(stop or b''))
+                body += await reader.readexactly(size)
+                await reader.readexactly(2)
+                if enough(search_from):
+                    # chunked正文的剩余长度未知，提前结束时关闭连接
+                    return bytes(body), False
+
+        length = headers.get('content-length')
+        if length is None or not length.strip().isdigit():
+            # 没有长度的正文读到连接关闭为止，连接不能复用
+            while len(body) < limit:
+                chunk = await reader.read(min(read_size, limit - len(body)))
+                if not chunk:
+                    return bytes(body), True
+                body += chunk
+            return bytes(body), False
+
+        length = int(length)
+        while len(body) < length:
+            chunk = await reader.read(min(read_size, length - len(body)))
+            if not chunk:
+                raise requests.exceptions.ConnectionError(f"连接提前关闭，已读取 {len(body)}/{length} 字节")
+            search_from = max(0, len(body) - len(stop or b''))
+            body += chunk
+            if len(body) < length and enough(search_from):
+                if length - len(body) > DRAIN_LIMIT:
+                    return bytes(body), False
+                # 剩余内容很少，读完后连接可以复用
+                body += await reader.readexactly(length - len(body))
+        return bytes(body), True
+
+    async def _exchange(self, connection, method, url, request, stop, limit):
+        reader, writer = connection
+        writer.write(request)
+        await writer.drain()
+        version, status_code, reason, headers = await self._read_head(reader)
+        if method == 'HEAD' or status_code in (204, 304) or 100 <= status_code < 200:
+            content, complete = b'', True
+        else:
+            content, complete = await self._read_body(reader, headers, stop, limit)
+        if complete:
+            content = _decode_content(content, headers.get('content-encoding', ''))
+        connection_header = headers.get('connection', '').lower()
+        if version == 'HTTP/1.0':
+            reusable = complete and connection_header == 'keep-alive'
+        else:
+            reusable = complete and connection_header != 'close'
+        if 'content-length' not in headers and 'chunked' not in headers.get('transfer-encoding', '').lower() \
+                and content and method != 'HEAD':
+            # 读到连接关闭为止的正文
+            reusable = False
+        return AsyncResponse(url, status_code, reason, headers, content, complete), reusable
+
+    async def request(self, method, url, params=None, data=None, headers=None, timeouts=None, timeout=10,
+                      stop=None, limit=None):
+        """发送请求并读取响应（不跟随重定向）
+
+        timeouts 为 rtt.Timeouts，按其中的连接超时和整个请求的截止时间执行；
+        没有提供时连接和整个请求都使用 timeout 秒。
+        stop / limit 用于只读取正文的开头，见 _read_body
+        """
+        if params:
+            url = f"{url}{'&' if '?' in url else '?'}{urlencode(params)}"
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise requests.exceptions.InvalidSchema(f"不支持的地址: {url}")
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+        headers = dict(headers or {})
+        if stop is not None:
+            # 需要在原始字节中查找结束标记，不接受压缩
+            headers['Accept-Encoding'] = 'identity'
+        body = b''
+        if data is not None:
+            body = data if isinstance(data, bytes) else urlencode(data).encode('utf-8')
+            headers.setdefault('Content-Type', 'application/x-www-form-urlencoded')
+        request = self._build(method, parts, headers, body)
+        connect_timeout = timeouts.connect if timeouts else timeout
+        deadline = time.monotonic() + (timeouts.total if timeouts else timeout)
+        stop = stop.lower() if stop else None
+        self.pool_stats.record_request()
+
+        # 复用的连接可能已被服务器关闭，没有收到任何响应时换新连接再试一次（只限幂等的请求）
+        replayable = method.upper() in IDEMPOTENT_METHODS
+        for attempt in range(2):
+            connection = self._take(key)
+            reused = connection is not None
+            if connection is None:
+                connection = await self._connect(key, max(0.001, min(connect_timeout, deadline - time.monotonic())))
+            try:
+                response, reusable = await asyncio.wait_for(
+                    self._exchange(connection, method, url, request, stop, limit),
+                    max(0.001, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                _close(connection[1])
+                raise requests.exceptions.ReadTimeout(f"请求超过截止时间: {url}")
+            except (asyncio.IncompleteReadError, ConnectionError) as e:
+                _close(connection[1])
+                if replayable and reused and attempt == 0 and not getattr(e, 'partial', b''):
+                    continue
+                raise requests.exceptions.ConnectionError(f"连接中断: {str(e) or type(e).__name__}")
+            except BaseException:
+                _close(connection[1])
+                raise
+            if reusable:
+                self._put(key, connection)
+            else:
+                _close(connection[1])
+            return response
+
+    def close(self):
+        """关闭所有空闲连接"""
+        for connections in self._idle.values():
+            for _, writer in connections:
+                _close(writer)
+        self._idle.clear()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+断线恢复耗时基准测试
+在本地模拟认证服务器上按计划踢下线，驱动ConnectionSupervisor自动重连，
+统计每次踢下线后的检测耗时、重新登录耗时和总断网时长
+
+用法:
+    python benchmarks/recovery_bench.py --cycles 20 --kick-interval 3 --scale 0.1 --output result.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import Config
+from drcom import DrcomClient
+from fake_portal import FakePortal
+from kick_learner import KickLearner
+from scheduler import AdaptiveScheduler, FixedScheduler, summarize
+from supervisor import ConnectionSupervisor
+
+
+class RecordingMixin:
+    """记录检测到断线和重新登录成功的时间点"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.detected_at = []
+        self.recovered_at = []
+
+    def record_disconnect(self):
+        self.detected_at.append(time.time())
+        super().record_disconnect()
+
+    def record_login(self):
+        self.recovered_at.append(time.time())
+        super().record_login()
+
+
+class RecordingFixedScheduler(RecordingMixin, FixedScheduler):
+    pass
+
+
+class RecordingAdaptiveScheduler(RecordingMixin, AdaptiveScheduler):
+    pass
+
+
+def make_scheduler(kind, scale, fixed_interval):
+    """按名称创建调度器，scale用于等比例缩短所有时间参数"""
+    if kind == 'fixed':
+        return RecordingFixedScheduler(fixed_interval * scale)
+    return RecordingAdaptiveScheduler(fast_interval=5 * scale, min_interval=10 * scale, max_interval=60 * scale,
+                                      failure_base=5 * scale, failure_cap=300 * scale)
+
+
+def pair_cycles(kicks, detections, recoveries):
+    """把每次踢下线与其后的第一次检测和第一次恢复配对"""
+    samples = []
+    for kick in kicks:
+        detect = next((t for t in detections if t >= kick), None)
+        if detect is None:
+            continue
+        recover = next((t for t in recoveries if t >= detect), None)
+        if recover is None:
+            continue
+        samples.append({'kick': kick, 'detect': detect - kick,
+                        'relogin': recover - detect, 'downtime': recover - kick})
+    return samples
+
+
+def run(args):
+    portal = FakePortal(latency=args.latency, jitter=args.jitter, kick_interval=args.kick_interval)
+    portal.start()
+    try:
+        config = Config()
+        config.server = portal.server
+        config.username = 'bench'
+        config.password = 'bench'
+        config.device_type = args.device_type
+
+        client = DrcomClient(config)
+        client.probe_engine.targets = [portal.probe_url]
+        scheduler = make_scheduler(args.scheduler, args.scale, args.fixed_interval)
+        # 掉线记录只保存在内存中，不影响本机的历史记录
+        supervisor = ConnectionSupervisor(client, scheduler=scheduler, kick_learner=KickLearner())
+
+        started = time.time()
+        supervisor.start_login_thread()
+        deadline = started + args.timeout
+        while time.time() < deadline:
+            kicks = [t for t, name, _ in portal.events if name == 'kick']
+            samples = pair_cycles(kicks, scheduler.detected_at, scheduler.recovered_at)
+            if len(samples) >= args.cycles:
+                break
+            time.sleep(0.2)
+        supervisor.stop()
+
+        kicks = [t for t, name, _ in portal.events if name == 'kick']
+        samples = pair_cycles(kicks, scheduler.detected_at, scheduler.recovered_at)[:args.cycles]
+        return {
+            'scheduler': args.scheduler,
+            'scale': args.scale,
+            'kick_interval': args.kick_interval,
+            'latency': args.latency,
+            'device_type': args.device_type,
+            'cycles': len(samples),
+            'elapsed': time.time() - started,
+            'detect': summarize([s['detect'] for s in samples]),
+            'relogin': summarize([s['relogin'] for s in samples]),
+            'downtime': summarize([s['downtime'] for s in samples]),
+            'portal_requests': dict(portal.counters),
+            'samples': samples,
+        }
+    finally:
+        portal.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='断线恢复耗时基准测试')
+    parser.add_argument('--cycles', type=int, default=20, help='统计的踢下线次数')
+    parser.add_argument('--kick-interval', type=float, default=3.0, help='模拟服务器踢下线的间隔（秒）')
+    parser.add_argument('--scheduler', choices=['adaptive', 'fixed'], default='adaptive')
+    parser.add_argument('--fixed-interval', type=float, default=30.0, help='fixed调度器的检查间隔（缩放前）')
+    parser.add_argument('--scale', type=float, default=0.1, help='调度器时间参数的缩放比例')
+    parser.add_argument('--latency', type=float, default=0.0, help='模拟服务器的请求延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='模拟服务器的延迟抖动（秒）')
+    parser.add_argument('--device-type', choices=['PC', 'Mobile'], default='PC')
+    parser.add_argument('--timeout', type=float, default=600.0, help='整体运行时间上限（秒）')
+    parser.add_argument('--output', help='结果JSON的输出文件，默认输出到标准输出')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, force=True)
+    result = run(args)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
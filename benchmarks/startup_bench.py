@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+启动耗时基准测试
+统计各模块的导入耗时（等同于 python -X importtime）以及GUI首个窗口显示的耗时
+
+用法:
+    python benchmarks/startup_bench.py [--runs 5] [--json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 需要统计导入耗时的模块
+MODULES = [
+    'tkinter', 'requests', 'PIL.Image', 'PIL.ImageTk', 'PIL.ImageFilter', 'pystray',
+    'config', 'drcom', 'gui', 'main', 'drcomd',
+]
+
+# 在子进程中创建主窗口，窗口映射到屏幕后立即退出
+FIRST_WINDOW_SNIPPET = r'''
+import sys
+sys.path.insert(0, {root!r})
+import main
+app = main.DrcomApp()
+def on_map(event):
+    if event.widget is app.root:
+        print('MAPPED', flush=True)
+        app.root.after(0, app.root.destroy)
+app.root.bind('<Map>', on_map)
+app.gui.show()
+app.root.mainloop()
+'''
+
+
+def measure_import(module):
+    """在新的解释器中导入模块，返回 -X importtime 报告的累计耗时（微秒）"""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        return None
+    cumulative = None
+    for line in proc.stderr.splitlines():
+        # 格式: import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) == 3 and parts[2].strip() == module:
+            cumulative = int(parts[1])
+    return cumulative
+
+
+def measure_first_window():
+    """返回从启动解释器到主窗口映射的耗时（秒），无法显示窗口时返回None"""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, '-c', FIRST_WINDOW_SNIPPET.format(root=ROOT)],
+        cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    try:
+        for line in proc.stdout:
+            if line.strip() == 'MAPPED':
+                return time.perf_counter() - start
+        return None
+    finally:
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def run(runs):
+    """执行基准测试，返回结果字典"""
+    imports = {}
+    for module in MODULES:
+        samples = [measure_import(module) for _ in range(runs)]
+        samples = [s for s in samples if s is not None]
+        imports[module] = {
+            'median_us': statistics.median(samples) if samples else None,
+            'min_us': min(samples) if samples else None,
+        }
+
+    windows = [measure_first_window() for _ in range(runs)]
+    windows = [w for w in windows if w is not None]
+    first_window = {
+        'median_s': statistics.median(windows) if windows else None,
+        'min_s': min(windows) if windows else None,
+        'runs': len(windows),
+    }
+    return {'python': sys.version.split()[0], 'runs': runs,
+            'imports': imports, 'first_window': first_window}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='校园网登录器启动耗时基准测试')
+    parser.add_argument('--runs', type=int, default=5, help='每项测量的重复次数')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出')
+    args = parser.parse_args(argv)
+
+    result = run(args.runs)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 0
+
+    print(f"{'模块':<20}{'中位数(ms)':>12}{'最小(ms)':>12}")
+    for module, item in result['imports'].items():
+        if item['median_us'] is None:
+            print(f"{module:<20}{'导入失败':>12}")
+        else:
+            print(f"{module:<20}{item['median_us'] / 1000:>12.1f}{item['min_us'] / 1000:>12.1f}")
+    window = result['first_window']
+    if window['median_s'] is None:
+        print("首个窗口: 无法显示窗口（缺少图形环境或依赖）")
+    else:
+        print(f"首个窗口: 中位数 {window['median_s'] * 1000:.0f}ms，最小 {window['min_s'] * 1000:.0f}ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
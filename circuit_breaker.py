@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+认证服务器熔断模块
+认证服务器宕机或过载时，连续失败达到阈值后熔断（open），一段时间内不再发出任何请求；
+熔断时长按次数指数增长并加入随机抖动，避免大量客户端在服务器恢复的瞬间同时涌入。
+熔断时间到后进入试探状态（half-open），只放行一个轻量的状态查询，成功后才恢复登录等请求
+"""
+
+import time
+import random
+import logging
+import threading
+import requests
+
+logger = logging.getLogger('CircuitBreaker')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """熔断期间拒绝发出的请求，作为连接错误处理"""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=3, base_delay=5, max_delay=300, trial_timeout=60):
+        # 连续失败多少次后熔断
+        self.failure_threshold = failure_threshold
+        # 第一次熔断的时长（秒），之后每次加倍，不超过 max_delay
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # 试探请求超过该时长没有结果时，允许发出新的试探请求
+        self.trial_timeout = trial_timeout
+
+        self.state = CLOSED
+        self.failures = 0
+        # 连续熔断的次数，决定下一次熔断的时长
+        self.opens = 0
+        self.retry_at = None
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._trial_started = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        """在持有锁时调用：进入熔断状态"""
+        delay = min(self.max_delay, self.base_delay * 2 ** self.opens)
+        # 一半固定、一半随机，既保证最短等待又把各客户端的恢复时刻错开
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        self.opens += 1
+        self.state = OPEN
+        self.retry_at = time.monotonic() + delay
+        self._trial_in_flight = False
+        logger.warning(f"认证服务器连续失败，熔断 {delay:.1f}s")
+
+    def allow(self, trial=False):
+        """是否允许发出请求
+
+        trial=True 表示轻量的状态查询，可以作为试探请求；登录、注销等只在闭合状态下放行
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() >= self.retry_at:
+                self.state = HALF_OPEN
+                logger.info("熔断时间已到，等待试探请求")
+            if self.state == HALF_OPEN and trial:
+                now = time.monotonic()
+                if not self._trial_in_flight or now - self._trial_started >= self.trial_timeout:
+                    self._trial_in_flight = True
+                    self._trial_started = now
+                    return True
+            self.rejected += 1
+            return False
+
+    def check(self, trial=False):
+        """不允许发出请求时抛出 CircuitOpenError"""
+        if not self.allow(trial):
+            raise CircuitOpenError(f"认证服务器暂时不可用，{self.retry_in():.0f}s 后重试")
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info("认证服务器已恢复，解除熔断")
+            self.state = CLOSED
+            self.failures = 0
+            self.opens = 0
+            self.retry_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                # 试探失败，重新熔断且时长加倍
+                self._open()
+            elif self.state == CLOSED:
+                self.failures += 1
+                if self.failures >= self.failure_threshold:
+                    self._open()
+
+    def retry_in(self):
+        """距离可以试探还有多少秒，闭合状态下为0"""
+        retry_at = self.retry_at
+        return max(0.0, retry_at - time.monotonic()) if retry_at is not None else 0.0
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'opens': self.opens,
+            'retry_in': self.retry_in(),
+            'rejected': self.rejected,
+        }
@@ -28,6 +28,22 @@ class Config:
         self.auto_login = False
         self.auto_start = False
         self.device_type = "PC"  # 新增：设备类型，默认为PC
+        # 外网探测目标，每项为 {'type': http/head/tcp/dns, 'target': 目标, 'timeout': 超时秒数}
+        # 为空时使用默认目标
+        self.probes = []
+        # 是否启用dr.com UDP心跳
+        self.heartbeat = False
+        # 是否启用被动链路监测（仅Linux），以及监测的网卡（为空表示全部）
+        self.passive_monitor = False
+        self.monitor_interface = ""
+        # 是否监听网卡和地址变化事件（仅Linux），链路恢复时立即重新登录
+        self.link_events = True
+        # 出口绑定：请求从指定的源地址或网卡（仅Linux）发出，为空表示由系统路由决定
+        self.bind_address = ""
+        self.bind_interface = ""
+        # 本地状态接口：监听127.0.0.1上的端口（0表示不启用）和/或Unix套接字路径（为空表示不启用）
+        self.status_port = 0
+        self.status_socket = ""
         
         # 配置文件路径
         # 配置文件路径
@@ -49,6 +65,22 @@ class Config:
             ET.SubElement(root, "auto_login").text = str(self.auto_login)
             ET.SubElement(root, "auto_start").text = str(self.auto_start)
             ET.SubElement(root, "device_type").text = self.device_type
+            ET.SubElement(root, "heartbeat").text = str(self.heartbeat)
+            ET.SubElement(root, "passive_monitor").text = str(self.passive_monitor)
+            ET.SubElement(root, "monitor_interface").text = self.monitor_interface
+            ET.SubElement(root, "link_events").text = str(self.link_events)
+            ET.SubElement(root, "bind_address").text = self.bind_address
+            ET.SubElement(root, "bind_interface").text = self.bind_interface
+            ET.SubElement(root, "status_port").text = str(self.status_port)
+            ET.SubElement(root, "status_socket").text = self.status_socket
+            if self.probes:
+                probes_element = ET.SubElement(root, "probes")
+                for probe in self.probes:
+                    element = ET.SubElement(probes_element, "probe", type=probe.get('type', 'http'),
+                                            timeout=str(probe.get('timeout', 3)))
+                    element.text = probe['target']
+                    if probe.get('expect'):
+                        element.set("expect", ",".join(str(code) for code in probe['expect']))
             
             # 创建XML树并写入文件
             tree = ET.ElementTree(root)
@@ -73,15 +105,7 @@ class Config:
             
             # 读取配置文件
             tree = ET.parse(self.config_file)
-            root = tree.getroot()
-            
-            # 更新配置
-            self.username = root.findtext("username", "")
-            self.password = root.findtext("password", "")
-            self.server = root.findtext("server", "10.10.42.3")
-            self.auto_login = root.findtext("auto_login", "False").lower() == 'true'
-            self.auto_start = root.findtext("auto_start", "False").lower() == 'true'
-            self.device_type = root.findtext("device_type", "PC")
+            self.load_element(tree.getroot())
             
             logger.info("配置已加载")
             return True
@@ -89,6 +113,39 @@ class Config:
             logger.error(f"加载配置失败: {str(e)}")
             return False
     
+    def load_element(self, root):
+        """从XML元素读取配置项：单账号配置文件的根元素，或多账号配置文件中的一个Config元素"""
+        self.username = root.findtext("username", "")
+        self.password = root.findtext("password", "")
+        self.server = root.findtext("server", "10.10.42.3")
+        self.auto_login = root.findtext("auto_login", "False").lower() == 'true'
+        self.auto_start = root.findtext("auto_start", "False").lower() == 'true'
+        self.device_type = root.findtext("device_type", "PC")
+        self.heartbeat = root.findtext("heartbeat", "False").lower() == 'true'
+        self.passive_monitor = root.findtext("passive_monitor", "False").lower() == 'true'
+        self.monitor_interface = root.findtext("monitor_interface", "") or ""
+        self.link_events = root.findtext("link_events", "True").lower() == 'true'
+        self.bind_address = (root.findtext("bind_address", "") or "").strip()
+        self.bind_interface = (root.findtext("bind_interface", "") or "").strip()
+        status_port = (root.findtext("status_port", "0") or "0").strip()
+        self.status_port = int(status_port) if status_port.isdigit() else 0
+        self.status_socket = (root.findtext("status_socket", "") or "").strip()
+        self.probes = []
+        for element in root.findall("probes/probe"):
+            target = (element.text or "").strip()
+            if not target:
+                continue
+            probe = {
+                'type': element.get("type", "http"),
+                'target': target,
+                'timeout': float(element.get("timeout", "3")),
+            }
+            # 可选：http/head探测接受的状态码，如 expect="204" 或 expect="200,204"
+            expect = [int(code) for code in (element.get("expect") or "").split(",") if code.strip().isdigit()]
+            if expect:
+                probe['expect'] = expect
+            self.probes.append(probe)
+    
     def set_auto_start(self, enable):
         """设置开机启动"""
         try:
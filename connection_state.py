@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+连接状态机模块
+统一管理登录和注销：GUI按钮、托盘菜单和断线重连发起的登录合并为同一次进行中的登录，
+所有调用者得到同一个结果；登录和注销不会同时访问认证服务器
+
+状态转换：
+    Offline  -> LoggingIn
+    LoggingIn -> Online / Offline（登录失败）
+    Online   -> Kicked（检测到掉线） / Offline（注销）
+    Kicked   -> LoggingIn / Offline
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger('ConnectionState')
+
+OFFLINE = 'Offline'
+LOGGING_IN = 'LoggingIn'
+ONLINE = 'Online'
+KICKED = 'Kicked'
+
+TRANSITIONS = {
+    OFFLINE: (LOGGING_IN,),
+    LOGGING_IN: (ONLINE, OFFLINE),
+    ONLINE: (KICKED, OFFLINE, LOGGING_IN),
+    KICKED: (LOGGING_IN, OFFLINE),
+}
+
+
+class _Flight:
+    """一次进行中的登录，等待者共享其结果"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.waiters = 0
+
+
+class ConnectionStateMachine:
+    def __init__(self, on_transition=None):
+        # 状态变化时的回调，参数为 (旧状态, 新状态)
+        self.on_transition = on_transition
+        self.state = OFFLINE
+        # 被合并到进行中登录的请求数
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        # 同一时间只允许一个登录或注销请求访问认证服务器
+        self._work_lock = threading.Lock()
+        self._flight = None
+
+    def _set_state(self, new_state):
+        """在持有 _lock 时调用，返回 (旧状态, 新状态)，非法转换时返回None"""
+        old_state = self.state
+        if new_state == old_state:
+            return None
+        if new_state not in TRANSITIONS[old_state]:
+            logger.warning(f"忽略非法状态转换: {old_state} -> {new_state}")
+            return None
+        self.state = new_state
+        return old_state, new_state
+
+    def _emit(self, change):
+        if change is None:
+            return
+        logger.info(f"连接状态: {change[0]} -> {change[1]}")
+        if self.on_transition:
+            try:
+                self.on_transition(*change)
+            except Exception as e:
+                logger.error(f"状态回调异常: {str(e)}")
+
+    def transition(self, new_state):
+        """切换到新状态，返回是否发生了转换"""
+        with self._lock:
+            change = self._set_state(new_state)
+        self._emit(change)
+        return change is not None
+
+    def mark_kicked(self):
+        """检查线程发现掉线，只有原来在线时才转换为Kicked"""
+        with self._lock:
+            change = self._set_state(KICKED) if self.state == ONLINE else None
+        self._emit(change)
+        return change is not None
+
+    def mark_online(self):
+        """检查线程发现已在线（例如在其他设备或浏览器中登录过）"""
+        with self._lock:
+            if self.state in (ONLINE, LOGGING_IN):
+                return False
+            # 没有经过本程序登录，补上LoggingIn以保持转换合法
+            changes = [self._set_state(LOGGING_IN), self._set_state(ONLINE)]
+        for change in changes:
+            self._emit(change)
+        return True
+
+    def login(self, attempt):
+        """执行登录，attempt() 返回 {'success': ..., 'message': ...}
+
+        已有登录在进行时不再发起新的请求，等待并返回那一次的结果
+        """
+        with self._lock:
+            flight = self._flight
+            leader = flight is None
+            if leader:
+                flight = self._flight = _Flight()
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+        if not leader:
+            logger.info("已有登录正在进行，等待其结果")
+            flight.done.wait()
+            return flight.result
+
+        # attempt() 被 KeyboardInterrupt 等中断时，等待的线程也要得到结果
+        result = {'success': False, 'message': '登录被中断'}
+        try:
+            # 先等正在进行的注销结束，再进入LoggingIn状态
+            with self._work_lock:
+                self.transition(LOGGING_IN)
+                try:
+                    result = attempt()
+                except Exception as e:
+                    result = {'success': False, 'message': f'登录异常: {str(e)}'}
+                finally:
+                    with self._lock:
+                        change = self._set_state(ONLINE if result['success'] else OFFLINE)
+                    self._emit(change)
+        finally:
+            flight.result = result
+            with self._lock:
+                self._flight = None
+            flight.done.set()
+        return result
+
+    def logout(self, attempt):
+        """执行注销，等待进行中的登录结束后再访问认证服务器"""
+        with self._work_lock:
+            result = attempt()
+        if result['success']:
+            self.transition(OFFLINE)
+        return result
+
+    def is_busy(self):
+        """是否有登录或注销正在进行"""
+        return self._flight is not None or self._work_lock.locked()
@@ -6,13 +6,21 @@ dr.com校园网登录模块
 实现dr.com校园网终端的登录和注销功能
 """
 
-import re
 import time
 import requests
 import socket
 import logging
+import threading
 from urllib.parse import quote
 
+from probe import ProbeEngine, HttpProbe, parse_probe, probes_from_config
+from http_pool import SourceBinding, create_session, prewarm
+from login_strategy import LoginStrategyEngine
+from fast_login import FastLoginSender
+from portal_parser import parse_html, parse_reply, declared_encodings
+from rtt import RttTracker, is_timeout, request_with_deadline
+from circuit_breaker import CircuitBreaker, CLOSED
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -21,29 +29,53 @@ logging.basicConfig(
 logger = logging.getLogger('DrcomClient')
 
 
-class DrcomClient:
+class BaseDrcomClient:
+    """同步和异步客户端共用的部分
+
+    认证服务器地址、请求参数、响应结果的解释，以及登录、注销、状态查询的控制流程
+    （熔断、超时、状态缓存、chkstatus回退、快速重新登录）都在这里实现，只写一份。
+    控制流程是生成器，需要访问网络时 yield 一个操作 (名称, 参数...)，
+    由子类的 _drive() 调用对应的 _do_<名称>() 执行后把结果送回（出错时把异常抛回流程中），
+    DrcomClient 以阻塞方式执行这些操作，AsyncDrcomClient 在事件循环中执行：
+
+        http        (方法, URL, 超时, 请求参数)  -> 响应（status_code、headers、content）
+        title       (超时, 截止时刻)            -> (状态码, PortalReply或None)，只读到</title>
+        status      (max_age,)                 -> get_portal_status() 的结果
+        probe       ()                         -> 外网探测结果（ProbeResult）
+        strategies  ()                         -> 登录策略引擎的登录结果
+        fast_login  (超时,)                     -> 快速登录是否成功（True/None）
+    """
+    # 默认使用PC的User-Agent
+    pc_user_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    # 移动设备的User-Agent
+    mobile_user_agent = 'Mozilla/5.0 (iPhone; CPU iPhone OS 13_2_3 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/13.0.3 Mobile/15E148 Safari/604.1'
+    
     def __init__(self, config):
         self.config = config
-        self.session = requests.Session()
-        # 默认使用PC的User-Agent
-        self.pc_user_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        # 移动设备的User-Agent
-        self.mobile_user_agent = 'Mozilla/5.0 (iPhone; CPU iPhone OS 13_2_3 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/13.0.3 Mobile/15E148 Safari/604.1'
-        
-        # 根据设备类型设置User-Agent
-        if hasattr(config, 'device_type') and config.device_type == "Mobile":
-            self.session.headers.update({
-                'User-Agent': self.mobile_user_agent
-            })
-        else:
-            self.session.headers.update({
-                'User-Agent': self.pc_user_agent
-            })
-            
         self.login_url = None
         self.logout_url = None
         self.status_url = None
         self.init_urls()
+        # 出口绑定：同一台机器上登录多个账号时，每个账号的请求从各自的源地址或网卡发出
+        self.binding = SourceBinding(getattr(config, 'bind_address', ''), getattr(config, 'bind_interface', ''))
+        # 按接口统计请求耗时，自动调整连接、读取超时和整个请求的截止时间
+        self.rtt = RttTracker()
+        # 认证服务器熔断：服务器不可用时暂停请求，恢复时先用一次状态查询试探
+        self.breaker = CircuitBreaker()
+        self.last_probe = None
+        # 登录策略引擎，记录每个服务器上成功的登录方式
+        self.login_engine = LoginStrategyEngine()
+        # 重新登录的快速路径：预先编译成功过的登录请求，失败时改走完整流程
+        self.fast_login = FastLoginSender(binding=self.binding)
+        
+        # 认证页面状态缓存，避免同一次操作中重复请求认证页面
+        self.status_ttl = 2
+        # 读取认证页面时最多读取的字节数，找到</title>后立即停止
+        self.status_read_limit = 32 * 1024
+        self._status_cache = None
+        self._status_time = 0
+        # 每个服务器上可用的状态查询方式：'chkstatus' 或 'title'，未检测过的服务器不在其中
+        self.status_methods = {}
     
     def init_urls(self):
         """初始化URL"""
@@ -57,111 +89,281 @@ class DrcomClient:
         self.logout_url = f"{server}/drcom/logout"
         # 状态检查URL
         self.status_url = server
+        # 轻量的JSONP状态接口，不是所有服务器都提供
+        self.chkstatus_url = f"{server}/drcom/chkstatus"
     
-    def login(self):
+    def _user_agent(self):
+        """根据设备类型选择User-Agent，按请求传入，不修改共享的session"""
+        return self.mobile_user_agent if self.config.device_type == "Mobile" else self.pc_user_agent
+    
+    def _login_params(self):
+        """构建JSONP登录参数"""
+        # 获取时间戳
+        timestamp = str(int(round(time.time() * 1000)))
+        
+        # 构建登录参数
+        params = {
+            'callback': f'dr{timestamp}',
+            'DDDDD': self.config.username,
+            'upass': quote(self.config.password),
+            '0MKKey': '123456',
+            'R1': '0',
+            'R3': '0',
+            'R6': '0',
+            'para': '00',
+            'v6ip': '',
+            '_': timestamp
+        }
+        
+        # 根据设备类型添加不同的参数
+        if self.config.device_type == "Mobile":
+            # 移动设备参数
+            params['type'] = '1'  # 移动设备
+            # 移动设备可能不需要对密码进行URL编码
+            params['upass'] = self.config.password
+        else:  # PC
+            params['type'] = '2'  # PC设备
+        return params
+    
+    def _login_headers(self):
+        """登录请求的请求头，按请求传入而不修改共享的session"""
+        if self.config.device_type == "Mobile":
+            # 移动设备的完整请求头
+            return {
+                'User-Agent': self.mobile_user_agent,
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9',
+                'Accept-Encoding': 'gzip, deflate',
+                'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6',
+                'Connection': 'keep-alive',
+                'DNT': '1',
+                'Upgrade-Insecure-Requests': '1',
+                'X-Requested-With': 'com.apple.mobilesafari',
+                'Referer': self.status_url
+            }
+        return {'User-Agent': self._user_agent()}
+    
+    def _login_post_data(self):
+        """构建完整的表单数据，模拟网页登录"""
+        return {
+            'DDDDD': f",0,{self.config.username}",  # 特殊格式：,0,用户名
+            'upass': self.config.password,
+            '0MKKey': '123456789',  # 使用更常见的值
+            'R1': '0',
+            'R2': '',
+            'R3': '0',
+            'R6': '0',
+            'para': '00',
+            'v6ip': '',
+            'terminal_type': '1',
+            'type': '1',
+            'lang': 'zh'
+        }
+    
+    def _status_params(self):
+        """JSONP状态查询和注销请求的参数"""
+        timestamp = str(int(round(time.time() * 1000)))
+        return {'callback': f'dr{timestamp}', '_': timestamp}
+    
+    def _chkstatus_result(self, status_code, content, encodings=()):
+        """解释JSONP状态接口的响应，接口不存在或返回内容无法识别时返回None"""
+        if status_code != 200:
+            return None
+        reply = parse_reply(content, encodings)
+        if reply.kind != 'jsonp' or reply.result not in (0, 1):
+            return None
+        return {'reachable': True, 'logged_in': reply.result == 1, 'reply': reply}
+    
+    def _post_login_result(self, status_code, content, encodings=()):
+        """解释POST表单登录的响应"""
+        if status_code != 200:
+            return {'success': False, 'message': f'POST方式登录失败: HTTP {status_code}'}
+        # 返回的可能是注销页（HTML）或JSON结果
+        reply = parse_reply(content, encodings)
+        if reply.success:
+            logger.info(f"POST方式登录成功: {self.config.username}")
+            return {'success': True, 'message': 'POST方式登录成功', 'reply': reply}
+        return {'success': False, 'message': f'POST方式登录失败: {reply.message or reply.title or "未知错误"}',
+                'reply': reply}
+    
+    def _get_login_result(self, status_code, content, encodings=()):
+        """解释JSONP GET登录的响应"""
+        if status_code == 200:
+            # 解析JSONP响应
+            reply = parse_reply(content, encodings)
+            if reply.result == 1:
+                # 登录成功
+                logger.info(f"登录成功: {self.config.username}")
+                return {'success': True, 'message': '登录成功', 'reply': reply}
+            else:
+                # 登录失败，使用服务器返回的错误信息
+                error_msg = reply.message or (f'错误代码 {reply.ret_code}' if reply.ret_code is not None else '未知错误')
+                logger.error(f"登录失败: {error_msg}")
+                return {'success': False, 'message': f'登录失败: {error_msg}', 'reply': reply}
+        else:
+            # HTTP错误
+            logger.error(f"HTTP错误: {status_code}")
+            return {'success': False, 'message': f'HTTP错误: {status_code}'}
+    
+    def _logout_result(self, status_code, content, encodings=()):
+        """解释注销请求的响应"""
+        if status_code == 200:
+            reply = parse_reply(content, encodings)
+            if reply.result == 0:
+                logger.error(f"注销失败: {reply.message}")
+                return {'success': False, 'message': f'注销失败: {reply.message or "未知错误"}', 'reply': reply}
+            logger.info("注销成功")
+            return {'success': True, 'message': '注销成功', 'reply': reply}
+        else:
+            # HTTP错误
+            logger.error(f"注销HTTP错误: {status_code}")
+            return {'success': False, 'message': f'注销HTTP错误: {status_code}'}
+    
+    def rtt_stats(self):
+        """各接口的平滑耗时、偏差和当前超时"""
+        return self.rtt.stats()
+    
+    def _cached_status(self, max_age=None):
+        """有效期内的认证页面状态缓存，没有时返回None"""
+        if max_age is None:
+            max_age = self.status_ttl
+        if self._status_cache is not None and time.monotonic() - self._status_time < max_age:
+            return self._status_cache
+        return None
+    
+    def _store_status(self, status):
+        self._status_cache = status
+        self._status_time = time.monotonic()
+        return status
+    
+    @staticmethod
+    def _advance(flow, result=None, error=None):
+        """把上一个操作的结果（或异常）送回流程，返回 (是否结束, 下一个操作或流程的返回值)"""
+        try:
+            if error is not None:
+                return False, flow.throw(error)
+            return False, flow.send(result)
+        except StopIteration as stop:
+            return True, stop.value
+    
+    def _record_portal_result(self, status_code):
+        """认证服务器有响应：5xx视为服务器故障，其余说明服务器正常"""
+        if status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+    
+    def _portal_request_flow(self, method, url, initial, trial=False, **kwargs):
+        """向认证服务器发送请求并读完响应
+
+        超时由该接口的历史耗时决定（initial 为没有测量数据时的超时），并记录本次耗时；
+        熔断期间直接抛出 CircuitOpenError，trial=True 的请求可以作为熔断后的试探请求
+        """
+        self.breaker.check(trial)
+        endpoint = f'{method} {url}'
+        timeouts = self.rtt.timeouts(endpoint, initial)
+        start = time.monotonic()
+        try:
+            response = yield ('http', method, url, timeouts, kwargs)
+        except requests.exceptions.RequestException as e:
+            if is_timeout(e):
+                self.rtt.record_timeout(endpoint, initial)
+            self.breaker.record_failure()
+            raise
+        self.rtt.record(endpoint, time.monotonic() - start, initial)
+        self._record_portal_result(response.status_code)
+        return response
+    
+    def _chkstatus_flow(self):
+        """请求JSONP状态接口，返回 (状态, HTTP状态码)，接口不存在或返回内容无法识别时状态为None"""
+        response = yield from self._portal_request_flow('GET', self.chkstatus_url, 5, trial=True,
+                                                        params=self._status_params(),
+                                                        headers={'User-Agent': self._user_agent()})
+        status = self._chkstatus_result(response.status_code, response.content, declared_encodings(response))
+        return status, response.status_code
+    
+    def _title_status_flow(self):
+        """请求认证页面，只读到</title>为止，返回页面是否可访问以及是否已登录"""
+        self.breaker.check(trial=True)
+        endpoint = f'GET {self.status_url}'
+        timeouts = self.rtt.timeouts(endpoint, 5)
+        start = time.monotonic()
+        try:
+            status_code, reply = yield ('title', timeouts, start + timeouts.total)
+        except requests.exceptions.RequestException as e:
+            if is_timeout(e):
+                self.rtt.record_timeout(endpoint, 5)
+            self.breaker.record_failure()
+            raise
+        self._record_portal_result(status_code)
+        if status_code != 200:
+            return {'reachable': False, 'logged_in': False}
+        self.rtt.record(endpoint, time.monotonic() - start, 5)
+        # 检查页面标题，如果包含"注销页"则表示已登录
+        return {'reachable': True, 'logged_in': reply.logged_in, 'reply': reply}
+    
+    def _portal_status_flow(self):
+        """查询登录状态：优先使用JSONP状态接口，不可用时检查认证页面标题"""
+        method = self.status_methods.get(self.status_url)
+        if method != 'title':
+            status, status_code = yield from self._chkstatus_flow()
+            if status is not None:
+                if method is None:
+                    logger.info("认证服务器支持chkstatus状态接口")
+                self.status_methods[self.status_url] = 'chkstatus'
+                return status
+            if method is None and status_code < 500:
+                logger.info("认证服务器不支持chkstatus状态接口，改为检查认证页面标题")
+                self.status_methods[self.status_url] = 'title'
+            else:
+                # 已确认支持该接口，或服务器暂时故障，只有本次改为检查认证页面标题
+                logger.debug(f"chkstatus状态接口本次响应无法识别 (HTTP {status_code})，改为检查认证页面标题")
+        return (yield from self._title_status_flow())
+    
+    def _login_via_post_flow(self):
+        """使用POST表单方式登录（完全模拟移动端网页表单提交）"""
+        response = yield from self._portal_request_flow('POST', self.login_url, 10, data=self._login_post_data(),
+                                                        headers=self._login_headers())
+        return self._post_login_result(response.status_code, response.content, declared_encodings(response))
+    
+    def _login_via_get_flow(self):
+        """使用JSONP GET方式登录"""
+        response = yield from self._portal_request_flow('GET', self.login_url, 10, params=self._login_params(),
+                                                        headers=self._login_headers())
+        return self._get_login_result(response.status_code, response.content, declared_encodings(response))
+    
+    def _login_flow(self):
         """登录校园网"""
         try:
             # 检查当前状态
-            if self.is_connected():
+            if (yield from self._is_connected_flow()):
                 return {'success': True, 'message': '已经登录'}
             
-            # 获取时间戳
-            timestamp = str(int(round(time.time() * 1000)))
-            
-            # 构建登录参数
-            params = {
-                'callback': f'dr{timestamp}',
-                'DDDDD': self.config.username,
-                'upass': quote(self.config.password),
-                '0MKKey': '123456',
-                'R1': '0',
-                'R3': '0',
-                'R6': '0',
-                'para': '00',
-                'v6ip': '',
-                '_': timestamp
-            }
-
-            # 根据设备类型添加不同的参数和请求头
-            if self.config.device_type == "Mobile":
-                # 移动设备参数
-                params['type'] = '1'  # 移动设备
-                # 移动设备可能不需要对密码进行URL编码
-                params['upass'] = self.config.password
-                
-                # 更新为移动设备的完整请求头
-                self.session.headers.update({
-                    'User-Agent': self.mobile_user_agent,
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9',
-                    'Accept-Encoding': 'gzip, deflate',
-                    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6',
-                    'Connection': 'keep-alive',
-                    'DNT': '1',
-                    'Upgrade-Insecure-Requests': '1',
-                    'X-Requested-With': 'com.apple.mobilesafari',
-                    'Referer': self.status_url
-                })
-                
-                # 尝试直接使用POST方法登录（完全模拟网页表单提交）
-                try:
-                    # 构建完整的表单数据，模拟网页登录
-                    post_data = {
-                        'DDDDD': f",0,{self.config.username}",  # 特殊格式：,0,用户名
-                        'upass': self.config.password,
-                        '0MKKey': '123456789',  # 使用更常见的值
-                        'R1': '0',
-                        'R2': '',
-                        'R3': '0',
-                        'R6': '0',
-                        'para': '00',
-                        'v6ip': '',
-                        'terminal_type': '1',
-                        'type': '1',
-                        'lang': 'zh'
-                    }
-                    
-                    # 尝试POST方式登录
-                    post_url = f"{self.config.server}/drcom/login"
-                    if not post_url.startswith('http'):
-                        post_url = f"http://{post_url}"
-                        
-                    post_response = self.session.post(post_url, data=post_data, timeout=10)
-                    
-                    if post_response.status_code == 200 and ('result":1' in post_response.text or '注销页' in post_response.text):
-                        logger.info(f"POST方式登录成功: {self.config.username}")
-                        return {'success': True, 'message': 'POST方式登录成功'}
-                        
-                except Exception as e:
-                    logger.warning(f"POST方式登录失败，尝试GET方式: {str(e)}")
-                    # 继续使用GET方式登录
-            else:  # PC
-                params['type'] = '2'  # PC设备
-                # 更新为PC设备的User-Agent
-                self.session.headers.update({
-                    'User-Agent': self.pc_user_agent
-                })
-            
-            # 发送登录请求
-            response = self.session.get(self.login_url, params=params, timeout=10)
-            
-            # 检查响应
-            if response.status_code == 200:
-                # 解析响应内容
-                content = response.text
-                if 'result":1' in content:
-                    # 登录成功
-                    logger.info(f"登录成功: {self.config.username}")
+            # 已在该服务器上成功过的登录方式，先走预先编译的快速路径
+            _, preferred = self.login_engine.candidates(self)
+            # 熔断或试探期间不走快速路径，由完整流程按熔断状态处理
+            if preferred and self.breaker.state == CLOSED and self.fast_login.prepare(self, preferred):
+                endpoint = f'FAST {self.login_url}'
+                start = time.monotonic()
+                fast_result = yield ('fast_login', self.rtt.timeouts(endpoint, 5).total)
+                if fast_result:
+                    self.rtt.record(endpoint, time.monotonic() - start, 5)
+                    logger.info(f"快速登录成功: {self.config.username}")
                     return {'success': True, 'message': '登录成功'}
-                else:
-                    # 登录失败，尝试提取错误信息
-                    error_match = re.search(r'"msg":"(.*?)"', content)
-                    error_msg = error_match.group(1) if error_match else '未知错误'
-                    logger.error(f"登录失败: {error_msg}")
-                    return {'success': False, 'message': f'登录失败: {error_msg}'}
-            else:
-                # HTTP错误
-                logger.error(f"HTTP错误: {response.status_code}")
-                return {'success': False, 'message': f'HTTP错误: {response.status_code}'}
+                if fast_result is False:
+                    # 服务器明确拒绝（如密码错误），完整流程也会被拒绝，不再重复发送登录请求
+                    self.rtt.record(endpoint, time.monotonic() - start, 5)
+                    if preferred == 'post_form':
+                        return self._post_login_result(200, self.fast_login.rejection)
+                    return self._get_login_result(200, self.fast_login.rejection)
+            
+            # 由登录策略引擎决定尝试哪些登录方式以及顺序
+            result = yield ('strategies',)
+            if result['success']:
+                # 为下一次重新登录准备好请求模板
+                _, preferred = self.login_engine.candidates(self)
+                if preferred:
+                    self.fast_login.prepare(self, preferred)
+            return result
         
         except requests.exceptions.RequestException as e:
             # 请求异常
@@ -171,34 +373,21 @@ class DrcomClient:
             # 其他异常
             logger.error(f"登录异常: {str(e)}")
             return {'success': False, 'message': f'登录异常: {str(e)}'}
+        finally:
+            # 登录后认证页面状态可能已改变
+            self.invalidate_status()
     
-    def logout(self):
+    def _logout_flow(self):
         """注销登录"""
         try:
             # 检查当前状态
-            if not self.is_connected():
+            if not (yield from self._is_connected_flow()):
                 return {'success': True, 'message': '已经注销'}
             
-            # 获取时间戳
-            timestamp = str(int(round(time.time() * 1000)))
-            
-            # 构建注销参数
-            params = {
-                'callback': f'dr{timestamp}',
-                '_': timestamp
-            }
-            
             # 发送注销请求
-            response = self.session.get(self.logout_url, params=params, timeout=10)
-            
-            # 检查响应
-            if response.status_code == 200:
-                logger.info("注销成功")
-                return {'success': True, 'message': '注销成功'}
-            else:
-                # HTTP错误
-                logger.error(f"注销HTTP错误: {response.status_code}")
-                return {'success': False, 'message': f'注销HTTP错误: {response.status_code}'}
+            response = yield from self._portal_request_flow('GET', self.logout_url, 10, params=self._status_params(),
+                                                            headers={'User-Agent': self._user_agent()})
+            return self._logout_result(response.status_code, response.content, declared_encodings(response))
         
         except requests.exceptions.RequestException as e:
             # 请求异常
@@ -208,34 +397,32 @@ class DrcomClient:
             # 其他异常
             logger.error(f"注销异常: {str(e)}")
             return {'success': False, 'message': f'注销异常: {str(e)}'}
+        finally:
+            self.invalidate_status()
     
-    def is_connected(self):
-        """检查是否已连接"""
+    def _is_connected_flow(self, max_age=None):
+        """检查是否已连接
+
+        max_age 为可接受的认证页面状态缓存时长（秒），0表示必须重新请求
+        """
         try:
-            # 发送请求到状态URL
-            response = self.session.get(self.status_url, timeout=5)
+            # 获取认证页面状态（可能来自缓存）
+            status = yield ('status', max_age)
             
             # 检查响应内容
-            if response.status_code == 200:
-                content = response.text
-                # 检查页面标题，如果包含"注销页"则表示已登录
-                title_match = re.search(r'<title>(.*?)</title>', content)
-                if title_match and title_match.group(1) == '注销页':
+            if status['reachable']:
+                if status['logged_in']:
                     # 尝试连接外网验证是否真的能上网
                     try:
-                        # 使用更可靠的外网测试
-                        test_urls = ['http://www.baidu.com', 'http://www.qq.com', 'http://www.bing.com']
-                        for test_url in test_urls:
-                            try:
-                                test_response = self.session.get(test_url, timeout=3)
-                                if test_response.status_code == 200:
-                                    logger.info(f"成功连接到外网: {test_url}")
-                                    return True
-                            except:
-                                continue
+                        # 并发探测所有外网目标，任意一个成功即可
+                        result = yield ('probe',)
+                        self.last_probe = result
+                        if result.success:
+                            logger.info(f"成功连接到外网: {result.target} ({result.rtt * 1000:.0f}ms)")
+                            return True
                         
                         # 如果所有测试URL都失败，则可能是校园网认证成功但没有真正连接到互联网
-                        logger.warning("校园网认证页面显示已登录，但无法连接到外网")
+                        logger.warning(f"校园网认证页面显示已登录，但无法连接到外网: {result.failures}")
                         return False
                     except Exception as e:
                         logger.error(f"外网连接测试异常: {str(e)}")
@@ -248,16 +435,16 @@ class DrcomClient:
             logger.error(f"检查连接异常: {str(e)}")
             return False
     
-    def check_network(self):
+    def _check_network_flow(self):
         """检查网络状态"""
         try:
-            # 检查是否能访问校园网登录页面
-            response = self.session.get(self.status_url, timeout=5)
-            if response.status_code != 200:
+            # 检查是否能访问校园网登录页面，随后的is_connected会复用这次的结果
+            status = yield ('status', None)
+            if not status['reachable']:
                 return {'success': False, 'message': '无法访问校园网登录页面'}
             
             # 检查是否已登录
-            if self.is_connected():
+            if (yield from self._is_connected_flow()):
                 return {'success': True, 'message': '已登录并连接互联网'}
             else:
                 return {'success': False, 'message': '未登录或无法连接互联网'}
@@ -265,4 +452,156 @@ class DrcomClient:
         except requests.exceptions.RequestException as e:
             return {'success': False, 'message': f'网络请求异常: {str(e)}'}
         except Exception as e:
-            return {'success': False, 'message': f'网络检查异常: {str(e)}'}
\ No newline at end of file
+            return {'success': False, 'message': f'网络检查异常: {str(e)}'}
+
+
+class DrcomClient(BaseDrcomClient):
+    def __init__(self, config):
+        super().__init__(config)
+        # 认证服务器专用的连接池，保持长连接，重新登录时不需要重新建立TCP连接
+        self.session = create_session(pool_maxsize=4, binding=self.binding)
+        
+        # 外网探测引擎，并发探测多个目标，使用独立的连接池
+        targets = probes_from_config(config)
+        self.probe_session = create_session(pool_maxsize=max(4, len(targets or ())), binding=self.binding)
+        self.probe_engine = ProbeEngine(targets, session=self.probe_session, rtt_tracker=self.rtt)
+        
+        # 剩余内容不超过该字节数时读完，以便连接放回连接池复用
+        self.status_drain_limit = 4 * 1024
+        self._status_lock = threading.Lock()
+    
+    def warm_up(self, timeout=3):
+        """预先建立到认证服务器和HTTP探测目标的连接，返回成功建立的连接数"""
+        probe_urls = []
+        for target in self.probe_engine.targets:
+            try:
+                probe = parse_probe(target, self.probe_engine.timeout)
+            except ValueError:
+                continue
+            if isinstance(probe, HttpProbe):
+                probe_urls.append(probe.target)
+        warmed = prewarm(self.session, [self.status_url], timeout) + prewarm(self.probe_session, probe_urls, timeout)
+        try:
+            self.fast_login.connect()
+        except OSError as e:
+            logger.debug(f"快速登录预先建立连接失败: {str(e)}")
+        return warmed
+    
+    def pool_stats(self):
+        """认证服务器和外网探测两个连接池的统计信息"""
+        return {
+            'portal': self.session.pool_stats.to_dict(),
+            'probe': self.probe_session.pool_stats.to_dict(),
+        }
+    
+    def _drive(self, flow):
+        """以阻塞方式执行控制流程，返回流程的结果"""
+        done, value = self._advance(flow)
+        while not done:
+            try:
+                result = getattr(self, f'_do_{value[0]}')(*value[1:])
+            except Exception as e:
+                done, value = self._advance(flow, error=e)
+            else:
+                done, value = self._advance(flow, result)
+        return value
+    
+    def _do_http(self, method, url, timeouts, kwargs):
+        return request_with_deadline(self.session, method, url, timeouts, **kwargs)
+    
+    def _do_title(self, timeouts, deadline):
+        response = self.session.get(self.status_url, headers={'User-Agent': self._user_agent()},
+                                    timeout=timeouts.as_requests(), stream=True)
+        if response.status_code != 200:
+            response.close()
+            return response.status_code, None
+        return response.status_code, self._read_status_page(response, deadline)
+    
+    def _do_status(self, max_age):
+        return self.get_portal_status(max_age)
+    
+    def _do_probe(self):
+        return self.probe_engine.run()
+    
+    def _do_strategies(self):
+        return self.login_engine.run(self)
+    
+    def _do_fast_login(self, timeout):
+        return self.fast_login.send(timeout=timeout)
+    
+    def _read_status_page(self, response, deadline=None):
+        """流式读取页面直到出现</title>或达到读取上限，返回解析结果（PortalReply）"""
+        buffer = bytearray()
+        received = 0
+        for chunk in response.iter_content(chunk_size=2048):
+            if deadline is not None and time.monotonic() > deadline:
+                response.close()
+                raise requests.exceptions.Timeout(f"读取认证页面超过截止时间: {self.status_url}")
+            # 只在新数据附近查找结束标签，避免重复扫描整个缓冲区
+            search_from = max(0, len(buffer) - len(b'</title>'))
+            buffer += chunk
+            received += len(chunk)
+            if b'</title>' in buffer[search_from:].lower() or received >= self.status_read_limit:
+                break
+
+        # dr.com页面通常为GBK或UTF-8编码，优先使用响应头声明的编码
+        reply = parse_html(buffer, declared_encodings(response))
+
+        # 剩余内容很少时读完，连接可以放回连接池；否则直接关闭连接
+        # Content-Length 是压缩后的长度，这里用已从连接读取的原始字节数比较
+        length = response.headers.get('content-length')
+        consumed = response.raw.tell() if hasattr(response.raw, 'tell') else received
+        if length and length.isdigit() and int(length) - consumed <= self.status_drain_limit:
+            for _ in response.iter_content(chunk_size=self.status_drain_limit):
+                pass
+        response.close()
+        return reply
+    
+    def get_portal_status(self, max_age=None):
+        """获取认证页面状态，在有效期内直接返回缓存
+
+        多个线程同时查询时只会发出一次请求，请求失败时抛出异常且不缓存
+        """
+        with self._status_lock:
+            status = self._cached_status(max_age)
+            if status is None:
+                status = self._store_status(self._drive(self._portal_status_flow()))
+            return status
+    
+    def invalidate_status(self):
+        """使认证页面状态缓存失效（登录、注销后调用）"""
+        with self._status_lock:
+            self._status_cache = None
+    
+    def login_via_post(self):
+        """使用POST表单方式登录（完全模拟移动端网页表单提交）"""
+        return self._drive(self._login_via_post_flow())
+    
+    def login_via_get(self):
+        """使用JSONP GET方式登录"""
+        return self._drive(self._login_via_get_flow())
+    
+    def login(self):
+        """登录校园网"""
+        return self._drive(self._login_flow())
+    
+    def logout(self):
+        """注销登录"""
+        return self._drive(self._logout_flow())
+    
+    def is_connected(self, max_age=None):
+        """检查是否已连接
+
+        max_age 为可接受的认证页面状态缓存时长（秒），0表示必须重新请求
+        """
+        return self._drive(self._is_connected_flow(max_age))
+    
+    def check_network(self):
+        """检查网络状态"""
+        return self._drive(self._check_network_flow())
+    
+    def close(self):
+        """关闭所有连接"""
+        self.session.close()
+        self.probe_session.close()
+        self.fast_login.close()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+校园网登录器守护进程
+无界面运行登录和断线重连，只依赖标准库和requests
+
+用法:
+    python -m drcomd [--config 配置文件] [--log-file 日志文件] [--log-level INFO]
+    python main.py --daemon [同上参数]
+    python -m drcomd --accounts 多账号配置文件 [--workers 4] [--login-rate 1]
+    python -m drcomd --status-port 8848 [--status-socket /run/drcom.sock]
+    python -m drcomd --async [其他参数]
+"""
+
+import sys
+import signal
+import logging
+import argparse
+import threading
+
+from config import Config
+from drcom import DrcomClient
+from supervisor import ConnectionSupervisor
+from multi_account import MultiAccountSupervisor, load_profiles
+from status_api import start_status_server
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(prog='drcomd', description='校园网登录器守护进程（无界面）')
+    parser.add_argument('--config', help='配置文件路径，默认为程序目录下的ZhkuWangLuo.xml')
+    parser.add_argument('--log-file', help='日志文件路径，默认输出到标准输出')
+    parser.add_argument('--log-level', default='INFO', help='日志级别，默认INFO')
+    parser.add_argument('--logout-on-exit', action='store_true', help='退出时注销登录')
+    parser.add_argument('--accounts', help='多账号配置文件，指定后同时保持其中所有账号在线')
+    parser.add_argument('--workers', type=int, default=4, help='多账号模式的工作线程数，默认4')
+    parser.add_argument('--login-rate', type=float, default=1.0, help='多账号模式每秒最多登录次数，默认1')
+    parser.add_argument('--status-port', type=int, help='本地状态接口端口（只监听127.0.0.1），覆盖配置文件')
+    parser.add_argument('--status-socket', help='本地状态接口Unix套接字路径，覆盖配置文件')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='使用基于asyncio的客户端，网络请求都在一个后台事件循环线程中进行')
+    return parser.parse_args(argv)
+
+
+def setup_logging(log_file=None, level='INFO'):
+    """配置日志输出到标准输出或文件"""
+    if log_file:
+        handler = logging.FileHandler(log_file, encoding='utf-8')
+    else:
+        handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    # 其他模块导入时已调用过basicConfig，这里强制替换根日志处理器
+    logging.basicConfig(level=getattr(logging, str(level).upper(), logging.INFO),
+                        handlers=[handler], force=True)
+
+
+def client_factory(args):
+    """按命令行参数选择客户端类型，asyncio 只在使用异步客户端时导入"""
+    if args.use_async:
+        from async_drcom import BlockingDrcomClient
+        return BlockingDrcomClient
+    return DrcomClient
+
+
+def wait_for_signal():
+    """阻塞直到收到SIGTERM或SIGINT"""
+    stop_event = threading.Event()
+
+    def handle_signal(signum, frame):
+        logging.info(f"收到信号 {signum}，正在退出...")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    # 主线程只等待退出信号，检查和重连都在守护线程中进行
+    while not stop_event.wait(1):
+        pass
+
+
+def run_accounts(args):
+    """多账号模式"""
+    try:
+        profiles = load_profiles(args.accounts)
+    except Exception as e:
+        logging.error(f"无法读取多账号配置文件 {args.accounts}: {str(e)}")
+        return 1
+    if not profiles:
+        logging.error(f"多账号配置文件中没有账号: {args.accounts}")
+        return 1
+
+    supervisor = MultiAccountSupervisor(profiles, max_workers=max(1, args.workers), login_rate=args.login_rate,
+                                        client_factory=client_factory(args))
+    logging.info(f"守护进程已启动，共 {len(profiles)} 个账号，工作线程 {supervisor.max_workers} 个")
+    supervisor.start()
+    # 多账号配置文件中没有全局设置，本地状态接口只能由命令行参数开启
+    status_server = start_status_server(supervisor, args.status_port, args.status_socket)
+    wait_for_signal()
+
+    if status_server:
+        status_server.stop()
+    supervisor.stop()
+    if args.logout_on_exit:
+        supervisor.logout_all()
+    logging.info("守护进程已退出")
+    return 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging(args.log_file, args.log_level)
+    if args.accounts:
+        return run_accounts(args)
+
+    config = Config()
+    if args.config:
+        config.config_file = args.config
+    if not config.load_config() or not config.username:
+        logging.error(f"无法从配置文件读取账号信息: {config.config_file}")
+        return 1
+
+    client = client_factory(args)(config)
+    supervisor = ConnectionSupervisor(client)
+
+    logging.info(f"守护进程已启动，账号: {config.username}，服务器: {config.server}")
+    supervisor.start_login_thread()
+    status_server = start_status_server(
+        supervisor,
+        args.status_port if args.status_port is not None else config.status_port,
+        args.status_socket if args.status_socket is not None else config.status_socket)
+    wait_for_signal()
+
+    if status_server:
+        status_server.stop()
+    supervisor.stop()
+    if args.logout_on_exit:
+        supervisor.logout_task()
+    logging.info("守护进程已退出")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,410 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+本地模拟dr.com认证服务器
+用于在没有校园网的环境下测试登录器和重连逻辑，只依赖标准库
+
+支持的接口:
+    GET  /                  已登录返回标题为"注销页"的页面，否则返回登录页
+    GET  /drcom/login       JSONP登录（PC方式）
+    POST /drcom/login       表单登录（移动设备方式）
+    GET  /drcom/logout      JSONP注销
+    GET  /drcom/chkstatus   JSONP登录状态（可用 chkstatus=False 关闭）
+    GET  /internet          模拟外网探测目标，未登录或上游断网时失败
+    GET  /generate_204      同上，成功时返回204空响应
+    UDP  61440              dr.com心跳（FakeKeepaliveServer，可选）
+
+用法:
+    python fake_portal.py --port 8080 --latency 0.05 --kick-interval 60
+"""
+
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+logger = logging.getLogger('FakePortal')
+
+# 与真实注销页一样，在脚本变量中给出账号、已用时长（分钟）、已用流量（KB）和IP
+LOGGED_IN_PAGE = ("<html><head><title>注销页</title><script>uid='{uid}';time='{time}      ';"
+                  "flow='{flow}     ';v4ip='{ip}';</script></head><body>您已经成功登录</body></html>")
+LOGIN_PAGE = '<html><head><title>上网登录页</title></head><body>请登录</body></html>'
+
+
+class PortalHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # 缓冲输出，响应头和正文一次写出，避免Nagle算法与延迟确认叠加造成约40ms的额外延迟
+    wbufsize = -1
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.client_address[0], format % args)
+
+    @property
+    def portal(self):
+        return self.server.portal
+
+    def _send(self, status, body, content_type='text/html; charset=utf-8'):
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(data)
+
+    def _logged_in_page(self, ip):
+        session = self.portal.sessions.get(ip) or {}
+        minutes = int((time.monotonic() - session['login_time']) // 60) if session else 0
+        return LOGGED_IN_PAGE.format(uid=session.get('username', ''), time=minutes, flow=0, ip=ip)
+
+    def _jsonp(self, query, payload):
+        callback = query.get('callback', ['dr1003'])[0]
+        body = f"{callback}({json.dumps(payload, ensure_ascii=False, separators=(',', ':'))})"
+        self._send(200, body, 'application/javascript; charset=utf-8')
+
+    def _before_response(self):
+        """模拟网络延迟和丢包，返回False表示本次请求被"丢弃" """
+        portal = self.portal
+        if portal.drop_rate and random.random() < portal.drop_rate:
+            portal.count('dropped')
+            # 模拟丢包：长时间不响应后直接断开连接
+            time.sleep(portal.stall_time)
+            self.close_connection = True
+            return False
+        delay = portal.latency + (random.uniform(0, portal.jitter) if portal.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+        return True
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query, keep_blank_values=True)
+        self.portal.count(url.path)
+        if not self._before_response():
+            return
+        ip = self.client_address[0]
+
+        if url.path == '/':
+            self._send(200, self._logged_in_page(ip) if self.portal.is_online(ip) else LOGIN_PAGE)
+        elif url.path == '/drcom/login':
+            username = query.get('DDDDD', [''])[0]
+            password = query.get('upass', [''])[0]
+            self._jsonp(query, self.portal.login(ip, username, password))
+        elif url.path == '/drcom/logout':
+            self.portal.logout(ip)
+            self._jsonp(query, {'result': 1, 'msg': '注销成功'})
+        elif url.path == '/drcom/chkstatus' and self.portal.chkstatus:
+            self._jsonp(query, self.portal.status(ip))
+        elif url.path == '/internet':
+            if self.portal.upstream_ok and self.portal.is_online(ip):
+                self._send(200, 'ok')
+            else:
+                self._send(502, 'upstream unavailable')
+        elif url.path == '/generate_204':
+            if self.portal.upstream_ok and self.portal.is_online(ip):
+                self._send(204, b'')
+            else:
+                self._send(502, 'upstream unavailable')
+        else:
+            self._send(404, 'not found')
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        form = parse_qs(self.rfile.read(length).decode('utf-8', 'replace'), keep_blank_values=True)
+        self.portal.count(f'POST {url.path}')
+        if not self._before_response():
+            return
+        if url.path != '/drcom/login':
+            self._send(404, 'not found')
+            return
+        # 移动设备表单中的账号格式为 ",0,用户名"
+        username = form.get('DDDDD', [''])[0].split(',')[-1]
+        password = form.get('upass', [''])[0]
+        result = self.portal.login(self.client_address[0], username, password)
+        if result['result'] == 1:
+            self._send(200, self._logged_in_page(self.client_address[0]))
+        else:
+            self._send(200, f'<html><head><title>信息页</title></head><body>{result["msg"]}</body></html>')
+
+
+class FakePortal:
+    """可编程的模拟认证服务器
+
+    所有参数都可在运行时修改：
+        latency / jitter     每个请求的固定延迟和随机抖动（秒）
+        drop_rate            请求被"丢弃"的概率，被丢弃的请求挂起 stall_time 秒后断开
+        kick_interval        每隔多少秒强制踢下所有在线用户，None表示不踢
+        session_timeout      会话时长上限（秒），超过后被踢下线，None表示不限
+        upstream_ok          外网是否可用，影响 /internet
+        heartbeat_timeout    超过多少秒没有收到心跳（或登录）就踢下线，None表示不检查
+        accounts             用户名->密码，None表示接受任意账号
+        chkstatus            是否提供 /drcom/chkstatus 状态接口（较旧的服务器没有）
+    """
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, drop_rate=0.0, stall_time=30.0,
+                 kick_interval=None, session_timeout=None, upstream_ok=True, accounts=None,
+                 heartbeat_timeout=None, chkstatus=True):
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.stall_time = stall_time
+        self.kick_interval = kick_interval
+        self.session_timeout = session_timeout
+        self.upstream_ok = upstream_ok
+        self.accounts = accounts
+        self.heartbeat_timeout = heartbeat_timeout
+        self.chkstatus = chkstatus
+
+        self._lock = threading.Lock()
+        # 客户端IP -> 会话信息，和真实dr.com一样按来源地址区分在线状态
+        self.sessions = {}
+        self.counters = {}
+        # (时间戳, 事件, 客户端IP) 记录登录、注销和踢下线事件
+        self.events = []
+
+        self.httpd = ThreadingHTTPServer((host, port), PortalHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.portal = self
+        self._threads = []
+        self._stop_event = threading.Event()
+
+    @property
+    def address(self):
+        return self.httpd.server_address[:2]
+
+    @property
+    def url(self):
+        host, port = self.address
+        return f'http://{host}:{port}'
+
+    @property
+    def probe_url(self):
+        """模拟的外网探测地址，可替换DrcomClient的探测目标"""
+        return f'{self.url}/internet'
+
+    @property
+    def server(self):
+        """可直接填入Config.server的地址"""
+        host, port = self.address
+        return f'{host}:{port}'
+
+    def count(self, key):
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def _event(self, name, ip):
+        self.events.append((time.time(), name, ip))
+
+    def is_online(self, ip):
+        with self._lock:
+            session = self.sessions.get(ip)
+            if session is None:
+                return False
+            now = time.monotonic()
+            expired = self.session_timeout is not None and now - session['login_time'] >= self.session_timeout
+            idle = self.heartbeat_timeout is not None and now - session['last_seen'] >= self.heartbeat_timeout
+            if expired or idle:
+                del self.sessions[ip]
+                self._event('kick', ip)
+                return False
+            return True
+
+    def status(self, ip):
+        """chkstatus接口的返回内容"""
+        if not self.is_online(ip):
+            return {'result': 0, 'msg': '', 'v46ip': ip}
+        with self._lock:
+            session = self.sessions.get(ip) or {}
+        minutes = int((time.monotonic() - session['login_time']) // 60) if session else 0
+        return {'result': 1, 'uid': session.get('username', ''), 'time': minutes, 'flow': 0, 'v46ip': ip}
+
+    def touch(self, ip):
+        """收到心跳，刷新会话的最后活动时间"""
+        with self._lock:
+            session = self.sessions.get(ip)
+            if session is not None:
+                session['last_seen'] = time.monotonic()
+
+    def login(self, ip, username, password):
+        """处理登录请求，返回dr.com风格的结果字典"""
+        if not username:
+            return {'result': 0, 'msg': '账号不能为空'}
+        if self.accounts is not None:
+            expected = self.accounts.get(username)
+            # PC方式的密码经过了一次URL编码
+            if expected is None or expected not in (password, unquote(password)):
+                with self._lock:
+                    self._event('login_failed', ip)
+                return {'result': 0, 'msg': 'ldap auth error'}
+        with self._lock:
+            now = time.monotonic()
+            self.sessions[ip] = {'username': username, 'login_time': now, 'last_seen': now}
+            self._event('login', ip)
+        return {'result': 1, 'msg': '', 'uid': username, 'v46ip': ip, 'time': 0, 'flow': 0}
+
+    def logout(self, ip):
+        with self._lock:
+            if self.sessions.pop(ip, None) is not None:
+                self._event('logout', ip)
+
+    def kick(self, ip=None):
+        """强制踢下线，ip为None时踢下所有用户"""
+        with self._lock:
+            targets = list(self.sessions) if ip is None else [ip]
+            for target in targets:
+                if self.sessions.pop(target, None) is not None:
+                    self._event('kick', target)
+
+    def _kick_loop(self):
+        while not self._stop_event.is_set():
+            interval = self.kick_interval
+            if not interval:
+                self._stop_event.wait(0.5)
+                continue
+            if self._stop_event.wait(interval):
+                break
+            if self.kick_interval:
+                logger.info("定时踢下所有在线用户")
+                self.kick()
+
+    def start(self):
+        """在后台线程中启动服务器"""
+        for target in (self.httpd.serve_forever, self._kick_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"模拟认证服务器已启动: {self.url}")
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class FakeKeepaliveServer:
+    """模拟dr.com的UDP心跳服务，对keep_alive1/keep_alive2报文给出应答
+
+    responsive 为False时不应答，用于模拟心跳中断；
+    关联了FakePortal时，每个心跳报文都会刷新对应会话的活动时间
+    """
+    def __init__(self, host='127.0.0.1', port=0, portal=None):
+        self.portal = portal
+        self.responsive = True
+        self.counters = {}
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.settimeout(0.5)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def address(self):
+        return self.sock.getsockname()[:2]
+
+    def _count(self, key):
+        self.counters[key] = self.counters.get(key, 0) + 1
+
+    def _reply(self, data):
+        """构造应答报文：回显序号和类型，并在16-20字节放入新的尾部"""
+        if data[0] == 0xff:
+            self._count('keep_alive1')
+            return b'\x07' + b'\x00' * 39
+        packet_type = data[5] if len(data) > 5 else 1
+        self._count(f'keep_alive2_type{packet_type}')
+        reply = bytearray(40)
+        reply[0:4] = b'\x07' + data[1:2] + b'\x28\x00'
+        reply[4:6] = b'\x0b' + bytes([packet_type])
+        reply[16:20] = random.getrandbits(32).to_bytes(4, 'big')
+        return bytes(reply)
+
+    def _serve(self):
+        while not self._stop_event.is_set():
+            try:
+                data, address = self.sock.recvfrom(1024)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if not data or not self.responsive:
+                continue
+            if self.portal is not None:
+                self.portal.touch(address[0])
+            self.sock.sendto(self._reply(data), address)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        logger.info(f"模拟心跳服务已启动: {self.address[0]}:{self.address[1]}")
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(1)
+        self.sock.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='本地模拟dr.com认证服务器')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='延迟的随机抖动上限（秒）')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='请求被丢弃的概率')
+    parser.add_argument('--stall-time', type=float, default=30.0, help='被丢弃请求的挂起时间（秒）')
+    parser.add_argument('--kick-interval', type=float, help='定时踢下线的间隔（秒）')
+    parser.add_argument('--session-timeout', type=float, help='会话时长上限（秒）')
+    parser.add_argument('--no-upstream', action='store_true', help='模拟外网不可用')
+    parser.add_argument('--keepalive-port', type=int, help='同时启动UDP心跳服务的端口（dr.com为61440）')
+    parser.add_argument('--no-chkstatus', action='store_true', help='不提供 /drcom/chkstatus 状态接口')
+    parser.add_argument('--heartbeat-timeout', type=float, help='超过多少秒没有心跳就踢下线')
+    parser.add_argument('--account', action='append', default=[], metavar='用户名:密码',
+                        help='允许登录的账号，可重复指定；不指定时接受任意账号')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    accounts = dict(item.split(':', 1) for item in args.account) if args.account else None
+    portal = FakePortal(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                        drop_rate=args.drop_rate, stall_time=args.stall_time,
+                        kick_interval=args.kick_interval, session_timeout=args.session_timeout,
+                        upstream_ok=not args.no_upstream, accounts=accounts,
+                        heartbeat_timeout=args.heartbeat_timeout, chkstatus=not args.no_chkstatus)
+    portal.start()
+    keepalive = None
+    if args.keepalive_port is not None:
+        keepalive = FakeKeepaliveServer(args.host, args.keepalive_port, portal=portal).start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        portal.stop()
+        if keepalive:
+            keepalive.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
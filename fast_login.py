@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+快速重新登录模块
+把已经在该服务器上成功过的登录请求预先编译成字节模板，重新登录时只改写时间戳，
+直接写入一个保持连接的套接字，只扫描判断结果所需的字节。
+服务器明确拒绝（result为0，如密码错误）时返回False，完整流程也会得到同样的结果，不必再发一次登录请求；
+任何意外情况（非200、压缩、连接异常、找不到结果标记）都返回None，由调用方改走requests的完整流程
+"""
+
+import time
+import socket
+import logging
+import threading
+from urllib.parse import urlencode, urlsplit
+
+logger = logging.getLogger('FastLogin')
+
+# 读取响应的上限，超过后不再查找结果标记
+READ_LIMIT = 64 * 1024
+# 登录成功的标记：JSONP的result字段，或POST方式返回的注销页
+SUCCESS_MARKERS = (b'"result":1', '注销页'.encode('utf-8'), '注销页'.encode('gbk'))
+FAILURE_MARKERS = (b'"result":0',)
+# 每次在新数据前保留的字节数，跨越两次读取的标记也能找到
+MARKER_OVERLAP = max(len(marker) for marker in SUCCESS_MARKERS + FAILURE_MARKERS) - 1
+
+
+class LoginTemplate:
+    """预先编码的登录请求，timestamp_offsets 为需要改写的13位毫秒时间戳的位置"""
+    def __init__(self, data, timestamp_offsets=()):
+        self.data = bytearray(data)
+        self.timestamp_offsets = tuple(timestamp_offsets)
+
+    def render(self, timestamp=None):
+        timestamp = timestamp if timestamp is not None else int(round(time.time() * 1000))
+        value = str(timestamp).encode('ascii')
+        for offset in self.timestamp_offsets:
+            self.data[offset:offset + len(value)] = value
+        return bytes(self.data)
+
+
+def _request_bytes(method, url, headers, body=b''):
+    parts = urlsplit(url)
+    target = parts.path or '/'
+    if parts.query:
+        target += '?' + parts.query
+    lines = [f'{method} {target} HTTP/1.1', f'Host: {parts.netloc}']
+    # 不接受压缩，结果标记可以直接在原始字节中查找
+    headers = dict(headers, **{'Accept-Encoding': 'identity', 'Connection': 'keep-alive'})
+    if body:
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        headers['Content-Length'] = str(len(body))
+    lines += [f'{name}: {value}' for name, value in headers.items()]
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+
+def build_template(client, strategy):
+    """根据登录方式名称构造请求模板，不支持的方式返回None"""
+    if strategy == 'jsonp_get':
+        params = client._login_params()
+        timestamp = params['_']
+        url = f"{client.login_url}?{urlencode(params)}"
+        data = _request_bytes('GET', url, client._login_headers())
+        # 时间戳出现在callback和_两个参数中，按参数名定位，避免误改账号中的数字
+        offsets = []
+        for anchor in (f'callback=dr{timestamp}', f'&_={timestamp}'):
+            position = data.find(anchor.encode('ascii'))
+            if position < 0:
+                return None
+            offsets.append(position + len(anchor) - len(timestamp))
+        if len(timestamp) != 13:
+            return None
+        return LoginTemplate(data, offsets)
+    if strategy == 'post_form':
+        body = urlencode(client._login_post_data()).encode('ascii')
+        return LoginTemplate(_request_bytes('POST', client.login_url, client._login_headers(), body))
+    return None
+
+
+class FastLoginSender:
+    """在保持连接的套接字上发送预先编译的登录请求"""
+    def __init__(self, timeout=5, binding=None):
+        self.timeout = timeout
+        # 出口绑定（SourceBinding），与认证服务器连接池使用同一线路
+        self.binding = binding
+        self.hits = 0
+        self.fallbacks = 0
+        self.rejections = 0
+        # 最近一次被服务器拒绝时的响应正文，供调用方解析错误信息
+        self.rejection = None
+        self._key = None
+        self._template = None
+        self._address = None
+        self._sock = None
+        self._lock = threading.Lock()
+
+    def prepare(self, client, strategy):
+        """按客户端当前配置准备模板，配置或登录方式变化时重新构造，返回是否可用"""
+        parts = urlsplit(client.login_url)
+        if parts.scheme != 'http':
+            return False
+        config = client.config
+        key = (client.login_url, config.username, config.password, config.device_type, strategy)
+        with self._lock:
+            if key != self._key:
+                self._template = build_template(client, strategy)
+                self._key = key
+                address = (parts.hostname, parts.port or 80)
+                if address != self._address:
+                    self._close()
+                    self._address = address
+            return self._template is not None
+
+    def _open(self):
+        if self.binding:
+            sock = self.binding.create_connection(self._address, self.timeout)
+        else:
+            sock = socket.create_connection(self._address, timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        return sock
+
+    def connect(self):
+        """预先建立连接"""
+        with self._lock:
+            if self._sock is None and self._address is not None:
+                self._sock = self._open()
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    @staticmethod
+    def _recv(sock, size, deadline):
+        """在截止时间内读取数据，超时抛出 socket.timeout"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise socket.timeout('快速登录超过截止时间')
+        sock.settimeout(remaining)
+        return sock.recv(size)
+
+    def _read_response(self, sock, deadline):
+        """读取响应，返回 (是否成功, 连接是否可以复用, 正文)；无法判断时返回 (None, False, 正文)"""
+        buffer = bytearray()
+        while b'\r\n\r\n' not in buffer:
+            chunk = self._recv(sock, 4096, deadline)
+            if not chunk:
+                if not buffer:
+                    # 保持的连接已被服务器关闭
+                    raise ConnectionResetError('连接已被服务器关闭')
+                return None, False, b''
+            buffer += chunk
+            if len(buffer) > READ_LIMIT:
+                return None, False, b''
+        head, _, body = bytes(buffer).partition(b'\r\n\r\n')
+        lines = head.split(b'\r\n')
+        status = lines[0].split(b' ', 2)
+        if len(status) < 2 or status[1] != b'200':
+            return None, False, b''
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(b':')
+            headers[name.strip().lower()] = value.strip().lower()
+        if headers.get(b'content-encoding', b'identity') != b'identity':
+            return None, False, b''
+
+        length = headers.get(b'content-length')
+        length = int(length) if length and length.isdigit() else None
+        body = bytearray(body)
+        search_from = 0
+        while True:
+            # 只在新收到的数据及其之前 MARKER_OVERLAP 字节中查找标记
+            window = body[max(0, search_from - MARKER_OVERLAP):]
+            if any(marker in window for marker in SUCCESS_MARKERS):
+                result = True
+                break
+            if any(marker in window for marker in FAILURE_MARKERS):
+                result = False
+                break
+            if (length is not None and len(body) >= length) or len(body) > READ_LIMIT:
+                return None, False, body
+            search_from = len(body)
+            chunk = self._recv(sock, 4096, deadline)
+            if not chunk:
+                return None, False, body
+            body += chunk
+
+        # 只有完整读完正文的连接才能复用；被拒绝时也读完正文，以便取得服务器返回的错误信息
+        if status[0] == b'HTTP/1.0':
+            reusable = length is not None and headers.get(b'connection') == b'keep-alive'
+        else:
+            reusable = length is not None and headers.get(b'connection') != b'close'
+        if length is not None and (reusable or result is False):
+            while len(body) < min(length, READ_LIMIT):
+                chunk = self._recv(sock, min(4096, length - len(body)), deadline)
+                if not chunk:
+                    return result, False, body
+                body += chunk
+            reusable = reusable and len(body) >= length
+        return result, reusable, body
+
+    def send(self, timeout=None):
+        """发送登录请求，返回True表示登录成功，False表示被服务器拒绝（正文保存在 rejection 中），
+        None表示需要改走完整流程
+
+        timeout 为本次的超时（秒），为None时使用创建时指定的超时
+        """
+        timeout = timeout or self.timeout
+        with self._lock:
+            if self._template is None or self._address is None:
+                return None
+            request = self._template.render()
+            # 复用的连接可能已被服务器关闭，失败时重新建立连接再试一次
+            for attempt in range(2):
+                reused = self._sock is not None
+                try:
+                    if self._sock is None:
+                        self._sock = self._open()
+                    self._sock.settimeout(timeout)
+                    self._sock.sendall(request)
+                    result, reusable, body = self._read_response(self._sock, time.monotonic() + timeout)
+                except OSError as e:
+                    self._close()
+                    if reused and attempt == 0:
+                        continue
+                    logger.debug(f"快速登录连接失败: {str(e)}")
+                    result, reusable, body = None, False, b''
+                if not reusable:
+                    self._close()
+                break
+
+            if result:
+                self.hits += 1
+            elif result is False:
+                self.rejections += 1
+                self.rejection = bytes(body)
+            else:
+                self.fallbacks += 1
+            return result
+
+    def stats(self):
+        return {'hits': self.hits, 'fallbacks': self.fallbacks, 'rejections': self.rejections}
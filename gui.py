@@ -12,7 +12,6 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
 import webbrowser
-from PIL import Image, ImageTk, ImageFilter, ImageDraw
 from tkinter.scrolledtext import ScrolledText
 import logging
 
@@ -39,6 +38,9 @@ class ModernUI:
         if radius * 2 > min(width, height):  # 防止半径过大
             radius = min(width, height) // 2
 
+        # PIL延迟到首次绘制时才导入，缩短启动时间
+        from PIL import Image, ImageDraw
+
         image = Image.new('RGBA', (width, height), (0, 0, 0, 0))  # 透明背景
         draw = ImageDraw.Draw(image)
 
@@ -61,6 +63,7 @@ class ModernUI:
     @staticmethod
     def apply_gaussian_blur(image, radius=2):
         """应用高斯模糊效果"""
+        from PIL import ImageFilter
         return image.filter(ImageFilter.GaussianBlur(radius))
 
 
@@ -78,6 +81,8 @@ class ModernButton(tk.Canvas):
         self.text = text
         self.width = width
         self.height = height
+        # 未渲染前先用纯色矩形占位，圆角图片在窗口显示后由render()生成
+        self._rendered = False
 
         self._draw_button()
 
@@ -85,8 +90,28 @@ class ModernButton(tk.Canvas):
         self.bind("<Leave>", self.on_leave)
         self.bind("<Button-1>", self.on_click)
 
+    def render(self):
+        """生成圆角按钮图片，替换占位矩形"""
+        if not self._rendered:
+            self._rendered = True
+            self._draw_button()
+
+    def _draw_placeholder(self):
+        """绘制纯色占位按钮，不依赖PIL"""
+        self.delete("all")
+        fill = self.hover_color if getattr(self, '_hovering', False) else self.bg_color
+        self.bg_id = self.create_rectangle(0, 0, self.width, self.height, fill=fill, outline="")
+        self.text_id = self.create_text(self.width / 2, self.height / 2, text=self.text,
+                                        fill=self.text_color, font=("Microsoft YaHei UI", 10, "bold"))
+
     def _draw_button(self, current_bg_color=None):
         """绘制按钮"""
+        if not self._rendered:
+            self._draw_placeholder()
+            return
+
+        from PIL import ImageTk
+
         if current_bg_color is None:
             current_bg_color = self.bg_color
 
@@ -110,11 +135,17 @@ class ModernButton(tk.Canvas):
 
     def on_enter(self, event):
         self._hovering = True
-        self.itemconfig(self.bg_id, image=self.hover_photo)
+        if self._rendered:
+            self.itemconfig(self.bg_id, image=self.hover_photo)
+        else:
+            self.itemconfig(self.bg_id, fill=self.hover_color)
 
     def on_leave(self, event):
         self._hovering = False
-        self.itemconfig(self.bg_id, image=self.normal_photo)
+        if self._rendered:
+            self.itemconfig(self.bg_id, image=self.normal_photo)
+        else:
+            self.itemconfig(self.bg_id, fill=self.bg_color)
 
     def on_click(self, event):
         if self.command:
@@ -152,6 +183,7 @@ class LoginGUI:
         self.tray_icon = None
         self._resize_job = None
         self._card_resize_job = None
+        self._setup_finished = False
 
         self.setup_window()
 
@@ -178,6 +210,8 @@ class LoginGUI:
         if width <= 0 or height <= 0:
             return
 
+        from PIL import ImageTk
+
         base_image = ModernUI.create_rounded_rectangle(width, height, 20, CARD_BASE_COLOR)
         blurred_image = ModernUI.apply_gaussian_blur(base_image, BLUR_RADIUS)
         alpha_channel = blurred_image.split()[-1]
@@ -198,6 +232,7 @@ class LoginGUI:
         """创建系统托盘图标"""
         try:
             import pystray
+            from PIL import ImageDraw
 
             icon_size = 64
             icon_image = ModernUI.create_rounded_rectangle(icon_size, icon_size, 20, PRIMARY_COLOR)
@@ -266,9 +301,19 @@ class LoginGUI:
 
         self.create_widgets()
         self.setup_layout()
-        self.create_tray_icon()
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.setup_logging()
+        # 按钮图片和托盘图标在窗口首次绘制之后再生成
+        self.root.after_idle(lambda: self.root.after(0, self.finish_setup))
+
+    def finish_setup(self):
+        """窗口显示后再完成的初始化：渲染按钮图片、创建托盘图标"""
+        if self._setup_finished:
+            return
+        self._setup_finished = True
+        for button in (self.login_button, self.logout_button, self.save_button, self.load_button):
+            button.render()
+        self.create_tray_icon()
 
     def create_widgets(self):
         """创建GUI控件"""
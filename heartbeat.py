@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+dr.com UDP心跳模块
+按照drcom-generic中的keep_alive1/keep_alive2报文格式，定时向认证服务器的61440端口发送心跳，
+在服务器端保持会话，减少被踢下线的次数
+
+说明：
+    keep_alive2 不需要账号信息，只需本机IP，可以直接使用
+    keep_alive1 需要UDP登录过程中得到的salt和认证尾部（auth_tail），
+    只有在提供这两项时才会发送
+"""
+
+import time
+import socket
+import struct
+import hashlib
+import logging
+import threading
+from urllib.parse import urlsplit
+
+logger = logging.getLogger('Heartbeat')
+
+DRCOM_PORT = 61440
+KEEP_ALIVE_VERSION = b'\xdc\x02'
+
+
+def build_keep_alive2(number, tail, packet_type=1, first=False, host_ip='0.0.0.0',
+                      version=KEEP_ALIVE_VERSION):
+    """构造keep_alive2报文（40字节）"""
+    data = b'\x07' + bytes([number & 0xFF]) + b'\x28\x00\x0b' + bytes([packet_type])
+    data += b'\x0f\x27' if first else version
+    data += b'\x2f\x12' + b'\x00' * 6
+    data += tail
+    data += b'\x00' * 4
+    if packet_type == 3:
+        # CRC字段填0，服务器不校验
+        data += b'\x00' * 4 + socket.inet_aton(host_ip) + b'\x00' * 8
+    else:
+        data += b'\x00' * 16
+    return data
+
+
+def build_keep_alive1(salt, password, auth_tail):
+    """构造keep_alive1报文"""
+    digest = hashlib.md5(b'\x03\x01' + salt + password.encode('utf-8')).digest()
+    data = b'\xff' + digest + b'\x00\x00\x00'
+    data += auth_tail
+    data += struct.pack('!H', int(time.time()) % 0xFFFF) + b'\x00\x00\x00\x00'
+    return data
+
+
+def server_host(server):
+    """从配置中的服务器地址提取主机名"""
+    if not server.startswith('http'):
+        server = f'http://{server}'
+    return urlsplit(server).hostname
+
+
+class DrcomHeartbeat:
+    """在独立线程中运行的dr.com UDP心跳"""
+    def __init__(self, server, port=DRCOM_PORT, interval=20, timeout=3, max_failures=3,
+                 host_ip=None, salt=None, auth_tail=None, password=None, on_failure=None, binding=None):
+        self.server = server_host(server)
+        self.port = port
+        self.interval = interval
+        self.timeout = timeout
+        # 连续失败多少次后认为心跳中断并重新握手
+        self.max_failures = max_failures
+        self.host_ip = host_ip
+        self.salt = salt
+        self.auth_tail = auth_tail
+        self.password = password
+        # 心跳中断时的回调（例如立即触发一次连接检查）
+        self.on_failure = on_failure
+        # 出口绑定（SourceBinding），心跳与登录请求从同一线路发出
+        self.binding = binding
+
+        self.number = 0
+        self.tail = b'\x00' * 4
+        self.sent = 0
+        self.received = 0
+        self.failures = 0
+        self.last_success = None
+
+        self._sock = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def _open(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if self.binding:
+            try:
+                self.binding.apply(sock)
+            except OSError:
+                sock.close()
+                raise
+        sock.settimeout(self.timeout)
+        sock.connect((self.server, self.port))
+        if not self.host_ip:
+            # 连接UDP套接字后可以得到访问服务器所用的本机IP
+            self.host_ip = sock.getsockname()[0]
+        return sock
+
+    def _exchange(self, packet):
+        """发送报文并等待以0x07开头的应答"""
+        self._sock.send(packet)
+        self.sent += 1
+        while True:
+            data = self._sock.recv(1024)
+            if data and data[0] == 0x07:
+                self.received += 1
+                return data
+
+    def _build(self, number, packet_type, first=False):
+        return build_keep_alive2(number, self.tail, packet_type, first, self.host_ip)
+
+    def handshake(self):
+        """keep_alive2的三次握手，得到后续心跳使用的序号和尾部"""
+        self.number = 0
+        self.tail = b'\x00' * 4
+        data = self._exchange(self._build(self.number, 1, first=True))
+        # 服务器可能先返回一个文件报文，序号需要加一
+        if len(data) > 2 and data[2] == 0x10:
+            self.number += 1
+
+        data = self._exchange(self._build(self.number, 1))
+        self.number += 1
+        self.tail = data[16:20]
+
+        data = self._exchange(self._build(self.number, 3))
+        self.number += 1
+        self.tail = data[16:20]
+        logger.info("心跳握手完成")
+
+    def beat(self):
+        """发送一轮心跳（keep_alive2的type1和type3报文，以及可选的keep_alive1）"""
+        data = self._exchange(self._build(self.number, 1))
+        self.tail = data[16:20]
+        data = self._exchange(self._build(self.number + 1, 3))
+        self.tail = data[16:20]
+        self.number = (self.number + 2) % 0xFF
+
+        if self.salt and self.auth_tail and self.password is not None:
+            self._exchange(build_keep_alive1(self.salt, self.password, self.auth_tail))
+
+    def run(self):
+        """心跳主循环"""
+        need_handshake = True
+        while not self._stop_event.is_set():
+            try:
+                if self._sock is None:
+                    self._sock = self._open()
+                if need_handshake:
+                    self.handshake()
+                    need_handshake = False
+                self.beat()
+                self.failures = 0
+                self.last_success = time.time()
+            except (socket.timeout, OSError) as e:
+                self.failures += 1
+                logger.warning(f"心跳失败 ({self.failures}/{self.max_failures}): {str(e)}")
+                if self.failures >= self.max_failures:
+                    self.failures = 0
+                    need_handshake = True
+                    if self._sock is not None:
+                        self._sock.close()
+                        self._sock = None
+                    if self.on_failure:
+                        try:
+                            self.on_failure()
+                        except Exception as callback_error:
+                            logger.error(f"心跳失败回调异常: {str(callback_error)}")
+            self._stop_event.wait(self.interval)
+
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def start(self):
+        """在后台线程中启动心跳"""
+        if self._thread and self._thread.is_alive():
+            if not self._stop_event.is_set():
+                return
+            # 刚停止的线程可能还阻塞在接收应答上，等它退出后再启动新的线程
+            self._thread.join(self.timeout + 1)
+            if self._thread.is_alive():
+                logger.warning("上一次的心跳线程尚未退出，暂不重新启动")
+                return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, name='drcom-heartbeat', daemon=True)
+        self._thread.start()
+        logger.info(f"心跳已启动: {self.server}:{self.port}")
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop_event.is_set()
+
+    def stop(self, timeout=1):
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            'sent': self.sent,
+            'received': self.received,
+            'failures': self.failures,
+            'last_success': self.last_success,
+        }
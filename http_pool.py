@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+HTTP连接池模块
+为认证服务器和外网探测分别创建独立的requests会话：
+    - 连接池大小按用途设置，开启TCP keepalive，空闲连接不会被中间设备悄悄断开
+    - 可以预先建立连接，重新登录时直接在已打开的连接上发送请求，省去TCP握手
+    - 统计请求数、新建连接数（连接池未命中）和建立连接的耗时
+    - 可以绑定源地址或网卡，同一台机器上的多个账号各自从自己的线路发出请求
+"""
+
+import sys
+import time
+import socket
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.connection import create_connection
+
+logger = logging.getLogger('HttpPool')
+
+# 在默认选项（TCP_NODELAY）的基础上开启keepalive
+KEEPALIVE_OPTIONS = HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+if hasattr(socket, 'TCP_KEEPIDLE'):
+    # Linux：空闲30秒后开始探测，每10秒一次
+    KEEPALIVE_OPTIONS += [(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30),
+                          (socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)]
+
+# 部分Python版本的socket模块没有导出该常量，取Linux上的值
+SO_BINDTODEVICE = getattr(socket, 'SO_BINDTODEVICE', 25)
+
+
+class SourceBinding:
+    """出口绑定：请求从指定的源地址和/或网卡发出，网卡绑定仅支持Linux"""
+    def __init__(self, source_address=None, interface=None):
+        self.source_address = source_address or None
+        self.interface = interface or None
+        if self.interface and not sys.platform.startswith('linux'):
+            raise ValueError("只有Linux支持绑定网卡")
+
+    def __bool__(self):
+        return bool(self.source_address or self.interface)
+
+    def source(self):
+        """urllib3的 source_address 参数，端口由系统分配"""
+        return (self.source_address, 0) if self.source_address else None
+
+    def socket_options(self):
+        """绑定网卡的套接字选项，需要在连接之前设置"""
+        if not self.interface:
+            return []
+        return [(socket.SOL_SOCKET, SO_BINDTODEVICE, self.interface.encode('utf-8') + b'\0')]
+
+    def apply(self, sock):
+        """绑定一个尚未连接的套接字（例如UDP套接字）"""
+        for option in self.socket_options():
+            sock.setsockopt(*option)
+        if self.source_address:
+            sock.bind((self.source_address, 0))
+
+    def create_connection(self, address, timeout, socket_options=()):
+        """建立从绑定的地址或网卡发出的TCP连接"""
+        return create_connection(address, timeout, source_address=self.source(),
+                                 socket_options=list(socket_options) + self.socket_options())
+
+    def __repr__(self):
+        return f"SourceBinding(source_address={self.source_address!r}, interface={self.interface!r})"
+
+
+class PoolStats:
+    """连接池统计"""
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.connect_time = 0.0
+        self.last_connect_time = None
+        self.max_connect_time = 0.0
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_connect(self, elapsed):
+        with self._lock:
+            self.connections += 1
+            self.connect_time += elapsed
+            self.last_connect_time = elapsed
+            self.max_connect_time = max(self.max_connect_time, elapsed)
+
+    def to_dict(self):
+        with self._lock:
+            # 预先建立的连接也计入新建连接，命中数不会小于0
+            hits = max(0, self.requests - self.connections)
+            return {
+                'requests': self.requests,
+                'connections': self.connections,
+                'pool_hits': hits,
+                'hit_rate': hits / self.requests if self.requests else None,
+                'connect_time_mean': self.connect_time / self.connections if self.connections else None,
+                'connect_time_last': self.last_connect_time,
+                'connect_time_max': self.max_connect_time if self.connections else None,
+            }
+
+
+def _timed(connection_class, stats):
+    """返回统计建立连接耗时的连接类"""
+    class TimedConnection(connection_class):
+        def connect(self):
+            start = time.monotonic()
+            try:
+                super().connect()
+            finally:
+                stats.record_connect(time.monotonic() - start)
+    return TimedConnection
+
+
+class PooledAdapter(HTTPAdapter):
+    """带统计的HTTP适配器，binding 为出口绑定（SourceBinding）"""
+    def __init__(self, stats=None, keepalive=True, binding=None, **kwargs):
+        self.stats = stats or PoolStats()
+        self.keepalive = keepalive
+        self.binding = binding
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        options = list(KEEPALIVE_OPTIONS if self.keepalive else HTTPConnection.default_socket_options)
+        if self.binding:
+            options += self.binding.socket_options()
+            if self.binding.source_address:
+                pool_kwargs.setdefault('source_address', self.binding.source())
+        pool_kwargs.setdefault('socket_options', options)
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+        stats = self.stats
+
+        class TimedHTTPConnectionPool(HTTPConnectionPool):
+            ConnectionCls = _timed(HTTPConnection, stats)
+
+        class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+            ConnectionCls = _timed(HTTPSConnection, stats)
+
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+
+    def send(self, request, **kwargs):
+        self.stats.record_request()
+        return super().send(request, **kwargs)
+
+    def _pool_for(self, url, verify=True, cert=None):
+        """取得请求url时实际使用的连接池
+
+        requests 2.32起按证书校验参数区分连接池（http地址也一样），
+        直接用 connection_from_url 取到的连接池不会被之后的请求使用
+        """
+        if hasattr(self, 'get_connection_with_tls_context'):
+            request = requests.Request('GET', url).prepare()
+            return self.get_connection_with_tls_context(request, verify, cert=cert)
+        return self.get_connection(url)
+
+    def prewarm(self, url, timeout=3, verify=True, cert=None):
+        """预先建立到url所在主机的连接并放回连接池，verify 和 cert 与之后的请求一致"""
+        pool = self._pool_for(url, verify, cert)
+        # urllib3没有公开的预连接接口，借用连接池的取出/放回方法
+        conn = pool._get_conn()
+        try:
+            if conn.sock is None:
+                # 之后每次请求都会重新设置超时
+                conn.timeout = timeout
+                conn.connect()
+        except Exception:
+            conn.close()
+            raise
+        finally:
+            pool._put_conn(conn)
+
+
+def create_session(pool_maxsize=4, keepalive=True, headers=None, binding=None):
+    """创建使用独立连接池的会话，统计信息在 session.pool_stats 中
+
+    binding 为出口绑定（SourceBinding），同时保存在 session.binding 中，供非HTTP的探测使用
+    """
+    session = requests.Session()
+    adapter = PooledAdapter(keepalive=keepalive, binding=binding, pool_connections=4, pool_maxsize=pool_maxsize)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if headers:
+        session.headers.update(headers)
+    session.pool_stats = adapter.stats
+    session.binding = binding
+    return session
+
+
+def prewarm(session, urls, timeout=3):
+    """为会话预先建立到各个地址的连接，返回成功建立的数量"""
+    warmed = 0
+    for url in urls:
+        adapter = session.get_adapter(url)
+        if not isinstance(adapter, PooledAdapter):
+            continue
+        try:
+            # 与 session.request 一样合并环境变量中的证书设置（例如 REQUESTS_CA_BUNDLE）
+            settings = session.merge_environment_settings(url, {}, None, session.verify, session.cert)
+            adapter.prewarm(url, timeout, settings['verify'], settings['cert'])
+            warmed += 1
+        except Exception as e:
+            logger.debug(f"预先建立连接失败 {url}: {str(e)}")
+    return warmed
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+掉线规律学习模块
+记录每次掉线时的会话时长和时间点，从历史中找出两类规律：
+    1. 会话时长上限：掉线集中在登录后的某个时长附近 -> 在此之前主动重新登录，重置会话时长
+    2. 每天固定时段：掉线集中在一天中的某个时段 -> 在该时段开始时加密检查，尽快发现掉线
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger('KickLearner')
+
+# 一天中时段的划分粒度（秒）
+BUCKET_SECONDS = 10 * 60
+DAY_SECONDS = 24 * 60 * 60
+
+
+class KickLearner:
+    def __init__(self, path=None, max_records=500, min_samples=5, age_tolerance=0.1, age_share=0.6,
+                 bucket_share=0.25):
+        # 历史记录文件，为None时只保存在内存中
+        self.path = path
+        self.max_records = max_records
+        # 建立模型所需的最少样本数
+        self.min_samples = min_samples
+        # 会话时长落在中位数±age_tolerance范围内的样本占比达到age_share时，认为存在时长上限
+        self.age_tolerance = age_tolerance
+        self.age_share = age_share
+        # 某个时段的掉线次数占比达到bucket_share时，认为该时段容易掉线
+        self.bucket_share = bucket_share
+
+        self.records = []
+        self.login_time = None
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """从文件加载历史记录"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.records = json.load(f)[-self.max_records:]
+        except Exception as e:
+            logger.warning(f"读取掉线记录失败: {str(e)}")
+            self.records = []
+
+    def save(self):
+        """保存历史记录到文件"""
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.records, f)
+        except Exception as e:
+            logger.warning(f"保存掉线记录失败: {str(e)}")
+
+    def record_login(self, timestamp=None):
+        """记录一次新会话的开始"""
+        with self._lock:
+            self.login_time = timestamp if timestamp is not None else time.time()
+
+    def record_kick(self, timestamp=None):
+        """记录一次掉线，会话开始时间未知时只记录时间点"""
+        timestamp = timestamp if timestamp is not None else time.time()
+        with self._lock:
+            age = timestamp - self.login_time if self.login_time is not None else None
+            self.records.append({'time': timestamp, 'session_age': age})
+            self.records = self.records[-self.max_records:]
+            self.login_time = None
+        self.save()
+
+    def forget_session(self):
+        """会话开始时间不再可信时调用（例如主动重新登录失败）"""
+        with self._lock:
+            self.login_time = None
+
+    def session_age_limit(self):
+        """估计会话时长上限（秒），没有明显规律时返回None"""
+        with self._lock:
+            ages = sorted(r['session_age'] for r in self.records if r.get('session_age'))
+        if len(ages) < self.min_samples:
+            return None
+        median = ages[len(ages) // 2]
+        cluster = [age for age in ages if abs(age - median) <= median * self.age_tolerance]
+        if len(cluster) < len(ages) * self.age_share:
+            return None
+        # 取聚集区间中较早的一端，尽量在掉线之前动手
+        return cluster[int(len(cluster) * 0.1)]
+
+    def hot_buckets(self):
+        """返回容易掉线的时段（一天中的第几个时段）列表"""
+        with self._lock:
+            times = [r['time'] for r in self.records]
+        if len(times) < self.min_samples:
+            return []
+        counts = {}
+        for timestamp in times:
+            local = time.localtime(timestamp)
+            bucket = (local.tm_hour * 3600 + local.tm_min * 60 + local.tm_sec) // BUCKET_SECONDS
+            counts[bucket] = counts.get(bucket, 0) + 1
+        threshold = max(self.min_samples // 2 + 1, len(times) * self.bucket_share)
+        return sorted(bucket for bucket, count in counts.items() if count >= threshold)
+
+    def next_action(self, now=None):
+        """返回下一个预防措施 (时间戳, 动作)，动作为 'relogin' 或 'check'；没有时返回None"""
+        now = now if now is not None else time.time()
+        actions = []
+
+        limit = self.session_age_limit()
+        login_time = self.login_time
+        if limit is not None and login_time is not None:
+            # 在预计的掉线时刻之前留出余量重新登录，余量不超过时长上限的20%，避免频繁重新登录
+            lead = min(max(30, limit * 0.05), limit * 0.2)
+            actions.append((max(now, login_time + limit - lead), 'relogin'))
+
+        buckets = self.hot_buckets()
+        if buckets:
+            local = time.localtime(now)
+            seconds_today = local.tm_hour * 3600 + local.tm_min * 60 + local.tm_sec
+            day_start = now - seconds_today
+            for bucket in buckets:
+                start = day_start + bucket * BUCKET_SECONDS
+                if start <= now:
+                    start += DAY_SECONDS
+                actions.append((start, 'check'))
+
+        return min(actions) if actions else None
+
+    def summary(self):
+        """返回当前模型的概况，便于记录日志"""
+        return {
+            'records': len(self.records),
+            'session_age_limit': self.session_age_limit(),
+            'hot_buckets': [f"{b * BUCKET_SECONDS // 3600:02d}:{b * BUCKET_SECONDS % 3600 // 60:02d}"
+                            for b in self.hot_buckets()],
+        }
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+被动链路监测模块（仅Linux）
+读取 /proc/net/dev 和 /proc/net/snmp 中的计数器，不产生任何网络流量。
+被踢下线后，发出的数据得不到回应：接收计数停滞、TCP重传增加，
+只有计数器看起来可疑时才需要主动检查连接
+"""
+
+import os
+import time
+import logging
+
+logger = logging.getLogger('LinkMonitor')
+
+PROC_NET_DEV = '/proc/net/dev'
+PROC_NET_SNMP = '/proc/net/snmp'
+
+
+def read_net_dev(path=PROC_NET_DEV):
+    """读取各网卡的收发计数，返回 {网卡: {'rx_bytes', 'rx_packets', 'tx_bytes', 'tx_packets'}}"""
+    counters = {}
+    with open(path, 'r') as f:
+        # 前两行是表头
+        for line in f.readlines()[2:]:
+            name, _, data = line.partition(':')
+            fields = data.split()
+            if len(fields) < 10:
+                continue
+            counters[name.strip()] = {
+                'rx_bytes': int(fields[0]),
+                'rx_packets': int(fields[1]),
+                'tx_bytes': int(fields[8]),
+                'tx_packets': int(fields[9]),
+            }
+    return counters
+
+
+def read_tcp_snmp(path=PROC_NET_SNMP):
+    """读取TCP统计，返回 {'OutSegs': ..., 'RetransSegs': ..., ...}"""
+    with open(path, 'r') as f:
+        lines = [line.split() for line in f if line.startswith('Tcp:')]
+    if len(lines) < 2:
+        return {}
+    header, values = lines[0][1:], lines[1][1:]
+    return {key: int(value) for key, value in zip(header, values)}
+
+
+class PassiveLinkMonitor:
+    """根据计数器变化判断链路是否可疑
+
+    可疑的情况：
+        - 发出了足够多的数据包，但几乎没有收到数据包
+        - TCP重传占发送报文段的比例过高
+        - 距离上一次主动检查已超过 max_passive_time 秒（空闲时计数器无法反映掉线）
+    """
+    def __init__(self, interface=None, min_tx_packets=10, rx_ratio=0.1, min_out_segs=10,
+                 retrans_ratio=0.2, max_passive_time=120):
+        # 要监测的网卡，None表示除lo以外的所有网卡
+        self.interface = interface
+        self.min_tx_packets = min_tx_packets
+        self.rx_ratio = rx_ratio
+        self.min_out_segs = min_out_segs
+        self.retrans_ratio = retrans_ratio
+        self.max_passive_time = max_passive_time
+
+        self.last_sample = None
+        self.last_active_check = None
+
+    @staticmethod
+    def available():
+        """当前系统是否支持被动监测"""
+        return os.path.exists(PROC_NET_DEV) and os.path.exists(PROC_NET_SNMP)
+
+    def sample(self):
+        """采集一次计数器"""
+        devices = read_net_dev()
+        if self.interface:
+            names = [self.interface] if self.interface in devices else []
+        else:
+            names = [name for name in devices if name != 'lo']
+        tcp = read_tcp_snmp()
+        return {
+            'time': time.monotonic(),
+            'rx_packets': sum(devices[name]['rx_packets'] for name in names),
+            'tx_packets': sum(devices[name]['tx_packets'] for name in names),
+            'out_segs': tcp.get('OutSegs', 0),
+            'retrans_segs': tcp.get('RetransSegs', 0),
+        }
+
+    def mark_active_check(self):
+        """记录一次主动检查（无论结果如何）"""
+        self.last_active_check = time.monotonic()
+
+    def check(self):
+        """采集计数器并与上一次比较，返回 (是否可疑, 原因)"""
+        try:
+            current = self.sample()
+        except (OSError, ValueError) as e:
+            return True, f"读取计数器失败: {str(e)}"
+        previous, self.last_sample = self.last_sample, current
+
+        if self.last_active_check is None or current['time'] - self.last_active_check >= self.max_passive_time:
+            return True, '距离上次主动检查时间过长'
+        if previous is None:
+            return True, '没有基准数据'
+
+        tx = current['tx_packets'] - previous['tx_packets']
+        rx = current['rx_packets'] - previous['rx_packets']
+        if tx >= self.min_tx_packets and rx < tx * self.rx_ratio:
+            return True, f"发出 {tx} 个数据包只收到 {rx} 个"
+
+        out_segs = current['out_segs'] - previous['out_segs']
+        retrans = current['retrans_segs'] - previous['retrans_segs']
+        if out_segs >= self.min_out_segs and retrans > out_segs * self.retrans_ratio:
+            return True, f"TCP重传 {retrans}/{out_segs}"
+
+        return False, '计数器正常'
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+登录策略模块
+管理多种登录方式（POST表单、JSONP GET等），可并发竞速或按学习到的顺序尝试，
+并记住每个认证服务器上最后一次成功的登录方式；同步客户端用 run()，异步客户端用 run_async()
+"""
+
+import time
+import logging
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+logger = logging.getLogger('LoginStrategy')
+
+
+class LoginStrategy:
+    """一种登录方式，对应DrcomClient上的一个登录方法"""
+    def __init__(self, name, method, device_types=('PC', 'Mobile')):
+        self.name = name
+        # DrcomClient上的方法名，该方法返回 {'success': ..., 'message': ...}
+        self.method = method
+        # 适用的设备类型
+        self.device_types = tuple(device_types)
+
+    def applies_to(self, client):
+        return client.config.device_type in self.device_types
+
+    def attempt(self, client):
+        """执行一次登录尝试，请求异常转换为失败结果"""
+        try:
+            return getattr(client, self.method)()
+        except requests.exceptions.RequestException as e:
+            return {'success': False, 'message': f'请求异常: {str(e)}'}
+
+    async def attempt_async(self, client):
+        """异步客户端的登录尝试，client上的方法为协程"""
+        try:
+            return await getattr(client, self.method)()
+        except requests.exceptions.RequestException as e:
+            return {'success': False, 'message': f'请求异常: {str(e)}'}
+
+    def __repr__(self):
+        return f"LoginStrategy({self.name!r})"
+
+
+# 默认的登录方式，排在后面的方式的失败信息作为最终结果返回
+DEFAULT_STRATEGIES = [
+    LoginStrategy('post_form', 'login_via_post', device_types=('Mobile',)),
+    LoginStrategy('jsonp_get', 'login_via_get'),
+]
+
+
+class LoginStrategyEngine:
+    """登录策略引擎
+
+    - 有记录的服务器：先单独尝试上次成功的方式，失败后再尝试其余方式
+    - 其余方式在 race=True 时并发执行，取第一个成功的结果；否则依次尝试
+    """
+    def __init__(self, strategies=None, race=True):
+        self.strategies = list(strategies or DEFAULT_STRATEGIES)
+        self.race = race
+        # 认证服务器 -> 最后一次成功的登录方式名称
+        self.preferred = {}
+        self._lock = threading.Lock()
+
+    def _key(self, client):
+        return (client.login_url, client.config.device_type)
+
+    def candidates(self, client):
+        """返回适用于当前客户端的登录方式，上次成功的方式排在最前"""
+        strategies = [strategy for strategy in self.strategies if strategy.applies_to(client)]
+        with self._lock:
+            preferred = self.preferred.get(self._key(client))
+        strategies.sort(key=lambda strategy: strategy.name != preferred)
+        return strategies, preferred
+
+    def _remember(self, client, strategy):
+        with self._lock:
+            self.preferred[self._key(client)] = strategy.name
+
+    def _forget(self, client, strategy):
+        with self._lock:
+            if self.preferred.get(self._key(client)) == strategy.name:
+                del self.preferred[self._key(client)]
+
+    def _sequential(self, client, strategies, failures):
+        for strategy in strategies:
+            result = strategy.attempt(client)
+            if result['success']:
+                return strategy, result
+            logger.warning(f"登录方式 {strategy.name} 失败: {result['message']}")
+            failures[strategy.name] = result
+        return None, None
+
+    def _race(self, client, strategies, failures):
+        executor = ThreadPoolExecutor(max_workers=len(strategies), thread_name_prefix='login')
+        try:
+            pending = {executor.submit(strategy.attempt, client): strategy for strategy in strategies}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    strategy = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {'success': False, 'message': f'登录异常: {str(e)}'}
+                    if result['success']:
+                        return strategy, result
+                    logger.warning(f"登录方式 {strategy.name} 失败: {result['message']}")
+                    failures[strategy.name] = result
+            return None, None
+        finally:
+            # 不等待其余仍在进行的登录请求
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _sequential_async(self, client, strategies, failures):
+        for strategy in strategies:
+            result = await strategy.attempt_async(client)
+            if result['success']:
+                return strategy, result
+            logger.warning(f"登录方式 {strategy.name} 失败: {result['message']}")
+            failures[strategy.name] = result
+        return None, None
+
+    async def _race_async(self, client, strategies, failures):
+        # 只有异步客户端用到asyncio，不在模块开头导入，同步客户端启动时不加载它
+        import asyncio
+        pending = {asyncio.ensure_future(strategy.attempt_async(client)): strategy for strategy in strategies}
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    strategy = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        result = {'success': False, 'message': f'登录异常: {str(e)}'}
+                    if result['success']:
+                        return strategy, result
+                    logger.warning(f"登录方式 {strategy.name} 失败: {result['message']}")
+                    failures[strategy.name] = result
+            return None, None
+        finally:
+            # 取消其余仍在进行的登录请求
+            for task in pending:
+                task.cancel()
+
+    def run(self, client):
+        """执行登录，返回第一个成功的结果；全部失败时返回最后一种方式的失败结果"""
+        strategies, preferred = self.candidates(client)
+        if not strategies:
+            return {'success': False, 'message': f'没有适用于 {client.config.device_type} 的登录方式'}
+
+        start = time.monotonic()
+        failures = {}
+        winner, result = None, None
+        remaining = strategies
+        if preferred and strategies[0].name == preferred:
+            # 先尝试上次成功的方式
+            winner, result = self._sequential(client, strategies[:1], failures)
+            if winner is None:
+                self._forget(client, strategies[0])
+            remaining = strategies[1:]
+
+        if winner is None and remaining:
+            if self.race and len(remaining) > 1:
+                winner, result = self._race(client, remaining, failures)
+            else:
+                winner, result = self._sequential(client, remaining, failures)
+        return self._finish(client, strategies, winner, result, failures, start)
+
+    async def run_async(self, client):
+        """run() 的异步版本，供异步客户端在事件循环中执行，竞速时不使用线程"""
+        strategies, preferred = self.candidates(client)
+        if not strategies:
+            return {'success': False, 'message': f'没有适用于 {client.config.device_type} 的登录方式'}
+
+        start = time.monotonic()
+        failures = {}
+        winner, result = None, None
+        remaining = strategies
+        if preferred and strategies[0].name == preferred:
+            winner, result = await self._sequential_async(client, strategies[:1], failures)
+            if winner is None:
+                self._forget(client, strategies[0])
+            remaining = strategies[1:]
+
+        if winner is None and remaining:
+            if self.race and len(remaining) > 1:
+                winner, result = await self._race_async(client, remaining, failures)
+            else:
+                winner, result = await self._sequential_async(client, remaining, failures)
+        return self._finish(client, strategies, winner, result, failures, start)
+
+    def _finish(self, client, strategies, winner, result, failures, start):
+        """记录成功的方式并返回最终结果"""
+        if winner is not None:
+            self._remember(client, winner)
+            logger.info(f"登录方式 {winner.name} 成功，耗时 {time.monotonic() - start:.2f}s")
+            return result
+
+        # 全部失败：按策略列表顺序返回最后一种方式的失败信息
+        for strategy in reversed(strategies):
+            if strategy.name in failures:
+                return failures[strategy.name]
+        return {'success': False, 'message': '登录失败'}
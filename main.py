@@ -8,44 +8,66 @@
 
 import os
 import sys
-import time
-import threading
-import tkinter as tk
-from tkinter import messagebox
 import logging
+import threading
 
-from gui import LoginGUI
-from drcom import DrcomClient
 from config import Config
+from supervisor import ConnectionSupervisor
 
 
 class DrcomApp:
     def __init__(self):
+        # GUI相关模块只在图形界面模式下导入，守护进程模式不依赖它们
+        import tkinter as tk
+        from gui import LoginGUI
+
         self.config = Config()
         self.root = tk.Tk()
         self.root.withdraw()  # 先隐藏主窗口
-        self.client = DrcomClient(self.config)
         self.gui = LoginGUI(self.root, self.config, self.login_callback, self.logout_callback, self.save_config_callback)
+        # 登录客户端需要导入requests，在窗口显示后才创建
+        self.client = None
+        self.supervisor = None
+        self.status_server = None
+        self._backend_lock = threading.Lock()
         
         # GUI创建后，日志处理器已设置，发送一条初始日志
         logging.info("应用程序已启动")
         
-        self.login_thread = None
-        self.check_thread = None
-        self.running = False
-        
+    def init_backend(self):
+        """创建登录客户端和连接守护对象（只创建一次）"""
+        with self._backend_lock:
+            if self.supervisor is None:
+                from drcom import DrcomClient
+                self.client = DrcomClient(self.config)
+                # 登录、注销和断线重连由守护对象负责
+                self.supervisor = ConnectionSupervisor(self.client, on_state_change=self.gui.set_login_state)
+                # 可选的本地状态接口，其他程序从这里读取连接状态
+                from status_api import start_status_server
+                self.status_server = start_status_server(self.supervisor, self.config.status_port,
+                                                         self.config.status_socket)
+        return self.supervisor
+    
     def start(self):
         """启动应用"""
         # 检查是否有保存的配置
-        if self.config.load_config():
-            # 如果设置了自动登录，则自动登录
-            if self.config.auto_login:
-                self.start_login_thread()
+        self.config.load_config()
         
-        # 显示GUI
+        # 先显示GUI，网络相关模块在后台线程中加载
         self.gui.show()
+        threading.Thread(target=self.start_backend, daemon=True).start()
         self.root.mainloop()
     
+    def start_backend(self):
+        """后台初始化登录客户端，并按配置自动登录"""
+        try:
+            self.init_backend()
+            # 如果设置了自动登录，则自动登录
+            if self.config.auto_login:
+                self.start_login_thread()
+        except Exception as e:
+            logging.error(f"初始化登录客户端失败: {str(e)}")
+    
     def login_callback(self, username, password, server, auto_login, auto_start, device_type):
         """登录回调函数"""
         self.config.username = username
@@ -60,51 +82,12 @@ class DrcomApp:
     
     def start_login_thread(self):
         """启动登录线程"""
-        if self.login_thread and self.login_thread.is_alive():
-            return
-            
-        self.running = True
-        self.login_thread = threading.Thread(target=self.login_task)
-        self.login_thread.daemon = True
-        self.login_thread.start()
-        
-        # 启动状态检查线程
-        if not self.check_thread or not self.check_thread.is_alive():
-            self.check_thread = threading.Thread(target=self.check_connection_task)
-            self.check_thread.daemon = True
-            self.check_thread.start()
-    
-    def login_task(self):
-        """登录任务"""
-        try:
-            logging.info("正在登录...")
-            result = self.client.login()
-            if result['success']:
-                logging.info(f"登录成功: {result['message']}")
-                self.gui.set_login_state(True)
-            else:
-                logging.error(f"登录失败: {result['message']}")
-                self.gui.set_login_state(False)
-                # messagebox.showerror("登录失败", result['message']) # 错误信息将显示在日志框中
-        except Exception as e:
-            logging.error(f"登录异常: {str(e)}")
-            self.gui.set_login_state(False)
-            # messagebox.showerror("登录异常", str(e)) # 异常信息将显示在日志框中
+        self.init_backend().start_login_thread()
     
     def logout_callback(self):
         """注销回调函数"""
-        try:
-            logging.info("正在注销...")
-            result = self.client.logout()
-            if result['success']:
-                logging.info(f"注销成功: {result['message']}")
-                self.gui.set_login_state(False)
-            else:
-                logging.error(f"注销失败: {result['message']}")
-                # messagebox.showerror("注销失败", result['message']) # 错误信息将显示在日志框中
-        except Exception as e:
-            logging.error(f"注销异常: {str(e)}")
-            # messagebox.showerror("注销异常", str(e)) # 异常信息将显示在日志框中
+        self.init_backend().logout_task()
+        # 注销失败的信息将显示在日志框中
     
     def save_config_callback(self, username, password, server, auto_login, auto_start, device_type):
         """保存配置回调函数"""
@@ -121,31 +104,22 @@ class DrcomApp:
             logging.error("保存配置失败")
             # messagebox.showerror("保存失败", "保存配置失败") # 错误信息将显示在日志框中
     
-    def check_connection_task(self):
-        """检查网络连接状态任务"""
-        while self.running:
-            try:
-                # 每30秒检查一次连接状态
-                time.sleep(30)
-                if not self.client.is_connected():
-                    logging.warning("连接已断开，尝试重新登录...")
-                    self.login_task()
-                else:
-                    logging.info("连接正常")
-            except Exception as e:
-                logging.error(f"检查连接异常: {str(e)}")
-    
     def exit(self):
         """退出应用"""
-        self.running = False
-        if self.login_thread and self.login_thread.is_alive():
-            self.login_thread.join(1)
-        if self.check_thread and self.check_thread.is_alive():
-            self.check_thread.join(1)
+        if self.status_server:
+            self.status_server.stop()
+        if self.supervisor:
+            self.supervisor.stop()
         self.root.destroy()
 
 
 def main():
+    # 无界面守护进程模式，不导入tkinter、PIL和pystray
+    if '--daemon' in sys.argv[1:]:
+        import drcomd
+        argv = [arg for arg in sys.argv[1:] if arg != '--daemon']
+        sys.exit(drcomd.main(argv))
+
     # 创建应用实例
     app = DrcomApp()
     
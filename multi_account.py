@@ -0,0 +1,388 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+多账号守护模块
+一台网关同时为多个账号保持登录，每个账号的请求从各自的源地址或网卡发出：
+    - 所有账号共用一个调度线程和一个大小固定的工作线程池，线程数与账号数量无关
+    - 休眠唤醒检测和链路事件监听只有一份，事件发生时只检查受影响的账号
+    - 全局限制登录速率（令牌桶），大量账号同时掉线时不会一起涌向认证服务器
+
+每个账号只保留客户端对象和少量状态，连接池在第一次请求时才建立；
+为节省线程，多账号模式不启动UDP心跳、被动链路监测和掉线规律学习
+
+账号配置文件格式（每个Config元素与单账号配置文件的内容相同）:
+    <Accounts>
+        <Config name="lab1">
+            <username>账号1</username>
+            <password>密码1</password>
+            <server>172.31.255.1</server>
+            <bind_address>10.0.1.2</bind_address>
+        </Config>
+        <Config name="lab2">
+            <username>账号2</username>
+            <password>密码2</password>
+            <server>172.31.255.1</server>
+            <bind_interface>eth2</bind_interface>
+        </Config>
+    </Accounts>
+"""
+
+import time
+import heapq
+import logging
+import itertools
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+from drcom import DrcomClient
+from scheduler import AdaptiveScheduler
+from netlink_events import NetlinkListener
+from resume_watch import ResumeDetector
+from connection_state import ConnectionStateMachine, ONLINE
+
+logger = logging.getLogger('MultiAccount')
+
+
+def load_profiles(path):
+    """读取多账号配置文件，返回 [(名称, Config)]，名称默认为账号"""
+    root = ET.parse(path).getroot()
+    profiles = []
+    names = set()
+    for element in root.findall('Config'):
+        config = Config()
+        config.config_file = path
+        config.load_element(element)
+        if not config.username:
+            logger.warning("忽略没有账号的配置项")
+            continue
+        name = element.get('name') or config.username
+        if name in names:
+            raise ValueError(f"账号名称重复: {name}")
+        names.add(name)
+        profiles.append((name, config))
+    return profiles
+
+
+class LoginRateLimiter:
+    """令牌桶：平均每秒最多 rate 次登录，允许 burst 次突发
+
+    令牌不足时预约之后的令牌（令牌数可以为负），每个调用者得到各自的登录时刻，
+    大量账号同时掉线时按顺序依次登录，而不是在同一时刻一起重试
+    """
+    def __init__(self, rate=1.0, burst=3):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        # 因限速被推迟的登录次数
+        self.delayed = 0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """预约一个令牌，返回需要等待多少秒后才能登录（0表示可以立即登录）"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            self.delayed += 1
+            return -self.tokens / self.rate
+
+    def acquire(self):
+        """阻塞到预约的时刻，只用于用户发起的登录，工作线程中使用 reserve()"""
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+
+    def stats(self):
+        with self._lock:
+            tokens = min(self.burst, self.tokens + (time.monotonic() - self.updated) * self.rate)
+            return {'rate': self.rate, 'burst': self.burst, 'tokens': tokens, 'delayed': self.delayed}
+
+
+class Account:
+    """一个账号的客户端、检查间隔和登录状态
+
+    client_factory 用配置创建客户端，默认为 DrcomClient
+    """
+    def __init__(self, name, config, client_factory=DrcomClient):
+        self.name = name
+        self.client = client_factory(config)
+        # 只用来计算检查间隔和统计耗时，等待由多账号守护的调度线程统一进行
+        self.scheduler = AdaptiveScheduler()
+        self.state_machine = ConnectionStateMachine()
+        # 用户主动注销后不再自动重新登录
+        self.user_logged_out = False
+        # 发现掉线后已预约了登录时刻，到时间直接登录
+        self.login_reserved = False
+        self.warmed = False
+        self.last_login_time = None
+        self.last_check_time = None
+        self.kicks = 0
+
+        # 以下字段由调度线程在持有条件锁时修改
+        # 检查任务是否已提交到线程池
+        self.busy = False
+        # 检查进行中又被要求立即检查，完成后马上再检查一次
+        self.wake_pending = False
+        # 调度队列中只有代数与此相同的项有效，重新调度时旧的项自动作废
+        self.generation = 0
+
+    def status(self):
+        """账号当前状态"""
+        probe = self.client.last_probe
+        binding = self.client.binding
+        state = self.state_machine.state
+        return {
+            'name': self.name,
+            'username': self.client.config.username,
+            'state': state,
+            'online': state == ONLINE,
+            'user_logged_out': self.user_logged_out,
+            'bind_address': binding.source_address,
+            'bind_interface': binding.interface,
+            'last_probe_rtt': probe.rtt if probe is not None and probe.success else None,
+            'last_probe_target': probe.target if probe is not None else None,
+            'last_check_time': self.last_check_time,
+            'last_login_time': self.last_login_time,
+            'kicks': self.kicks,
+            'breaker': self.client.breaker.state,
+        }
+
+
+class MultiAccountSupervisor:
+    def __init__(self, profiles, max_workers=4, login_rate=1.0, login_burst=3, link_events=True,
+                 client_factory=DrcomClient):
+        self.accounts = {}
+        for name, config in profiles:
+            self.accounts[name] = Account(name, config, client_factory)
+            if getattr(config, 'heartbeat', False):
+                logger.warning(f"[{name}] 多账号模式不启动UDP心跳")
+        self.max_workers = max_workers
+        # 所有账号共享的登录速率限制
+        self.limiter = LoginRateLimiter(login_rate, login_burst)
+
+        self.executor = None
+        self.thread = None
+        self.running = False
+        # 调度队列：(到期时刻, 序号, 代数, 账号)
+        self._queue = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+        # 休眠唤醒和链路事件只监听一份，由各账号共享
+        self.resume_detector = ResumeDetector(self.notify_resume, on_clock_jump=self.on_clock_jump)
+        self.link_events = None
+        if link_events and NetlinkListener.available():
+            self.link_events = NetlinkListener(self.on_link_online)
+
+    def _schedule(self, account, delay):
+        """在持有条件锁时调用：delay 秒后检查账号"""
+        account.generation += 1
+        heapq.heappush(self._queue, (time.monotonic() + delay, next(self._sequence), account.generation, account))
+        self._condition.notify()
+
+    def check_now(self, names=None):
+        """立即检查指定的账号（默认全部），掉线的账号马上重新登录"""
+        accounts = [self.accounts[name] for name in names] if names is not None else list(self.accounts.values())
+        for account in accounts:
+            account.client.invalidate_status()
+            account.scheduler.expect_disconnect()
+        with self._condition:
+            for account in accounts:
+                if account.busy:
+                    account.wake_pending = True
+                else:
+                    self._schedule(account, 0)
+
+    def on_link_online(self, event):
+        """网卡恢复或获得新地址：检查绑定在该网卡上的账号和没有绑定网卡的账号"""
+        names = [name for name, account in self.accounts.items()
+                 if not event.ifname or account.client.binding.interface in (None, event.ifname)]
+        logger.info(f"检测到链路变化 ({event.ifname or event.index})，立即检查 {len(names)} 个账号")
+        self.check_now(names)
+
+    def notify_resume(self, slept=None):
+        """系统从休眠中恢复，立即检查所有账号"""
+        logger.info("系统从休眠中恢复，立即检查所有账号")
+        self.check_now()
+
+    def on_clock_jump(self, offset):
+        """调度使用单调时钟，系统时间跳变不影响检查间隔"""
+
+    def start(self):
+        """启动调度线程和工作线程池"""
+        if self.running:
+            return
+        self.running = True
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='account')
+        with self._condition:
+            for account in self.accounts.values():
+                self._schedule(account, 0)
+        self.thread = threading.Thread(target=self._loop, name='account-scheduler')
+        self.thread.daemon = True
+        self.thread.start()
+
+        self.resume_detector.start()
+        if self.link_events:
+            try:
+                self.link_events.start()
+            except OSError as e:
+                logger.warning(f"无法监听链路事件: {str(e)}")
+                self.link_events = None
+
+    def _loop(self):
+        """调度线程：把到期的账号交给线程池检查"""
+        with self._condition:
+            while self.running:
+                now = time.monotonic()
+                while self._queue and self._queue[0][0] <= now:
+                    _, _, generation, account = heapq.heappop(self._queue)
+                    if generation != account.generation or account.busy:
+                        continue
+                    account.busy = True
+                    self.executor.submit(self._run, account)
+                timeout = self._queue[0][0] - now if self._queue else None
+                self._condition.wait(timeout)
+
+    def _run(self, account):
+        """在工作线程中检查一个账号，完成后按返回的等待时间重新调度"""
+        delay = None
+        try:
+            delay = self._check(account)
+        except Exception as e:
+            logger.error(f"[{account.name}] 检查连接异常: {str(e)}")
+        finally:
+            if delay is None:
+                delay = account.scheduler.next_interval()
+            with self._condition:
+                account.busy = False
+                if account.wake_pending:
+                    account.wake_pending = False
+                    delay = 0
+                if self.running:
+                    self._schedule(account, delay)
+
+    def _check(self, account):
+        """检查连接，掉线时重新登录；返回下一次检查前的等待秒数，为None时由账号的调度器决定"""
+        if not account.warmed:
+            account.warmed = True
+            try:
+                account.client.warm_up()
+            except Exception as e:
+                logger.debug(f"[{account.name}] 预先建立连接失败: {str(e)}")
+
+        if account.login_reserved:
+            account.login_reserved = False
+        else:
+            # 用户发起的登录或注销正在进行，结束后再检查
+            if account.state_machine.is_busy():
+                return None
+            connected = account.client.is_connected(max_age=0)
+            account.last_check_time = time.time()
+            if connected:
+                account.scheduler.record_ok()
+                account.state_machine.mark_online()
+                return None
+            if account.user_logged_out:
+                # 用户主动注销后的离线不是掉线：不计入被踢和检测耗时，也不进入频繁检查
+                return account.scheduler.idle_interval()
+            account.scheduler.record_disconnect()
+            if account.state_machine.mark_kicked():
+                account.kicks += 1
+            logger.warning(f"[{account.name}] 连接已断开，尝试重新登录...")
+            # 超过全局登录速率时不占用工作线程等待，到预约的时刻再调度
+            wait = self.limiter.reserve()
+            if wait:
+                logger.debug(f"[{account.name}] 登录限速，{wait:.1f}s 后登录")
+                account.login_reserved = True
+                return wait
+
+        if account.user_logged_out:
+            return None
+        account.state_machine.login(lambda: self._login_once(account))
+        return None
+
+    def _login_once(self, account):
+        try:
+            result = account.client.login()
+        except Exception as e:
+            result = {'success': False, 'message': f'登录异常: {str(e)}'}
+        if result['success']:
+            logger.info(f"[{account.name}] 登录成功: {result['message']}")
+            if result['message'] != '已经登录':
+                account.last_login_time = time.time()
+            account.scheduler.record_login()
+        else:
+            logger.error(f"[{account.name}] 登录失败: {result['message']}")
+            account.scheduler.record_portal_failure()
+        return result
+
+    def login(self, name):
+        """用户发起的登录，受全局登录速率限制"""
+        account = self.accounts[name]
+        account.user_logged_out = False
+        self.limiter.acquire()
+        result = account.state_machine.login(lambda: self._login_once(account))
+        if result['success']:
+            # 按频繁检查阶段重新计时
+            self.check_now([name])
+        return result
+
+    def logout(self, name):
+        """用户发起的注销，之后不再自动重新登录该账号"""
+        account = self.accounts[name]
+        was_logged_out, account.user_logged_out = account.user_logged_out, True
+
+        def attempt():
+            try:
+                return account.client.logout()
+            except Exception as e:
+                return {'success': False, 'message': f'注销异常: {str(e)}'}
+
+        result = account.state_machine.logout(attempt)
+        if result['success']:
+            logger.info(f"[{name}] 注销成功: {result['message']}")
+            account.scheduler.record_logout()
+        else:
+            account.user_logged_out = was_logged_out
+            logger.error(f"[{name}] 注销失败: {result['message']}")
+        return result
+
+    def logout_all(self):
+        """注销所有账号，返回 {名称: 结果}"""
+        return {name: self.logout(name) for name in self.accounts}
+
+    def status(self):
+        """所有账号的当前状态"""
+        return [account.status() for account in self.accounts.values()]
+
+    def stats(self):
+        return {
+            'accounts': len(self.accounts),
+            'workers': self.max_workers,
+            'threads': threading.active_count(),
+            'login_limiter': self.limiter.stats(),
+        }
+
+    def stop(self, timeout=1):
+        """停止调度线程和工作线程池，关闭各账号的连接"""
+        with self._condition:
+            self.running = False
+            self._queue = []
+            self._condition.notify_all()
+        if self.link_events:
+            self.link_events.stop(timeout)
+        self.resume_detector.stop(timeout)
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout)
+        if self.executor:
+            # 不等待进行中的检查，它们会在各自的超时后结束
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        for account in self.accounts.values():
+            account.client.close()
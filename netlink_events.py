@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+链路事件监听模块（仅Linux）
+通过rtnetlink订阅网卡状态（RTMGRP_LINK）和IPv4地址（RTMGRP_IPV4_IFADDR）变化，
+网线重新插上、无线重新连接或DHCP续租时立即通知，无需等待下一次定时检查
+
+可以在网络命名空间中用veth网卡对测试：
+    ip netns add drcomtest
+    ip netns exec drcomtest python netlink_events.py
+    # 另一个终端
+    ip netns exec drcomtest ip link add d0 type veth peer name d1
+    ip netns exec drcomtest ip link set d1 up
+    ip netns exec drcomtest ip link set d0 up
+    ip netns exec drcomtest ip addr add 10.0.0.2/24 dev d0
+"""
+
+import sys
+import socket
+import struct
+import logging
+import threading
+
+logger = logging.getLogger('NetlinkEvents')
+
+# rtnetlink多播组
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+
+# 消息类型
+NLMSG_DONE = 3
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_NEWADDR = 20
+RTM_DELADDR = 21
+
+# 网卡标志
+IFF_UP = 0x1
+IFF_LOOPBACK = 0x8
+IFF_RUNNING = 0x40
+
+# 属性类型
+IFLA_IFNAME = 3
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+IFA_LABEL = 3
+
+NLMSG_HEADER = struct.Struct('=LHHLL')
+IFINFO_MSG = struct.Struct('=BxHiII')
+IFADDR_MSG = struct.Struct('=BBBBI')
+RT_ATTR = struct.Struct('=HH')
+
+
+class LinkEvent:
+    """一次链路或地址变化"""
+    def __init__(self, kind, action, index, ifname=None, up=None, address=None):
+        # kind: 'link' 或 'addr'；action: 'new' 或 'del'
+        self.kind = kind
+        self.action = action
+        self.index = index
+        self.ifname = ifname
+        # 网卡是否处于UP且RUNNING状态（仅link事件）
+        self.up = up
+        # IPv4地址（仅addr事件）
+        self.address = address
+
+    def __repr__(self):
+        return (f"LinkEvent(kind={self.kind!r}, action={self.action!r}, ifname={self.ifname!r}, "
+                f"up={self.up!r}, address={self.address!r})")
+
+
+def _parse_attrs(data):
+    """解析rtattr列表，返回 {类型: 值字节}"""
+    attrs = {}
+    offset = 0
+    while offset + RT_ATTR.size <= len(data):
+        length, attr_type = RT_ATTR.unpack_from(data, offset)
+        if length < RT_ATTR.size:
+            break
+        attrs[attr_type] = data[offset + RT_ATTR.size:offset + length]
+        offset += (length + 3) & ~3
+    return attrs
+
+
+def _cstring(value):
+    return value.split(b'\x00', 1)[0].decode('utf-8', 'replace') if value else None
+
+
+def parse_messages(data):
+    """解析一次recv得到的netlink数据，返回LinkEvent列表"""
+    events = []
+    offset = 0
+    while offset + NLMSG_HEADER.size <= len(data):
+        length, msg_type, _, _, _ = NLMSG_HEADER.unpack_from(data, offset)
+        if length < NLMSG_HEADER.size:
+            break
+        body = data[offset + NLMSG_HEADER.size:offset + length]
+        offset += (length + 3) & ~3
+
+        if msg_type in (RTM_NEWLINK, RTM_DELLINK) and len(body) >= IFINFO_MSG.size:
+            _, _, index, flags, _ = IFINFO_MSG.unpack_from(body)
+            if flags & IFF_LOOPBACK:
+                continue
+            attrs = _parse_attrs(body[IFINFO_MSG.size:])
+            up = msg_type == RTM_NEWLINK and bool(flags & IFF_UP) and bool(flags & IFF_RUNNING)
+            events.append(LinkEvent('link', 'new' if msg_type == RTM_NEWLINK else 'del', index,
+                                    _cstring(attrs.get(IFLA_IFNAME)), up=up))
+        elif msg_type in (RTM_NEWADDR, RTM_DELADDR) and len(body) >= IFADDR_MSG.size:
+            family, _, _, scope, index = IFADDR_MSG.unpack_from(body)
+            if family != socket.AF_INET:
+                continue
+            attrs = _parse_attrs(body[IFADDR_MSG.size:])
+            raw = attrs.get(IFA_LOCAL) or attrs.get(IFA_ADDRESS)
+            address = socket.inet_ntoa(raw) if raw and len(raw) == 4 else None
+            # 忽略127.0.0.0/8等主机范围的地址
+            if address is None or address.startswith('127.'):
+                continue
+            events.append(LinkEvent('addr', 'new' if msg_type == RTM_NEWADDR else 'del', index,
+                                    _cstring(attrs.get(IFA_LABEL)), address=address))
+        elif msg_type == NLMSG_DONE:
+            break
+    return events
+
+
+class NetlinkListener:
+    """在后台线程中监听rtnetlink事件
+
+    只在网卡从不可用变为可用、或新增IPv4地址时调用 on_online(event)，
+    其余事件交给可选的 on_event(event)
+    """
+    def __init__(self, on_online, on_event=None, interface=None):
+        self.on_online = on_online
+        self.on_event = on_event
+        # 只关注指定网卡，None表示全部
+        self.interface = interface
+        self._link_up = {}
+        self._names = {}
+        self._sock = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    @staticmethod
+    def available():
+        return hasattr(socket, 'AF_NETLINK')
+
+    def _open(self):
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+        sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR))
+        sock.settimeout(0.5)
+        return sock
+
+    def handle(self, event):
+        """处理一个事件，返回是否触发了 on_online"""
+        if event.ifname:
+            self._names[event.index] = event.ifname
+        else:
+            event.ifname = self._names.get(event.index)
+        if self.interface and event.ifname and event.ifname != self.interface:
+            return False
+
+        if self.on_event:
+            self.on_event(event)
+
+        online = False
+        if event.kind == 'link':
+            was_up = self._link_up.get(event.index, False)
+            self._link_up[event.index] = event.up
+            online = event.up and not was_up
+        elif event.kind == 'addr' and event.action == 'new':
+            online = True
+
+        if online:
+            logger.info(f"链路恢复: {event}")
+            self.on_online(event)
+        return online
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                data = self._sock.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                if not self._stop_event.is_set():
+                    logger.error(f"读取netlink事件失败: {str(e)}")
+                break
+            for event in parse_messages(data):
+                try:
+                    self.handle(event)
+                except Exception as e:
+                    logger.error(f"处理链路事件异常: {str(e)}")
+
+    def start(self):
+        """打开netlink套接字并启动监听线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._sock = self._open()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, name='netlink-events', daemon=True)
+        self._thread.start()
+        logger.info("链路事件监听已启动")
+
+    def stop(self, timeout=1):
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout)
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+def main():
+    """打印收到的链路事件，用于手动测试"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    listener = NetlinkListener(on_online=lambda event: print(f"ONLINE {event}", flush=True),
+                               on_event=lambda event: print(f"EVENT  {event}", flush=True),
+                               interface=sys.argv[1] if len(sys.argv) > 1 else None)
+    listener.start()
+    try:
+        while True:
+            listener._stop_event.wait(3600)
+    except KeyboardInterrupt:
+        listener.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+dr.com认证服务器响应解析模块
+解析JSONP登录/注销结果和HTML状态页（注销页中的 time='..';flow='..' 等脚本变量），
+返回统一的 PortalReply 对象。直接在原始字节上匹配字段，只解码字段值，不复制整个响应正文
+"""
+
+import re
+import json
+
+# JSONP中的 "字段":值，值为字符串、数字、null或布尔值
+JSONP_FIELD = re.compile(rb'"(\w+)"\s*:\s*("(?:[^"\\]|\\.)*"|-?\d+(?:\.\d+)?|null|true|false)')
+# HTML状态页脚本中的 字段='值' 或 字段=数字
+SCRIPT_FIELD = re.compile(rb"\b(\w+)\s*=\s*(?:'([^'\r\n]*)'|(-?\d+)\s*;)")
+TITLE = re.compile(rb'<title>(.*?)</title>', re.I | re.S)
+
+# 按整数解析的字段（time为已用时长（分钟），flow为已用流量（KB），以服务器返回为准）
+INT_FIELDS = ('result', 'ret_code', 'time', 'flow', 'fee')
+
+
+def _decode(raw, encodings=()):
+    for encoding in tuple(encodings) + ('utf-8', 'gbk'):
+        if not encoding:
+            continue
+        try:
+            return raw.decode(encoding)
+        except (LookupError, UnicodeDecodeError):
+            continue
+    return raw.decode('utf-8', 'replace')
+
+
+def _to_int(value):
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    value = value.strip()
+    return int(value) if value.lstrip('-').isdigit() else None
+
+
+class PortalReply:
+    """认证服务器的一次响应"""
+    def __init__(self, kind, fields=None, title=None):
+        # 'jsonp' 或 'html'
+        self.kind = kind
+        self.fields = fields or {}
+        self.title = title
+
+    def _int(self, name):
+        return _to_int(self.fields.get(name))
+
+    def _str(self, name):
+        value = self.fields.get(name)
+        return value.strip() if isinstance(value, str) and value.strip() else None
+
+    @property
+    def result(self):
+        """结果码，1表示成功，0表示失败，没有该字段时为None"""
+        return self._int('result')
+
+    @property
+    def ret_code(self):
+        """失败原因代码"""
+        return self._int('ret_code')
+
+    @property
+    def message(self):
+        """服务器给出的提示信息，msga优先"""
+        return self._str('msga') or self._str('msg')
+
+    @property
+    def uid(self):
+        return self._str('uid')
+
+    @property
+    def v4ip(self):
+        return self._str('v4ip') or self._str('v46ip')
+
+    @property
+    def v6ip(self):
+        return self._str('v6ip')
+
+    @property
+    def flow(self):
+        return self._int('flow')
+
+    @property
+    def time(self):
+        return self._int('time')
+
+    @property
+    def logged_in(self):
+        """HTML状态页：标题为"注销页"表示已登录"""
+        return self.title == '注销页'
+
+    @property
+    def success(self):
+        if self.result is not None:
+            return self.result == 1
+        return self.logged_in
+
+    def to_dict(self):
+        return {
+            'kind': self.kind,
+            'result': self.result,
+            'ret_code': self.ret_code,
+            'message': self.message,
+            'uid': self.uid,
+            'v4ip': self.v4ip,
+            'v6ip': self.v6ip,
+            'flow': self.flow,
+            'time': self.time,
+            'title': self.title,
+        }
+
+    def __repr__(self):
+        return f"PortalReply({self.kind!r}, result={self.result!r}, message={self.message!r}, title={self.title!r})"
+
+
+def parse_jsonp(data, encodings=()):
+    """解析JSONP或JSON响应，如 dr1003({"result":1,"msg":"",...})"""
+    fields = {}
+    for match in JSONP_FIELD.finditer(data):
+        value = match.group(2)
+        if value.startswith(b'"'):
+            try:
+                value = json.loads(_decode(value, encodings))
+            except ValueError:
+                value = _decode(value[1:-1], encodings)
+        else:
+            value = json.loads(value)
+        fields[match.group(1).decode('ascii')] = value
+    return PortalReply('jsonp', fields)
+
+
+def parse_html(data, encodings=()):
+    """解析HTML状态页，提取标题和脚本中的变量"""
+    match = TITLE.search(data)
+    title = _decode(match.group(1).strip(), encodings) if match else None
+    fields = {}
+    for match in SCRIPT_FIELD.finditer(data):
+        name = match.group(1).decode('ascii')
+        if match.group(2) is not None:
+            fields.setdefault(name, _decode(match.group(2), encodings))
+        else:
+            fields.setdefault(name, int(match.group(3)))
+    return PortalReply('html', fields, title)
+
+
+def parse_reply(data, encodings=()):
+    """根据内容判断响应类型并解析；data为bytes，encodings为优先尝试的编码"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    head = data[:512].lstrip().lower()
+    if head.startswith(b'<') or b'<html' in head or b'<title' in head:
+        return parse_html(data, encodings)
+    return parse_jsonp(data, encodings)
+
+
+def declared_encodings(response):
+    """响应头声明的编码，没有声明时返回空元组"""
+    if 'charset' in response.headers.get('content-type', '').lower() and response.encoding:
+        return (response.encoding,)
+    return ()
@@ -0,0 +1,423 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+外网连通性探测模块
+并发探测多个外网目标，任意一个成功即返回
+
+探测类型:
+    http   GET请求，只读取响应头，不下载正文
+    head   HEAD请求
+    tcp    TCP连接到指定的 主机:端口
+    dns    向指定DNS服务器发送一次UDP查询
+
+注意：很多校园网在认证前就放行DNS，tcp/dns探测可能在未登录时也成功，
+适合作为辅助手段，主要探测目标仍应使用HTTP
+
+每种探测都有阻塞的 check() 和供异步客户端使用的 check_async()，后者的 http 参数为 async_http.AsyncHttpClient；
+asyncio 只在异步方法中导入，同步客户端、界面和守护进程启动时不加载它
+"""
+
+import time
+import random
+import socket
+import struct
+import logging
+import requests
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from rtt import RttTracker, is_timeout
+
+logger = logging.getLogger('Probe')
+
+# 默认的外网探测目标：generate_204 接口响应只有几十字节，其余使用HEAD请求
+DEFAULT_TARGETS = [
+    'http://connect.rom.miui.com/generate_204',
+    'head:http://www.baidu.com',
+    'head:http://www.bing.com',
+]
+
+# 专用的连通性检测接口，只有返回204才说明连通
+NO_CONTENT_PATHS = ('generate_204', 'gen_204')
+
+# 正文不超过该字节数时读完，以便连接放回连接池复用
+DRAIN_LIMIT = 4 * 1024
+
+
+class BaseProbe:
+    """探测目标基类，check() 成功时正常返回，失败时抛出异常
+
+    check() 的 timeout 为本次使用的超时，为None时使用创建时指定的超时
+    """
+    kind = None
+
+    def __init__(self, target, timeout=3):
+        self.target = target
+        self.timeout = timeout
+
+    @property
+    def name(self):
+        return self.target if self.kind in ('http', None) else f'{self.kind}:{self.target}'
+
+    def check(self, session, timeout=None):
+        raise NotImplementedError
+
+    async def check_async(self, http, timeout=None):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.target!r}, timeout={self.timeout})'
+
+
+def default_expect(target):
+    """目标默认接受的状态码
+
+    未认证时有的强制门户不跳转，而是直接以200返回登录页，
+    generate_204 一类的接口因此只接受204；普通网站接受200和204
+    """
+    path = urlsplit(target).path.rstrip('/')
+    if path.endswith(NO_CONTENT_PATHS):
+        return (204,)
+    return (200, 204)
+
+
+class HttpProbe(BaseProbe):
+    """HTTP探测，不跟随重定向（认证页面的跳转不算连通），只接受期望的状态码
+
+    expect 为接受的状态码，为None时由 default_expect() 按目标决定
+    """
+    kind = 'http'
+
+    def __init__(self, target, timeout=3, method='GET', expect=None):
+        super().__init__(target, timeout)
+        self.method = method
+        self.expect = tuple(expect) if expect is not None else default_expect(target)
+        if method == 'HEAD':
+            self.kind = 'head'
+
+    def check(self, session, timeout=None):
+        # 流式请求只读取响应头，正文不会被下载
+        response = session.request(self.method, self.target, timeout=timeout or self.timeout,
+                                   stream=True, allow_redirects=False)
+        try:
+            if response.status_code not in self.expect:
+                raise RuntimeError(f"HTTP {response.status_code}")
+            # 没有正文或正文很短时读完，连接放回连接池复用；否则关闭连接
+            length = response.headers.get('content-length')
+            if self.method == 'HEAD' or response.status_code == 204 or (
+                    length and length.isdigit() and int(length) <= DRAIN_LIMIT):
+                response.content
+        finally:
+            response.close()
+
+    async def check_async(self, http, timeout=None):
+        # 只读取不超过 DRAIN_LIMIT 的正文，更长的正文不下载，连接直接关闭
+        response = await http.request(self.method, self.target, timeout=timeout or self.timeout, limit=DRAIN_LIMIT)
+        if response.status_code not in self.expect:
+            raise RuntimeError(f"HTTP {response.status_code}")
+
+
+class TcpProbe(BaseProbe):
+    """TCP连接探测，目标格式为 主机:端口"""
+    kind = 'tcp'
+
+    def __init__(self, target, timeout=3):
+        super().__init__(target, timeout)
+        host, _, port = target.rpartition(':')
+        self.address = (host.strip('[]'), int(port))
+
+    def check(self, session, timeout=None):
+        # 会话绑定了源地址或网卡时，探测也从同一线路发出
+        binding = getattr(session, 'binding', None)
+        if binding:
+            binding.create_connection(self.address, timeout or self.timeout).close()
+        else:
+            socket.create_connection(self.address, timeout=timeout or self.timeout).close()
+
+    async def check_async(self, http, timeout=None):
+        import asyncio
+        from async_http import open_connection
+        _, writer = await asyncio.wait_for(open_connection(*self.address, binding=http.binding),
+                                           timeout or self.timeout)
+        writer.close()
+
+
+class DnsProbe(BaseProbe):
+    """DNS查询探测，目标格式为 服务器[:端口]/域名"""
+    kind = 'dns'
+
+    def __init__(self, target, timeout=3):
+        super().__init__(target, timeout)
+        server, _, self.qname = target.partition('/')
+        self.qname = self.qname or 'www.baidu.com'
+        host, sep, port = server.rpartition(':')
+        self.server = (host, int(port)) if sep and port.isdigit() else (server, 53)
+
+    def build_query(self, query_id):
+        """构造一个A记录查询报文"""
+        header = struct.pack('!HHHHHH', query_id, 0x0100, 1, 0, 0, 0)
+        labels = b''.join(bytes([len(part)]) + part.encode('ascii') for part in self.qname.split('.') if part)
+        return header + labels + b'\x00' + struct.pack('!HH', 1, 1)
+
+    def check(self, session, timeout=None):
+        timeout = timeout or self.timeout
+        query_id = random.randint(0, 0xFFFF)
+        family, _, _, _, address = socket.getaddrinfo(*self.server, type=socket.SOCK_DGRAM)[0]
+        with socket.socket(family, socket.SOCK_DGRAM) as sock:
+            binding = getattr(session, 'binding', None)
+            if binding:
+                binding.apply(sock)
+            sock.settimeout(timeout)
+            sock.sendto(self.build_query(query_id), address)
+            deadline = time.monotonic() + timeout
+            while True:
+                sock.settimeout(max(0.001, deadline - time.monotonic()))
+                data, _ = sock.recvfrom(512)
+                # 只接受与本次查询ID匹配的应答报文
+                if len(data) >= 4 and struct.unpack('!H', data[:2])[0] == query_id and data[2] & 0x80:
+                    rcode = data[3] & 0x0F
+                    if rcode not in (0, 3):
+                        raise RuntimeError(f"DNS rcode {rcode}")
+                    return
+
+    async def check_async(self, http, timeout=None):
+        import asyncio
+        timeout = timeout or self.timeout
+        query_id = random.randint(0, 0xFFFF)
+        loop = asyncio.get_running_loop()
+        family, _, _, _, address = (await loop.getaddrinfo(*self.server, type=socket.SOCK_DGRAM))[0]
+        answer = loop.create_future()
+
+        class Protocol(asyncio.DatagramProtocol):
+            def datagram_received(self, data, addr):
+                # 只接受与本次查询ID匹配的应答报文
+                if not answer.done() and len(data) >= 4 and struct.unpack('!H', data[:2])[0] == query_id \
+                        and data[2] & 0x80:
+                    answer.set_result(data)
+
+            def error_received(self, exc):
+                if not answer.done():
+                    answer.set_exception(exc)
+
+        sock = socket.socket(family, socket.SOCK_DGRAM)
+        try:
+            sock.setblocking(False)
+            if http.binding:
+                http.binding.apply(sock)
+        except BaseException:
+            sock.close()
+            raise
+        transport, _ = await loop.create_datagram_endpoint(Protocol, sock=sock)
+        try:
+            transport.sendto(self.build_query(query_id), address)
+            data = await asyncio.wait_for(answer, timeout)
+        finally:
+            transport.close()
+        rcode = data[3] & 0x0F
+        if rcode not in (0, 3):
+            raise RuntimeError(f"DNS rcode {rcode}")
+
+
+PROBE_TYPES = {
+    'http': lambda target, timeout, expect=None: HttpProbe(target, timeout, expect=expect),
+    'head': lambda target, timeout, expect=None: HttpProbe(target, timeout, method='HEAD', expect=expect),
+    'tcp': TcpProbe,
+    'dns': DnsProbe,
+}
+
+
+def make_probe(kind, target, timeout=3, expect=None):
+    """按类型创建探测目标，expect 为 http/head 探测接受的状态码"""
+    try:
+        factory = PROBE_TYPES[kind]
+    except KeyError:
+        raise ValueError(f"未知的探测类型: {kind}")
+    if expect is None:
+        return factory(target, timeout)
+    if kind not in ('http', 'head'):
+        raise ValueError(f"{kind} 探测不支持指定状态码")
+    return factory(target, timeout, expect)
+
+
+def parse_probe(spec, timeout=3):
+    """解析字符串形式的探测目标，如 head:http://..., tcp:1.2.3.4:80, dns:223.5.5.5/www.baidu.com
+
+    不带类型前缀的 http(s) 地址按 http 类型处理
+    """
+    if isinstance(spec, BaseProbe):
+        return spec
+    kind, sep, target = spec.partition(':')
+    if sep and kind in PROBE_TYPES and not target.startswith('//'):
+        return make_probe(kind, target, timeout)
+    return make_probe('http', spec, timeout)
+
+
+def probes_from_config(config):
+    """从配置中读取探测目标列表，未配置时返回None（使用默认目标）"""
+    items = getattr(config, 'probes', None)
+    if not items:
+        return None
+    probes = []
+    for item in items:
+        try:
+            probes.append(make_probe(item.get('type', 'http'), item['target'], item.get('timeout', 3),
+                                     item.get('expect')))
+        except Exception as e:
+            logger.warning(f"忽略无效的探测目标 {item}: {str(e)}")
+    return probes or None
+
+
+class ProbeResult:
+    """一次探测的汇总结果"""
+    def __init__(self, success, target=None, rtt=None, failures=None):
+        self.success = success
+        # 首个成功响应的目标及其往返时间（秒）
+        self.target = target
+        self.rtt = rtt
+        # 失败的目标 -> 失败原因
+        self.failures = failures or {}
+
+    def __bool__(self):
+        return self.success
+
+    def to_dict(self):
+        """转换为字典，便于记录日志或输出"""
+        return {
+            'success': self.success,
+            'target': self.target,
+            'rtt': self.rtt,
+            'failures': dict(self.failures),
+        }
+
+    def __repr__(self):
+        return f"ProbeResult(success={self.success}, target={self.target!r}, rtt={self.rtt}, failures={self.failures!r})"
+
+
+class ProbeEngine:
+    """并发探测引擎：同时向所有目标发起请求，取第一个成功的结果
+
+    targets 可以是探测对象，也可以是 parse_probe() 支持的字符串
+    每个目标的超时由其历史耗时决定，目标自身的超时只用于还没有测量数据时
+    """
+    def __init__(self, targets=None, timeout=3, session=None, headers=None, rtt_tracker=None):
+        self.targets = list(targets or DEFAULT_TARGETS)
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+        self.rtt = rtt_tracker or RttTracker()
+
+    def _probe_one(self, probe, timeout):
+        """探测单个目标，成功返回往返时间，失败抛出异常"""
+        start = time.monotonic()
+        try:
+            probe.check(self.session, timeout)
+        except Exception as e:
+            if is_timeout(e):
+                self.rtt.record_timeout(probe.name, probe.timeout)
+            raise
+        rtt = time.monotonic() - start
+        self.rtt.record(probe.name, rtt, probe.timeout)
+        return rtt
+
+    async def _probe_one_async(self, probe, http, timeout):
+        """异步探测单个目标，成功返回往返时间，失败抛出异常"""
+        import asyncio
+        start = time.monotonic()
+        try:
+            await probe.check_async(http, timeout)
+        except asyncio.TimeoutError:
+            self.rtt.record_timeout(probe.name, probe.timeout)
+            raise TimeoutError(f"{probe.name} 超时")
+        except Exception as e:
+            if is_timeout(e):
+                self.rtt.record_timeout(probe.name, probe.timeout)
+            raise
+        rtt = time.monotonic() - start
+        self.rtt.record(probe.name, rtt, probe.timeout)
+        return rtt
+
+    async def run_async(self, http, timeout=None):
+        """在事件循环中执行一次并发探测，结果与 run() 相同，不使用线程
+
+        http 为 async_http.AsyncHttpClient
+        """
+        import asyncio
+        if not self.targets:
+            return ProbeResult(False, failures={})
+
+        probes = [parse_probe(target, self.timeout) for target in self.targets]
+        limits = [self.rtt.timeouts(probe.name, probe.timeout).read for probe in probes]
+        if timeout is None:
+            timeout = max(limits) + 1
+        deadline = time.monotonic() + timeout
+        failures = {}
+        pending = {asyncio.ensure_future(self._probe_one_async(probe, http, limit)): probe.name
+                   for probe, limit in zip(probes, limits)}
+        try:
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, _ = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    target = pending.pop(task)
+                    try:
+                        rtt = task.result()
+                    except Exception as e:
+                        failures[target] = str(e) or type(e).__name__
+                        continue
+                    for straggler_target in pending.values():
+                        failures[straggler_target] = '已取消'
+                    return ProbeResult(True, target=target, rtt=rtt, failures=failures)
+
+            for target in pending.values():
+                failures[target] = '超时'
+            return ProbeResult(False, failures=failures)
+        finally:
+            # 取消其余尚未完成的探测
+            for task in pending:
+                task.cancel()
+
+    def run(self, timeout=None):
+        """执行一次并发探测
+
+        timeout 为整体截止时间（秒），默认比最慢目标的超时稍长
+        """
+        if not self.targets:
+            return ProbeResult(False, failures={})
+
+        probes = [parse_probe(target, self.timeout) for target in self.targets]
+        limits = [self.rtt.timeouts(probe.name, probe.timeout).read for probe in probes]
+        if timeout is None:
+            timeout = max(limits) + 1
+        deadline = time.monotonic() + timeout
+        failures = {}
+        executor = ThreadPoolExecutor(max_workers=len(probes), thread_name_prefix='probe')
+        try:
+            pending = {executor.submit(self._probe_one, probe, limit): probe.name
+                       for probe, limit in zip(probes, limits)}
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    target = pending.pop(future)
+                    try:
+                        rtt = future.result()
+                    except Exception as e:
+                        failures[target] = str(e)
+                        continue
+                    # 取消其余尚未完成的探测
+                    for straggler_target in pending.values():
+                        failures[straggler_target] = '已取消'
+                    return ProbeResult(True, target=target, rtt=rtt, failures=failures)
+
+            for target in pending.values():
+                failures[target] = '超时'
+            return ProbeResult(False, failures=failures)
+        finally:
+            # 不等待仍在进行中的请求，它们会在各自的超时后自行结束
+            executor.shutdown(wait=False, cancel_futures=True)
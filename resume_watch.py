@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+休眠唤醒和时钟跳变检测模块
+time.monotonic() 在系统休眠期间不计时，检查线程的等待在唤醒后还要继续等完剩余时间。
+本模块定时比较单调时钟和包含休眠时间的时钟（Linux上为CLOCK_BOOTTIME，其他系统为系统时间）
+的流逝量，差值超过阈值即认为系统刚从休眠中恢复；
+另外比较系统时间和CLOCK_BOOTTIME，发现系统时间被调整（NTP校时、手动修改）
+
+局限：Windows上 time.monotonic() 在休眠期间继续计时，与系统时间的流逝量相同，
+本模块检测不到休眠，唤醒后仍要等完剩余的检查间隔。需要时可以由外部的电源事件
+（WM_POWERBROADCAST 的 PBT_APMRESUMEAUTOMATIC）直接调用 ConnectionSupervisor.notify_resume()
+"""
+
+import sys
+import time
+import logging
+import threading
+
+logger = logging.getLogger('ResumeWatch')
+
+HAS_BOOTTIME = hasattr(time, 'CLOCK_BOOTTIME')
+# 能否通过比较时钟检测到休眠，Windows上单调时钟包含休眠时间，检测不到
+DETECTS_SUSPEND = HAS_BOOTTIME or sys.platform != 'win32'
+
+
+def _suspend_clock():
+    """返回包含休眠时间的时钟读数"""
+    if HAS_BOOTTIME:
+        return time.clock_gettime(time.CLOCK_BOOTTIME)
+    return time.time()
+
+
+class ResumeDetector:
+    """在后台线程中检测休眠唤醒和系统时间跳变"""
+    def __init__(self, on_resume, on_clock_jump=None, interval=2, threshold=5):
+        # 从休眠中恢复时的回调，参数为估计的休眠时长（秒）
+        self.on_resume = on_resume
+        # 系统时间跳变时的回调，参数为跳变量（秒，负数表示向回调整）
+        self.on_clock_jump = on_clock_jump
+        # 两次比较的间隔
+        self.interval = interval
+        # 时钟差值超过多少秒才认为发生了休眠或跳变
+        self.threshold = threshold
+
+        self.resumes = 0
+        self.last_resume = None
+        self._last = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def _read(self):
+        return time.monotonic(), _suspend_clock(), time.time()
+
+    def poll(self):
+        """比较一次时钟，返回 (休眠时长, 系统时间跳变量)，未发生时对应项为0"""
+        current = self._read()
+        previous, self._last = self._last, current
+        if previous is None:
+            return 0, 0
+
+        monotonic_elapsed = current[0] - previous[0]
+        suspend_elapsed = current[1] - previous[1]
+        wall_elapsed = current[2] - previous[2]
+
+        slept = suspend_elapsed - monotonic_elapsed
+        if slept < self.threshold:
+            slept = 0
+        # 没有CLOCK_BOOTTIME时，休眠和系统时间跳变无法区分，都按休眠处理
+        jump = wall_elapsed - suspend_elapsed if HAS_BOOTTIME else 0
+        if abs(jump) < self.threshold:
+            jump = 0
+
+        if slept:
+            self.resumes += 1
+            self.last_resume = time.time()
+            logger.info(f"系统从休眠中恢复，约休眠 {slept:.0f}s")
+            self._callback(self.on_resume, slept)
+        if jump:
+            logger.info(f"系统时间跳变 {jump:+.0f}s")
+            self._callback(self.on_clock_jump, jump)
+        return slept, jump
+
+    def _callback(self, callback, value):
+        if not callback:
+            return
+        try:
+            callback(value)
+        except Exception as e:
+            logger.error(f"休眠检测回调异常: {str(e)}")
+
+    def run(self):
+        self._last = self._read()
+        while not self._stop_event.wait(self.interval):
+            self.poll()
+
+    def start(self):
+        """在后台线程中启动检测"""
+        if self._thread and self._thread.is_alive():
+            return
+        if not DETECTS_SUSPEND:
+            logger.info("当前系统无法通过时钟检测休眠唤醒，唤醒后按原定的检查间隔检查连接")
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, name='resume-watch', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1):
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout)
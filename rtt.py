@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+自适应超时模块
+按接口记录请求耗时，像TCP计算RTO一样维护平滑耗时（SRTT）和耗时偏差（RTTVAR），
+由此得到连接超时、读取超时和整个请求的截止时间：
+链路快时很快判定失败，链路慢时不再误判超时
+"""
+
+import time
+import threading
+import requests
+
+
+class Timeouts:
+    """一次请求使用的超时设置（秒）"""
+    def __init__(self, connect, read, total):
+        self.connect = connect
+        self.read = read
+        # 整个请求（连接、发送、读完响应）的截止时长
+        self.total = total
+
+    def as_requests(self):
+        """requests 的 timeout 参数（连接超时, 读取超时）"""
+        return (self.connect, self.read)
+
+    def __repr__(self):
+        return f"Timeouts(connect={self.connect:.2f}, read={self.read:.2f}, total={self.total:.2f})"
+
+
+class RttEstimator:
+    """单个接口的耗时估计（RFC 6298）"""
+    def __init__(self, initial, alpha=0.125, beta=0.25, k=4, min_rto=1.0, max_rto=30.0):
+        # 还没有测量数据时使用的超时
+        self.initial = initial
+        self.alpha = alpha
+        self.beta = beta
+        self.k = k
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.srtt = None
+        self.rttvar = None
+        self.samples = 0
+        # 连续超时后的退避倍数
+        self.backoff = 1
+
+    def update(self, sample):
+        """记录一次成功请求的耗时"""
+        if self.srtt is None:
+            self.srtt = sample
+            self.rttvar = sample / 2
+        else:
+            self.rttvar = (1 - self.beta) * self.rttvar + self.beta * abs(self.srtt - sample)
+            self.srtt = (1 - self.alpha) * self.srtt + self.alpha * sample
+        self.samples += 1
+        self.backoff = 1
+
+    def timed_out(self):
+        """请求超时：超时时间加倍，直到下一次成功"""
+        self.backoff = min(self.backoff * 2, 64)
+
+    def rto(self):
+        if self.srtt is None:
+            base = self.initial
+        else:
+            base = self.srtt + max(0.01, self.k * self.rttvar)
+        return min(self.max_rto, max(self.min_rto, base) * self.backoff)
+
+    def to_dict(self):
+        return {'srtt': self.srtt, 'rttvar': self.rttvar, 'rto': self.rto(), 'samples': self.samples}
+
+
+class RttTracker:
+    """按接口（URL或探测目标名称）分别估计耗时"""
+    def __init__(self, min_rto=1.0, max_rto=30.0):
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self._estimators = {}
+        self._lock = threading.Lock()
+
+    def _get(self, endpoint, initial):
+        estimator = self._estimators.get(endpoint)
+        if estimator is None:
+            estimator = RttEstimator(initial, min_rto=self.min_rto, max_rto=self.max_rto)
+            self._estimators[endpoint] = estimator
+        return estimator
+
+    def timeouts(self, endpoint, initial):
+        """接口的超时设置，initial 为没有测量数据时的超时"""
+        with self._lock:
+            rto = self._get(endpoint, initial).rto()
+        # 建立连接只需一个往返，读取超时按完整请求耗时计算，整个请求留出两者之和
+        return Timeouts(connect=rto, read=rto, total=2 * rto)
+
+    def record(self, endpoint, elapsed, initial=None):
+        with self._lock:
+            self._get(endpoint, initial or elapsed).update(elapsed)
+
+    def record_timeout(self, endpoint, initial=None):
+        with self._lock:
+            self._get(endpoint, initial or self.max_rto).timed_out()
+
+    def stats(self):
+        with self._lock:
+            return {endpoint: estimator.to_dict() for endpoint, estimator in self._estimators.items()}
+
+
+def is_timeout(error):
+    """异常是否属于超时（而不是连接被拒绝等其他失败）"""
+    return isinstance(error, (requests.exceptions.Timeout, TimeoutError))
+
+
+class BufferedResponse:
+    """已在截止时间内读完正文的响应，不再持有连接，字段与 async_http.AsyncResponse 相同"""
+    def __init__(self, response, content):
+        self.url = response.url
+        self.status_code = response.status_code
+        self.reason = response.reason
+        self.headers = response.headers
+        # 响应头声明的编码，没有声明时为None（text/* 响应为ISO-8859-1）
+        self.encoding = response.encoding
+        self.content = content
+        self.complete = True
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', 'replace')
+
+    def __repr__(self):
+        return f"<BufferedResponse [{self.status_code}]>"
+
+
+def request_with_deadline(session, method, url, timeouts, **kwargs):
+    """发送请求并在截止时间内读完响应正文，返回 BufferedResponse
+
+    requests 的超时只限制单次读取，服务器持续缓慢地返回数据时请求可能远超超时时间，
+    这里流式读取正文，超过 timeouts.total 后抛出 requests.exceptions.Timeout
+    （单次读取仍可能阻塞 timeouts.read 秒，实际耗时不超过 total + read）
+    """
+    deadline = time.monotonic() + timeouts.total
+    response = session.request(method, url, timeout=timeouts.as_requests(), stream=True, **kwargs)
+    try:
+        body = bytearray()
+        for chunk in response.iter_content(chunk_size=8192):
+            body += chunk
+            if time.monotonic() > deadline:
+                raise requests.exceptions.Timeout(f"请求超过截止时间 {timeouts.total:.1f}s: {url}")
+        if time.monotonic() > deadline:
+            raise requests.exceptions.Timeout(f"请求超过截止时间 {timeouts.total:.1f}s: {url}")
+    finally:
+        # 正文读完时连接放回连接池，中途出错时关闭连接
+        response.close()
+    return BufferedResponse(response, bytes(body))
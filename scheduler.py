@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+重连调度模块
+决定两次连接检查之间的等待时间，并统计断线检测和恢复耗时
+"""
+
+import math
+import time
+import random
+import logging
+import threading
+
+logger = logging.getLogger('Scheduler')
+
+
+def percentile(values, p):
+    """计算百分位数（最近秩法），values为空时返回None"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(p / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(values):
+    """汇总一组耗时样本"""
+    if not values:
+        return {'count': 0, 'mean': None, 'p50': None, 'p95': None, 'max': None}
+    return {
+        'count': len(values),
+        'mean': sum(values) / len(values),
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'max': max(values),
+    }
+
+
+class BaseScheduler:
+    """调度器基类：负责等待、唤醒以及检测/恢复耗时统计
+
+    子类只需实现 next_interval()，并按需覆盖各个 record_* 钩子
+    """
+    def __init__(self):
+        self._wake_event = threading.Event()
+        self._lock = threading.Lock()
+        self.last_ok_time = None
+        self.disconnect_time = None
+        self.detect_times = []
+        self.recover_times = []
+
+    def next_interval(self):
+        """返回下一次检查前应等待的秒数"""
+        raise NotImplementedError
+
+    def wait(self, max_wait=None):
+        """等待到下一次检查，被 wake() 唤醒时提前返回True
+
+        max_wait 为本次最多等待的秒数（例如预计的掉线时刻快到了）
+        """
+        interval = self.next_interval()
+        if max_wait is not None:
+            interval = min(interval, max_wait)
+        return self.sleep(interval)
+
+    def sleep(self, timeout=None):
+        """最多等待 timeout 秒，被 wake() 唤醒时提前返回True
+
+        与 wait() 不同，不调用 next_interval()，不消耗频繁检查次数，也不推进退避，
+        供只做被动采样、不一定执行主动检查的等待使用
+        """
+        woken = self._wake_event.wait(None if timeout is None else max(0, timeout))
+        # 只在被唤醒时清除；超时返回后才到达的 wake() 留给下一次等待，不会丢失
+        if woken:
+            self._wake_event.clear()
+        return woken
+
+    def wake(self):
+        """立即唤醒等待中的检查线程（例如退出或手动登录时）"""
+        self._wake_event.set()
+
+    def record_ok(self):
+        """记录一次正常的连接检查"""
+        with self._lock:
+            self.last_ok_time = time.monotonic()
+
+    def record_disconnect(self):
+        """记录检测到断线
+
+        真实掉线时刻无法得知，以上一次检查正常的时间为起点，得到检测耗时的上界
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.disconnect_time is None:
+                self.disconnect_time = now
+                if self.last_ok_time is not None:
+                    self.detect_times.append(now - self.last_ok_time)
+
+    def record_login(self):
+        """记录登录成功"""
+        with self._lock:
+            now = time.monotonic()
+            if self.disconnect_time is not None:
+                self.recover_times.append(now - self.disconnect_time)
+                self.disconnect_time = None
+            self.last_ok_time = now
+
+    def record_logout(self):
+        """记录用户主动注销：之后的离线不是掉线，不计入恢复耗时"""
+        with self._lock:
+            self.disconnect_time = None
+
+    def idle_interval(self):
+        """用户注销后不会自动重新登录，只需低频确认状态，返回最长的检查间隔"""
+        return self.next_interval()
+
+    def record_portal_failure(self):
+        """记录认证服务器请求失败或登录失败"""
+
+    def expect_disconnect(self):
+        """预计即将掉线，调度器可以据此加密检查"""
+
+    def backing_off(self):
+        """是否正因认证服务器持续失败而退避"""
+        return False
+
+    def stats(self):
+        """返回检测耗时和恢复耗时的统计信息（秒）"""
+        with self._lock:
+            return {
+                'time_to_detect': summarize(self.detect_times),
+                'time_to_recover': summarize(self.recover_times),
+            }
+
+
+class FixedScheduler(BaseScheduler):
+    """固定间隔调度器，与原先每30秒检查一次的行为相同"""
+    def __init__(self, interval=30):
+        super().__init__()
+        self.interval = interval
+
+    def next_interval(self):
+        return self.interval
+
+
+class AdaptiveScheduler(BaseScheduler):
+    """自适应调度器
+
+    - 断线或重新登录后的一段时间内频繁检查
+    - 连接稳定时逐步放宽检查间隔
+    - 认证服务器持续失败时按指数退避（带随机抖动）
+    """
+    def __init__(self, fast_interval=5, fast_checks=6, min_interval=10, max_interval=60,
+                 growth=1.25, failure_base=5, failure_cap=300):
+        super().__init__()
+        self.fast_interval = fast_interval
+        self.fast_checks = fast_checks
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.growth = growth
+        self.failure_base = failure_base
+        self.failure_cap = failure_cap
+
+        self._fast_remaining = fast_checks
+        self._stable_interval = min_interval
+        self._failures = 0
+
+    def next_interval(self):
+        with self._lock:
+            if self._failures:
+                # 指数退避，在 failure_base 和上限之间均匀随机取值，避免大量客户端同时重试，
+                # 又不会像完全随机抖动那样出现接近0的间隔
+                ceiling = min(self.failure_cap, self.failure_base * (2 ** (self._failures - 1)))
+                return random.uniform(self.failure_base, max(self.failure_base, ceiling))
+            if self._fast_remaining > 0:
+                self._fast_remaining -= 1
+                return self.fast_interval
+            interval = self._stable_interval
+            self._stable_interval = min(self.max_interval, self._stable_interval * self.growth)
+            return interval
+
+    def _enter_fast_mode(self):
+        self._fast_remaining = self.fast_checks
+        self._stable_interval = self.min_interval
+
+    def record_ok(self):
+        super().record_ok()
+        with self._lock:
+            self._failures = 0
+
+    def record_disconnect(self):
+        super().record_disconnect()
+        with self._lock:
+            self._enter_fast_mode()
+
+    def record_login(self):
+        super().record_login()
+        with self._lock:
+            self._failures = 0
+            self._enter_fast_mode()
+
+    def expect_disconnect(self):
+        with self._lock:
+            self._enter_fast_mode()
+
+    def idle_interval(self):
+        with self._lock:
+            # 注销后不再需要频繁检查；认证服务器退避中时保持退避间隔
+            self._fast_remaining = 0
+            if not self._failures:
+                return self.max_interval
+        return self.next_interval()
+
+    def backing_off(self):
+        with self._lock:
+            return self._failures > 0
+
+    def record_portal_failure(self):
+        with self._lock:
+            self._failures += 1
+        logger.debug(f"认证服务器连续失败 {self._failures} 次，进入退避")
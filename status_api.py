@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+本地状态接口模块
+在127.0.0.1的端口或Unix套接字上提供连接状态，其他程序读取守护对象内存中的状态，
+不必各自访问认证页面和外网来判断是否在线；也可以通过它发起登录和注销
+
+接口（返回JSON）:
+    GET  /status              当前状态：是否在线、最近一次探测耗时、最近登录时间、被踢次数等
+    GET  /status?account=名称  多账号模式下单个账号的状态
+    POST /login[?account=名称]  登录，等待并返回登录结果
+    POST /logout[?account=名称] 注销，之后不再自动重新登录
+
+示例:
+    curl http://127.0.0.1:8848/status
+    curl --unix-socket /run/drcom.sock -X POST http://localhost/login
+
+带有Origin请求头的POST请求（来自浏览器中的网页）会被拒绝，避免网页借用户的浏览器注销账号
+"""
+
+import os
+import stat
+import json
+import time
+import socket
+import logging
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+logger = logging.getLogger('StatusApi')
+
+
+class ApiError(Exception):
+    """请求无法处理，status 为HTTP状态码"""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _jsonable(result):
+    """登录和注销结果中的 PortalReply 转换为字典"""
+    result = dict(result)
+    reply = result.pop('reply', None)
+    if reply is not None:
+        result['reply'] = reply.to_dict()
+    return result
+
+
+class StatusApi:
+    """把单账号守护对象（ConnectionSupervisor）或多账号守护对象（MultiAccountSupervisor）包装成接口"""
+    def __init__(self, supervisor):
+        self.supervisor = supervisor
+        self.multi = hasattr(supervisor, 'accounts')
+
+    def _account(self, name):
+        """多账号模式下按名称找到账号；只有一个账号时可以省略名称"""
+        accounts = self.supervisor.accounts
+        if name is None:
+            if len(accounts) == 1:
+                return next(iter(accounts))
+            raise ApiError(400, '多账号模式需要指定account参数')
+        if name not in accounts:
+            raise ApiError(404, f'未知账号: {name}')
+        return name
+
+    def status(self, account=None):
+        if not self.multi:
+            status = self.supervisor.status()
+        elif account is not None:
+            name = self._account(account)
+            status = next(item for item in self.supervisor.status() if item['name'] == name)
+        else:
+            accounts = self.supervisor.status()
+            status = {
+                'accounts': accounts,
+                'online': sum(1 for item in accounts if item['online']),
+                'stats': self.supervisor.stats(),
+            }
+        status['time'] = time.time()
+        return status
+
+    def login(self, account=None):
+        if self.multi:
+            return _jsonable(self.supervisor.login(self._account(account)))
+        return _jsonable(self.supervisor.login())
+
+    def logout(self, account=None):
+        if self.multi:
+            return _jsonable(self.supervisor.logout(self._account(account)))
+        return _jsonable(self.supervisor.logout_task())
+
+
+class StatusHandler(BaseHTTPRequestHandler):
+    server_version = 'DrcomStatus/1.0'
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self, routes):
+        parts = urlsplit(self.path)
+        handler = routes.get(parts.path.rstrip('/') or '/')
+        if handler is None:
+            self._send_json(404, {'success': False, 'message': f'未知接口: {parts.path}'})
+            return
+        account = parse_qs(parts.query).get('account', [None])[0]
+        try:
+            self._send_json(200, handler(account))
+        except ApiError as e:
+            self._send_json(e.status, {'success': False, 'message': str(e)})
+        except Exception as e:
+            logger.error(f"处理请求 {self.path} 异常: {str(e)}")
+            self._send_json(500, {'success': False, 'message': str(e)})
+
+    def do_GET(self):
+        api = self.server.api
+        self._route({'/': api.status, '/status': api.status})
+
+    def do_POST(self):
+        length = self.headers.get('Content-Length')
+        if length and length.isdigit():
+            self.rfile.read(int(length))
+        if self.headers.get('Origin'):
+            self._send_json(403, {'success': False, 'message': '拒绝来自网页的请求'})
+            return
+        api = self.server.api
+        self._route({'/login': api.login, '/logout': api.logout})
+
+
+class _TcpServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+if hasattr(socketserver, 'ThreadingUnixStreamServer'):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+        def get_request(self):
+            # Unix套接字没有客户端地址，补上一个供日志使用
+            request, _ = super().get_request()
+            return request, ('local', 0)
+else:
+    _UnixServer = None
+
+
+class StatusServer:
+    """本地状态接口服务，port 和 unix_path 至少指定一个"""
+    def __init__(self, supervisor, port=None, host='127.0.0.1', unix_path=None):
+        self.api = StatusApi(supervisor)
+        self.port = port
+        self.host = host
+        self.unix_path = unix_path
+        self.servers = []
+        self.threads = []
+        # 套接字文件是否由本实例创建，只删除自己创建的，不删除另一个实例正在使用的
+        self._bound_unix = False
+
+    def _bind_unix(self):
+        if _UnixServer is None:
+            raise OSError("当前系统不支持Unix套接字")
+        # 上次异常退出时遗留的套接字文件
+        if os.path.exists(self.unix_path) and stat.S_ISSOCK(os.stat(self.unix_path).st_mode):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.unix_path)
+                raise OSError(f"Unix套接字已被占用: {self.unix_path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(self.unix_path)
+            finally:
+                probe.close()
+        server = _UnixServer(self.unix_path, StatusHandler)
+        self._bound_unix = True
+        # 只允许本用户访问
+        os.chmod(self.unix_path, 0o600)
+        return server
+
+    def start(self):
+        """开始监听，出错时抛出 OSError"""
+        if self.port:
+            self.servers.append(_TcpServer((self.host, self.port), StatusHandler))
+        if self.unix_path:
+            self.servers.append(self._bind_unix())
+        for server in self.servers:
+            server.api = self.api
+            thread = threading.Thread(target=server.serve_forever, name='status-api')
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+        if self.port:
+            logger.info(f"本地状态接口已启动: http://{self.host}:{self.servers[0].server_address[1]}/status")
+        if self.unix_path:
+            logger.info(f"本地状态接口已启动: {self.unix_path}")
+
+    @property
+    def address(self):
+        """TCP监听地址 (主机, 端口)，没有监听端口时为None"""
+        return self.servers[0].server_address[:2] if self.port and self.servers else None
+
+    def stop(self, timeout=1):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        for thread in self.threads:
+            thread.join(timeout)
+        if self._bound_unix:
+            self._bound_unix = False
+            try:
+                os.unlink(self.unix_path)
+            except OSError:
+                pass
+        self.servers = []
+        self.threads = []
+
+
+def start_status_server(supervisor, port=0, unix_path=''):
+    """按配置启动本地状态接口，都未配置或启动失败时返回None"""
+    if not port and not unix_path:
+        return None
+    server = StatusServer(supervisor, port=port or None, unix_path=unix_path or None)
+    try:
+        server.start()
+    except OSError as e:
+        logger.error(f"无法启动本地状态接口: {str(e)}")
+        server.stop()
+        return None
+    return server
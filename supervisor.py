@@ -0,0 +1,336 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+连接守护模块
+负责登录、注销以及断线检测和自动重连，不依赖任何GUI组件
+"""
+
+import os
+import time
+import logging
+import threading
+
+from scheduler import AdaptiveScheduler
+from heartbeat import DrcomHeartbeat
+from kick_learner import KickLearner
+from linkmon import PassiveLinkMonitor
+from netlink_events import NetlinkListener
+from resume_watch import ResumeDetector
+from connection_state import ConnectionStateMachine, ONLINE, LOGGING_IN
+
+# 启用被动监测时，两次读取计数器的最长间隔（秒）
+PASSIVE_INTERVAL = 5
+# 到了检查时刻但登录或注销正在进行时，推迟检查的秒数
+BUSY_RETRY = 1
+
+
+class ConnectionSupervisor:
+    def __init__(self, client, scheduler=None, on_state_change=None, kick_learner=None):
+        self.client = client
+        # 连接检查调度器，决定每次检查之间的等待时间
+        self.scheduler = scheduler or AdaptiveScheduler()
+        # 登录状态变化时的回调，参数为是否已登录
+        self.on_state_change = on_state_change
+        # 连接状态机，所有登录和注销都经由它执行，并发的登录请求合并为一次
+        self.state_machine = ConnectionStateMachine(on_transition=self._on_transition)
+        # 用户主动注销后不再自动重新登录，直到用户再次登录
+        self.user_logged_out = False
+        # 供本地状态接口读取的统计，全部保存在内存中
+        self.kicks = 0
+        self.last_login_time = None
+        self.last_check_time = None
+        # 上一次主动重新登录的时间（time.monotonic()），用于限制主动重新登录的频率
+        self.last_preemptive_time = None
+        # 可选的UDP心跳，心跳中断时立即触发一次连接检查
+        self.heartbeat = None
+        if getattr(client.config, 'heartbeat', False):
+            self.heartbeat = DrcomHeartbeat(client.config.server, on_failure=self.scheduler.wake,
+                                            binding=getattr(client, 'binding', None))
+        # 掉线规律学习，历史记录保存在配置文件旁边
+        if kick_learner is None:
+            config_file = getattr(client.config, 'config_file', None)
+            history_path = os.path.join(os.path.dirname(config_file), 'kick_history.json') if config_file else None
+            kick_learner = KickLearner(history_path)
+        self.kick_learner = kick_learner
+        # 可选的被动链路监测（仅Linux），计数器正常时不主动检查连接
+        self.link_monitor = None
+        if getattr(client.config, 'passive_monitor', False):
+            if PassiveLinkMonitor.available():
+                self.link_monitor = PassiveLinkMonitor(getattr(client.config, 'monitor_interface', '') or None)
+            else:
+                logging.warning("当前系统不支持被动链路监测，使用主动检查")
+        # 可选的链路事件监听（仅Linux），网卡恢复或获得新地址时立即检查并重新登录
+        self.link_events = None
+        if getattr(client.config, 'link_events', False) and NetlinkListener.available():
+            self.link_events = NetlinkListener(self.on_link_online,
+                                               interface=getattr(client.config, 'monitor_interface', '') or None)
+        # 休眠唤醒和系统时间跳变检测，唤醒后不必等检查线程睡完剩余的等待时间
+        self.resume_detector = ResumeDetector(self.notify_resume, on_clock_jump=self.on_clock_jump)
+
+        self.login_thread = None
+        self.check_thread = None
+        self.running = False
+
+    def _notify(self, is_logged_in):
+        """通知登录状态变化"""
+        if self.on_state_change:
+            try:
+                self.on_state_change(is_logged_in)
+            except Exception as e:
+                logging.error(f"状态回调异常: {str(e)}")
+
+    def _on_transition(self, old_state, new_state):
+        """状态机的状态变化，转换为是否已登录通知界面"""
+        if new_state != LOGGING_IN:
+            self._notify(new_state == ONLINE)
+
+    def check_now(self):
+        """丢弃缓存的认证页面状态，唤醒检查线程立即检查，掉线时马上重新登录"""
+        self.client.invalidate_status()
+        self.scheduler.expect_disconnect()
+        self.scheduler.wake()
+
+    def on_link_online(self, event):
+        """网卡恢复或获得新地址"""
+        logging.info(f"检测到链路变化 ({event.ifname or event.index})，立即检查连接")
+        self.check_now()
+
+    def notify_resume(self, slept=None):
+        """系统从休眠中恢复，也可由外部的唤醒信号（如系统电源事件）直接调用"""
+        logging.info("系统从休眠中恢复，立即检查连接")
+        self.check_now()
+
+    def on_clock_jump(self, offset):
+        """系统时间跳变后，按预计掉线时刻计算的等待时间已经不准，唤醒检查线程重新计算"""
+        self.scheduler.wake()
+
+    def status(self):
+        """当前连接状态，全部来自内存，不访问网络"""
+        probe = self.client.last_probe
+        state = self.state_machine.state
+        return {
+            'username': self.client.config.username,
+            'state': state,
+            'online': state == ONLINE,
+            'user_logged_out': self.user_logged_out,
+            'last_probe_rtt': probe.rtt if probe is not None and probe.success else None,
+            'last_probe_target': probe.target if probe is not None else None,
+            'last_check_time': self.last_check_time,
+            'last_login_time': self.last_login_time,
+            'kicks': self.kicks,
+        }
+
+    def start_login_thread(self):
+        """启动登录线程"""
+        self.user_logged_out = False
+        if self.login_thread and self.login_thread.is_alive():
+            return
+
+        self.running = True
+        self.login_thread = threading.Thread(target=self.login_task)
+        self.login_thread.daemon = True
+        self.login_thread.start()
+        self._start_monitoring()
+
+    def _start_monitoring(self):
+        """启动状态检查线程、休眠唤醒检测和链路事件监听（已启动的不会重复启动）"""
+        self.running = True
+        # 启动状态检查线程
+        if not self.check_thread or not self.check_thread.is_alive():
+            self.check_thread = threading.Thread(target=self.check_connection_task)
+            self.check_thread.daemon = True
+            self.check_thread.start()
+
+        self.resume_detector.start()
+        if self.link_events:
+            try:
+                self.link_events.start()
+            except OSError as e:
+                logging.warning(f"无法监听链路事件: {str(e)}")
+                self.link_events = None
+
+    def login_task(self):
+        """登录任务，已有登录在进行时等待其结果，返回是否登录成功"""
+        return self.state_machine.login(self._login_once)['success']
+
+    def login(self):
+        """用户发起的登录（例如本地状态接口），等待并返回登录结果，检查线程未运行时一并启动"""
+        self.user_logged_out = False
+        self._start_monitoring()
+        return self.state_machine.login(self._login_once)
+
+    def _login_once(self):
+        """实际访问认证服务器的登录，同一时间只有一个线程执行"""
+        try:
+            logging.info("正在登录...")
+            result = self.client.login()
+            if result['success']:
+                logging.info(f"登录成功: {result['message']}")
+                # "已经登录"时并没有开始新的会话，会话时长保持不变
+                if result['message'] != '已经登录':
+                    self.kick_learner.record_login()
+                    self.last_login_time = time.time()
+                self.scheduler.record_login()
+                if self.heartbeat:
+                    self.heartbeat.start()
+                # 手动或自动登录后唤醒检查线程，让它按频繁检查阶段重新计时
+                if threading.current_thread() is not self.check_thread:
+                    self.scheduler.wake()
+            else:
+                logging.error(f"登录失败: {result['message']}")
+                self.scheduler.record_portal_failure()
+            return result
+        except Exception as e:
+            logging.error(f"登录异常: {str(e)}")
+            self.scheduler.record_portal_failure()
+            return {'success': False, 'message': f'登录异常: {str(e)}'}
+
+    def logout_task(self):
+        """注销任务"""
+        # 先设置标志，避免注销过程中检查线程发现掉线后重新登录
+        was_logged_out, self.user_logged_out = self.user_logged_out, True
+        result = self.state_machine.logout(self._logout_once)
+        if result['success']:
+            # 会话已由用户结束，不再按会话时长安排主动重新登录
+            self.kick_learner.forget_session()
+            self.scheduler.record_logout()
+        else:
+            self.user_logged_out = was_logged_out
+        return result
+
+    def _logout_once(self):
+        try:
+            logging.info("正在注销...")
+            result = self.client.logout()
+            if result['success']:
+                logging.info(f"注销成功: {result['message']}")
+                # 会话已结束，心跳在下一次登录成功后重新启动
+                if self.heartbeat:
+                    self.heartbeat.stop()
+            else:
+                logging.error(f"注销失败: {result['message']}")
+            return result
+        except Exception as e:
+            logging.error(f"注销异常: {str(e)}")
+            return {'success': False, 'message': f'注销异常: {str(e)}'}
+
+    def preemptive_relogin(self):
+        """在预计的会话时长上限之前主动注销并重新登录，重置会话时长
+
+        无论结果如何都会重置掉线模型中的会话开始时间：开始了新会话时由 _login_once 记录，
+        否则（注销失败、登录失败）清除，避免检查线程对同一个已过期的时刻反复动手
+        """
+        now = time.monotonic()
+        limit = self.kick_learner.session_age_limit()
+        # 正常情况下两次主动重新登录相隔约为时长上限的80%以上，间隔过短说明会话时长并没有被重置
+        if self.last_preemptive_time is not None and limit and now - self.last_preemptive_time < limit / 2:
+            logging.warning("距离上次主动重新登录时间过短，本次跳过")
+            self.kick_learner.forget_session()
+            return
+        self.last_preemptive_time = now
+
+        logging.info("即将达到会话时长上限，主动重新登录...")
+        self.state_machine.logout(self._logout_once)
+        result = self.state_machine.login(self._login_once)
+        # "已经登录"说明注销没有成功，会话仍是原来那一个
+        if not result['success'] or result['message'] == '已经登录':
+            logging.warning(f"主动重新登录没有开始新的会话: {result['message']}")
+            self.kick_learner.forget_session()
+
+    def check_connection_task(self):
+        """检查网络连接状态任务"""
+        # 预先建立到认证服务器和探测目标的连接，第一次检查和登录不需要等待TCP握手
+        try:
+            self.client.warm_up()
+        except Exception as e:
+            logging.debug(f"预先建立连接失败: {str(e)}")
+        # 下一次主动检查的时刻（time.monotonic()），只在真正执行了主动检查之后由调度器重新计算；
+        # 被动监测的采样不调用 next_interval()，不消耗频繁检查次数，也不绕过认证服务器失败后的退避
+        next_check = time.monotonic() + self.scheduler.next_interval()
+        while self.running:
+            try:
+                # 预计掉线的时刻快到时提前醒来，退出或手动登录时会被立即唤醒
+                action = self.kick_learner.next_action()
+                # 被动监测按固定间隔采样，是否主动检查由采样结果决定
+                max_wait = PASSIVE_INTERVAL if self.link_monitor else next_check - time.monotonic()
+                if action:
+                    max_wait = min(max_wait, action[0] - time.time())
+                woken = self.scheduler.sleep(max_wait)
+                if not self.running:
+                    break
+                due = time.monotonic() >= next_check
+                # 被唤醒（手动登录、心跳中断等）或到了预防时刻时，必须主动检查
+                force_active = woken
+                if action and time.time() >= action[0]:
+                    if action[1] == 'relogin':
+                        # 等待期间用户主动注销了，不能借主动重新登录再登录回去
+                        if self.user_logged_out:
+                            self.kick_learner.forget_session()
+                        else:
+                            self.preemptive_relogin()
+                            next_check = time.monotonic() + self.scheduler.next_interval()
+                        continue
+                    # 进入容易掉线的时段，加密检查
+                    self.scheduler.expect_disconnect()
+                    force_active = True
+                if self.link_monitor:
+                    suspicious, reason = self.link_monitor.check()
+                    if not force_active:
+                        if not suspicious:
+                            logging.debug(f"被动监测正常: {reason}")
+                            continue
+                        # 认证服务器故障时计数器同样异常（只发不收），退避期间不因此提前检查和重新登录
+                        if not due and self.scheduler.backing_off():
+                            logging.debug(f"被动监测异常（{reason}），认证服务器退避中，到期后再检查")
+                            continue
+                        # 用户注销后本来就离线，计数器异常不需要提前检查
+                        if not due and self.user_logged_out:
+                            continue
+                    logging.info(f"主动检查连接: {reason if suspicious else '被唤醒或进入易掉线时段'}")
+                    self.link_monitor.mark_active_check()
+                elif not force_active and not due:
+                    continue
+                # 正在登录时检查结果没有意义，登录完成后会唤醒本线程
+                if self.state_machine.is_busy():
+                    next_check = max(next_check, time.monotonic() + BUSY_RETRY)
+                    continue
+                # 定时检查必须拿到最新的认证页面状态，不使用缓存
+                connected = self.client.is_connected(max_age=0)
+                self.last_check_time = time.time()
+                if not connected and self.user_logged_out:
+                    # 用户主动注销后的离线不是掉线：不计入被踢和检测耗时，也不进入频繁检查
+                    logging.info("用户已注销，不自动重新登录")
+                    next_check = time.monotonic() + self.scheduler.idle_interval()
+                    continue
+                if not connected:
+                    self.scheduler.record_disconnect()
+                    # 只有从在线状态掉线才算被踢，登录失败后的重试不计入掉线规律
+                    if self.state_machine.mark_kicked():
+                        self.kicks += 1
+                        self.kick_learner.record_kick()
+                    logging.warning("连接已断开，尝试重新登录...")
+                    self.login_task()
+                else:
+                    self.scheduler.record_ok()
+                    self.state_machine.mark_online()
+                    logging.info("连接正常")
+                # 主动检查（以及随后的登录）完成后，由调度器决定下一次主动检查的时刻
+                next_check = time.monotonic() + self.scheduler.next_interval()
+            except Exception as e:
+                logging.error(f"检查连接异常: {str(e)}")
+                next_check = time.monotonic() + self.scheduler.next_interval()
+
+    def stop(self, timeout=1):
+        """停止登录和检查线程"""
+        self.running = False
+        self.scheduler.wake()
+        if self.heartbeat:
+            self.heartbeat.stop(timeout)
+        if self.link_events:
+            self.link_events.stop(timeout)
+        self.resume_detector.stop(timeout)
+        if self.login_thread and self.login_thread.is_alive():
+            self.login_thread.join(timeout)
+        if self.check_thread and self.check_thread.is_alive():
+            self.check_thread.join(timeout)
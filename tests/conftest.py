@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+"""
+测试公用的夹具：模拟认证服务器和指向它的配置
+项目模块直接放在仓库根目录下，这里把根目录加入导入路径
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from fake_portal import FakePortal  # noqa: E402
+
+
+@pytest.fixture
+def portal():
+    with FakePortal(stall_time=0.1) as portal:
+        yield portal
+
+
+@pytest.fixture
+def make_config(portal):
+    """生成指向模拟认证服务器的配置，不读写配置文件，不监听链路事件
+
+    target 为另一个 FakePortal 时指向它，默认指向 portal 夹具
+    """
+    def make(target=None, **overrides):
+        target = target or portal
+        config = Config()
+        config.username = 'user'
+        config.password = 'pass'
+        config.server = target.server
+        config.config_file = None
+        config.link_events = False
+        config.probes = [{'type': 'http', 'target': target.probe_url, 'timeout': 1}]
+        for name, value in overrides.items():
+            setattr(config, name, value)
+        return config
+    return make
+
+
+def wait_until(predicate, timeout=5, interval=0.02):
+    """等待条件成立，超时返回False"""
+    import time
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(interval)
+    return predicate()
+
+
+def portal_events(portal):
+    """模拟认证服务器上发生的登录、注销和踢下线事件名称"""
+    return [event[1] for event in portal.events]
+
+
+def portal_checks(portal):
+    """模拟认证服务器收到的状态查询次数"""
+    with portal._lock:
+        return portal.counters.get('/drcom/chkstatus', 0) + portal.counters.get('/', 0)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+
+import drcomd
+from conftest import wait_until, portal_events
+from async_drcom import AsyncDrcomClient, BlockingDrcomClient, EventLoopThread
+from connection_state import ONLINE
+from fake_portal import FakePortal
+from kick_learner import KickLearner
+from multi_account import MultiAccountSupervisor
+from scheduler import FixedScheduler
+from supervisor import ConnectionSupervisor
+
+
+@pytest.fixture
+def loop_thread():
+    loop_thread = EventLoopThread()
+    yield loop_thread
+    loop_thread.stop()
+
+
+def test_login_and_logout(portal, make_config):
+    async def scenario():
+        client = AsyncDrcomClient(make_config())
+        try:
+            assert (await client.login())['success']
+            assert portal.is_online('127.0.0.1')
+            assert (await client.login())['message'] == '已经登录'
+            assert (await client.logout())['success']
+            assert not portal.is_online('127.0.0.1')
+        finally:
+            client.close()
+    asyncio.run(scenario())
+
+
+def test_fast_relogin_path(portal, make_config):
+    async def scenario():
+        client = AsyncDrcomClient(make_config())
+        try:
+            assert (await client.login())['success']
+            await client.warm_up()
+            portal.kick()
+            client.invalidate_status()
+            assert (await client.login())['success']
+            assert portal.is_online('127.0.0.1')
+        finally:
+            client.close()
+        return client.fast_login.stats()
+    assert asyncio.run(scenario()) == {'hits': 1, 'fallbacks': 0, 'rejections': 0}
+
+
+def test_chkstatus_falls_back_to_title(make_config):
+    async def scenario(client):
+        try:
+            assert (await client.login())['success']
+            assert await client.is_connected(max_age=0)
+        finally:
+            client.close()
+
+    with FakePortal(chkstatus=False) as portal:
+        client = AsyncDrcomClient(make_config(portal))
+        asyncio.run(scenario(client))
+        assert client.status_methods[client.status_url] == 'title'
+        assert portal.counters['/drcom/chkstatus'] == 1
+
+
+def test_concurrent_status_queries_share_one_request(portal, make_config):
+    async def scenario():
+        client = AsyncDrcomClient(make_config())
+        try:
+            results = await asyncio.gather(*(client.get_portal_status() for _ in range(10)))
+        finally:
+            client.close()
+        return results
+    results = asyncio.run(scenario())
+    assert all(result is results[0] for result in results)
+    assert portal.counters['/drcom/chkstatus'] == 1
+
+
+def test_blocking_wrapper(portal, make_config, loop_thread):
+    client = BlockingDrcomClient(make_config(), loop_thread)
+    assert client.login()['success']
+    assert client.is_connected(max_age=0)
+    assert client.last_probe.success
+    assert client.logout()['success']
+    client.close()
+
+
+def test_supervisor_with_blocking_client(portal, make_config, loop_thread):
+    client = BlockingDrcomClient(make_config(), loop_thread)
+    supervisor = ConnectionSupervisor(client, scheduler=FixedScheduler(0.05), kick_learner=KickLearner())
+    try:
+        supervisor.start_login_thread()
+        assert wait_until(lambda: supervisor.state_machine.state == ONLINE)
+        portal.kick()
+        assert wait_until(lambda: portal_events(portal) == ['login', 'kick', 'login'])
+        assert wait_until(lambda: supervisor.state_machine.state == ONLINE)
+        assert supervisor.status()['kicks'] == 1
+    finally:
+        supervisor.stop()
+        client.close()
+
+
+def test_multi_account_with_blocking_client(portal, make_config, loop_thread):
+    profiles = [(address, make_config(username=address, bind_address=address))
+                for address in ('127.0.0.1', '127.0.0.2')]
+    supervisor = MultiAccountSupervisor(profiles, link_events=False,
+                                        client_factory=lambda config: BlockingDrcomClient(config, loop_thread))
+    try:
+        supervisor.start()
+        assert wait_until(lambda: all(item['online'] for item in supervisor.status()))
+        assert sorted(portal.sessions) == ['127.0.0.1', '127.0.0.2']
+        assert all(item['breaker'] == 'closed' for item in supervisor.status())
+    finally:
+        supervisor.stop()
+
+
+def test_daemon_async_option():
+    assert drcomd.client_factory(drcomd.parse_args(['--async'])) is BlockingDrcomClient
+    assert drcomd.client_factory(drcomd.parse_args([])) is drcomd.DrcomClient
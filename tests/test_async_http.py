@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+import gzip
+import socket
+import asyncio
+import threading
+
+import pytest
+import requests
+
+from async_http import AsyncHttpClient
+
+
+class OneShotServer:
+    """每个连接只回答一个请求，但响应中声称保持连接；同一连接上的下一个请求不回答直接关闭，
+    模拟服务器在客户端复用空闲连接的同时将其关闭
+    """
+    def __init__(self, body=b'ok', headers=()):
+        self.body = body
+        self.headers = headers
+        self.requests = []
+        self.sock = socket.socket()
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(16)
+        self.url = f'http://127.0.0.1:{self.sock.getsockname()[1]}/'
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                connection, _ = self.sock.accept()
+            except OSError:
+                return
+            with connection:
+                method = self._read_request(connection)
+                if method is None:
+                    continue
+                self.requests.append(method)
+                head = [b'HTTP/1.1 200 OK', b'Content-Length: %d' % len(self.body), b'Connection: keep-alive']
+                head.extend(self.headers)
+                connection.sendall(b'\r\n'.join(head) + b'\r\n\r\n' + self.body)
+                method = self._read_request(connection)
+                if method is not None:
+                    self.requests.append(f'{method} (dropped)')
+
+    @staticmethod
+    def _read_request(connection):
+        """读取一个请求的请求头，返回请求方法，连接关闭或超时时返回None"""
+        connection.settimeout(1)
+        data = b''
+        try:
+            while b'\r\n\r\n' not in data:
+                chunk = connection.recv(4096)
+                if not chunk:
+                    break
+                data += chunk
+        except socket.timeout:
+            pass
+        return data.split(b' ', 1)[0].decode('ascii') if data else None
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def make_server():
+    servers = []
+
+    def make(*args, **kwargs):
+        server = OneShotServer(*args, **kwargs)
+        servers.append(server)
+        return server
+    yield make
+    for server in servers:
+        server.close()
+
+
+async def twice(server, method):
+    http = AsyncHttpClient()
+    try:
+        first = await http.request(method, server.url, data={'a': '1'} if method == 'POST' else None)
+        second = await http.request(method, server.url, data={'a': '1'} if method == 'POST' else None)
+        return first, second
+    finally:
+        http.close()
+
+
+def test_idempotent_request_is_replayed_on_stale_connection(make_server):
+    server = make_server()
+    first, second = asyncio.run(twice(server, 'GET'))
+    assert first.content == second.content == b'ok'
+    assert server.requests == ['GET', 'GET (dropped)', 'GET']
+
+
+def test_post_is_not_replayed_on_stale_connection(make_server):
+    server = make_server()
+    with pytest.raises(requests.exceptions.ConnectionError):
+        asyncio.run(twice(server, 'POST'))
+    # 失效的连接上没有收到响应，POST可能已被服务器处理，不能重发
+    assert server.requests == ['POST', 'POST (dropped)']
+
+
+def test_gzip_content_is_decoded(make_server):
+    server = make_server(gzip.compress(b'hello'), headers=[b'Content-Encoding: gzip'])
+
+    async def fetch():
+        http = AsyncHttpClient()
+        try:
+            return await http.request('GET', server.url)
+        finally:
+            http.close()
+    assert asyncio.run(fetch()).content == b'hello'
+
+
+def test_corrupt_content_raises_decoding_error(make_server):
+    server = make_server(b'not gzip at all', headers=[b'Content-Encoding: gzip'])
+
+    async def fetch():
+        http = AsyncHttpClient()
+        try:
+            return await http.request('GET', server.url)
+        finally:
+            http.close()
+    with pytest.raises(requests.exceptions.ContentDecodingError):
+        asyncio.run(fetch())
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+import pytest
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+from drcom import DrcomClient
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, base_delay=10)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow(trial=True)
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_half_open_allows_one_trial():
+    breaker = CircuitBreaker(failure_threshold=1, base_delay=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    # 试探期间只放行一个状态查询，登录等请求仍被拒绝
+    assert not breaker.allow()
+    assert breaker.allow(trial=True)
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow(trial=True)
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_failed_trial_reopens_with_longer_delay():
+    breaker = CircuitBreaker(failure_threshold=1, base_delay=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow(trial=True)
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.opens == 2
+
+
+def test_client_stops_sending_while_open(portal, make_config):
+    client = DrcomClient(make_config())
+    client.breaker.base_delay = 0.2
+    portal.drop_rate = 1.0
+    for _ in range(3):
+        assert not client.login()['success']
+    assert client.breaker.state == OPEN
+
+    # 熔断期间不访问认证服务器
+    before = dict(portal.counters)
+    assert not client.login()['success']
+    assert portal.counters == before
+
+    # 服务器恢复后，熔断时间一到，状态查询作为试探请求，成功后恢复登录
+    portal.drop_rate = 0
+    time.sleep(0.25)
+    assert client.login()['success']
+    assert client.breaker.state == CLOSED
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+from conftest import wait_until
+from connection_state import ConnectionStateMachine, OFFLINE, ONLINE, KICKED
+
+
+def test_concurrent_logins_are_coalesced():
+    machine = ConnectionStateMachine()
+    calls = []
+    started = threading.Event()
+
+    def attempt():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return {'success': True, 'message': '登录成功'}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(machine.login(attempt)))
+    leader.start()
+    started.wait(1)
+    followers = [threading.Thread(target=lambda: results.append(machine.login(attempt))) for _ in range(5)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader] + followers:
+        thread.join(2)
+
+    assert len(calls) == 1
+    assert len(results) == 6
+    assert all(result is results[0] for result in results)
+    assert machine.coalesced == 5
+    assert machine.state == ONLINE
+
+
+def test_failed_login_returns_to_offline():
+    machine = ConnectionStateMachine()
+    result = machine.login(lambda: {'success': False, 'message': '登录失败'})
+    assert not result['success']
+    assert machine.state == OFFLINE
+
+
+def test_kick_and_logout_transitions():
+    transitions = []
+    machine = ConnectionStateMachine(on_transition=lambda old, new: transitions.append((old, new)))
+    # 离线时发现掉线不算被踢
+    assert not machine.mark_kicked()
+    machine.login(lambda: {'success': True, 'message': ''})
+    assert machine.mark_kicked()
+    assert machine.state == KICKED
+    machine.logout(lambda: {'success': True, 'message': ''})
+    assert machine.state == OFFLINE
+    assert transitions[-1] == (KICKED, OFFLINE)
+
+
+def test_logout_waits_for_login_in_progress():
+    machine = ConnectionStateMachine()
+    order = []
+    started = threading.Event()
+
+    def login():
+        started.set()
+        time.sleep(0.1)
+        order.append('login')
+        return {'success': True, 'message': ''}
+
+    thread = threading.Thread(target=machine.login, args=(login,))
+    thread.start()
+    started.wait(1)
+    machine.logout(lambda: order.append('logout') or {'success': True, 'message': ''})
+    thread.join(1)
+    assert order == ['login', 'logout']
+    assert machine.state == OFFLINE
+
+
+def test_interrupted_login_releases_waiters():
+    machine = ConnectionStateMachine()
+    started = threading.Event()
+    release = threading.Event()
+
+    def attempt():
+        started.set()
+        release.wait(1)
+        raise KeyboardInterrupt
+
+    errors = []
+
+    def leader():
+        try:
+            machine.login(attempt)
+        except KeyboardInterrupt:
+            errors.append('interrupted')
+
+    results = []
+    leader_thread = threading.Thread(target=leader, daemon=True)
+    leader_thread.start()
+    started.wait(1)
+    follower = threading.Thread(target=lambda: results.append(machine.login(attempt)), daemon=True)
+    follower.start()
+    assert wait_until(lambda: machine.coalesced == 1)
+    release.set()
+    for thread in (leader_thread, follower):
+        thread.join(2)
+
+    assert errors == ['interrupted']
+    assert results == [{'success': False, 'message': '登录被中断'}]
+    assert machine.state == OFFLINE
+    # 状态机没有卡在被中断的登录上
+    retry = threading.Thread(target=lambda: results.append(machine.login(lambda: {'success': True, 'message': ''})),
+                             daemon=True)
+    retry.start()
+    retry.join(2)
+    assert results[-1]['success']
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+from conftest import portal_events
+from drcom import DrcomClient
+from fake_portal import FakePortal
+
+
+def test_login_and_logout(portal, make_config):
+    client = DrcomClient(make_config())
+    result = client.login()
+    assert result['success'], result
+    assert portal.is_online('127.0.0.1')
+    assert client.login()['message'] == '已经登录'
+
+    result = client.logout()
+    assert result['success'], result
+    assert not portal.is_online('127.0.0.1')
+    assert client.logout()['message'] == '已经注销'
+
+
+def test_login_with_wrong_password(make_config):
+    with FakePortal(accounts={'user': 'secret'}) as portal:
+        client = DrcomClient(make_config(portal))
+        result = client.login()
+        assert not result['success']
+        assert 'ldap auth error' in result['message']
+        assert not portal.is_online('127.0.0.1')
+
+
+def test_mobile_login_uses_post_form(portal, make_config):
+    client = DrcomClient(make_config(device_type='Mobile'))
+    # 不竞速时按顺序先尝试POST表单
+    client.login_engine.race = False
+    assert client.login()['success']
+    assert portal.counters.get('POST /drcom/login') == 1
+    assert '/drcom/login' not in portal.counters
+    assert client.login_engine.candidates(client)[1] == 'post_form'
+
+
+def test_fast_relogin_path(portal, make_config):
+    client = DrcomClient(make_config())
+    assert client.login()['success']
+    client.warm_up()
+    for _ in range(3):
+        portal.kick()
+        client.invalidate_status()
+        result = client.login()
+        assert result['success'], result
+        assert portal.is_online('127.0.0.1')
+    assert client.fast_login.stats() == {'hits': 3, 'fallbacks': 0, 'rejections': 0}
+
+
+def test_fast_relogin_rejection_is_final(make_config):
+    with FakePortal(accounts={'user': 'pass'}) as portal:
+        config = make_config(portal)
+        client = DrcomClient(config)
+        assert client.login()['success']
+        # 密码修改后模板重新构造；服务器明确拒绝时直接返回错误信息，不再走完整流程重复登录
+        config.password = 'wrong'
+        portal.kick()
+        client.invalidate_status()
+        result = client.login()
+        assert not result['success']
+        assert 'ldap auth error' in result['message']
+        assert portal_events(portal).count('login_failed') == 1
+        assert client.fast_login.stats() == {'hits': 0, 'fallbacks': 0, 'rejections': 1}
+
+
+def test_chkstatus_is_preferred(portal, make_config):
+    client = DrcomClient(make_config())
+    assert client.login()['success']
+    assert client.status_methods[client.status_url] == 'chkstatus'
+    assert '/' not in portal.counters
+
+
+def test_chkstatus_falls_back_to_title(make_config):
+    with FakePortal(chkstatus=False) as portal:
+        client = DrcomClient(make_config(portal))
+        assert client.login()['success']
+        assert client.is_connected(max_age=0)
+        assert client.status_methods[client.status_url] == 'title'
+        # 不支持的接口只请求一次，之后直接检查页面标题
+        assert portal.counters['/drcom/chkstatus'] == 1
+        assert portal.counters['/'] >= 2
+
+
+def test_chkstatus_failure_after_detection_is_not_saved(portal, make_config):
+    client = DrcomClient(make_config())
+    assert client.login()['success']
+    assert client.status_methods[client.status_url] == 'chkstatus'
+
+    # 已确认支持的接口偶尔无法识别时，只有这一次改为检查页面标题
+    portal.chkstatus = False
+    assert client.is_connected(max_age=0)
+    assert client.status_methods[client.status_url] == 'chkstatus'
+    assert portal.counters['/'] == 1
+
+    portal.chkstatus = True
+    checks = portal.counters['/drcom/chkstatus']
+    assert client.is_connected(max_age=0)
+    assert portal.counters['/drcom/chkstatus'] == checks + 1
+    assert portal.counters['/'] == 1
+
+
+def test_not_connected_when_upstream_is_down(portal, make_config):
+    client = DrcomClient(make_config())
+    assert client.login()['success']
+    portal.upstream_ok = False
+    assert not client.is_connected(max_age=0)
+    assert not client.last_probe.success
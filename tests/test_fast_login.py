@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+import pytest
+
+from fast_login import FastLoginSender, LoginTemplate
+
+
+class ChunkedSocket:
+    """按预先给定的分块返回数据的套接字"""
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    def settimeout(self, timeout):
+        pass
+
+    def recv(self, size):
+        return self.chunks.pop(0) if self.chunks else b''
+
+
+def response(body, headers=b''):
+    return b'HTTP/1.1 200 OK\r\nContent-Length: %d\r\n%s\r\n' % (len(body), headers) + body
+
+
+def read(chunks):
+    return FastLoginSender()._read_response(ChunkedSocket(chunks), time.monotonic() + 5)
+
+
+def split_everywhere(data):
+    """把数据在每个位置切成两块"""
+    return [[data[:i], data[i:]] for i in range(1, len(data))]
+
+
+@pytest.mark.parametrize('chunks', split_everywhere(response(b'dr1({"result":1,"msg":""})')))
+def test_success_marker_split_across_reads(chunks):
+    result, reusable, _ = read(chunks)
+    assert result is True
+    assert reusable
+
+
+@pytest.mark.parametrize('chunks', split_everywhere(response('<title>注销页</title>'.encode('gbk'))))
+def test_logout_page_marker_split_across_reads(chunks):
+    assert read(chunks)[0] is True
+
+
+def test_marker_after_long_padding():
+    body = b'dr1({' + b' ' * 5000 + b'"result":1})'
+    data = response(body)
+    middle = data.index(b'"result":1') + 4
+    assert read([data[:middle], data[middle:]])[0] is True
+
+
+def test_rejection_reads_whole_body():
+    body = b'dr1({"result":0,"msg":"ldap auth error"})'
+    data = response(body)
+    result, reusable, received = read([data[:60], data[60:70], data[70:]])
+    assert result is False
+    assert received == body
+    assert reusable
+
+
+def test_unrecognised_response_falls_back():
+    assert read([response(b'<html>something else</html>')])[0] is None
+    assert read([b'HTTP/1.1 302 Found\r\nLocation: /\r\nContent-Length: 0\r\n\r\n'])[0] is None
+    assert read([response(b'x', b'Content-Encoding: gzip\r\n')])[0] is None
+
+
+def test_send_reports_rejection(monkeypatch):
+    sender = FastLoginSender()
+    sender._template = LoginTemplate(b'GET / HTTP/1.1\r\n\r\n')
+    sender._address = ('127.0.0.1', 1)
+    body = b'dr1({"result":0,"msg":"ldap auth error"})'
+
+    class FakeSocket(ChunkedSocket):
+        def sendall(self, data):
+            pass
+
+        def close(self):
+            pass
+    monkeypatch.setattr(sender, '_open', lambda: FakeSocket([response(body)]))
+    assert sender.send() is False
+    assert sender.rejection == body
+    assert sender.stats() == {'hits': 0, 'fallbacks': 0, 'rejections': 1}
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+from conftest import wait_until
+from fake_portal import FakeKeepaliveServer
+from heartbeat import DrcomHeartbeat
+
+
+def test_heartbeat_keeps_session_alive(portal):
+    portal.heartbeat_timeout = 0.5
+    portal.login('127.0.0.1', 'user', 'pass')
+    with FakeKeepaliveServer(portal=portal) as keepalive:
+        host, port = keepalive.address
+        heartbeat = DrcomHeartbeat(host, port=port, interval=0.1, timeout=0.5)
+        heartbeat.start()
+        try:
+            time.sleep(1)
+            assert portal.is_online('127.0.0.1')
+            assert heartbeat.stats()['received'] > 0
+        finally:
+            heartbeat.stop()
+    assert keepalive.counters.get('keep_alive2_type3', 0) > 0
+
+
+def test_heartbeat_failure_triggers_callback():
+    failures = []
+    with FakeKeepaliveServer() as keepalive:
+        keepalive.responsive = False
+        host, port = keepalive.address
+        heartbeat = DrcomHeartbeat(host, port=port, interval=0.01, timeout=0.05, max_failures=2,
+                                   on_failure=lambda: failures.append(1))
+        heartbeat.start()
+        try:
+            assert wait_until(lambda: failures, timeout=2)
+        finally:
+            heartbeat.stop()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+import socket
+import sys
+
+import pytest
+
+from http_pool import SO_BINDTODEVICE, PooledAdapter, PoolStats, SourceBinding, create_session, prewarm
+
+
+def test_source_binding():
+    assert not SourceBinding()
+    assert not SourceBinding('', None)
+    binding = SourceBinding('127.0.0.1')
+    assert binding
+    assert binding.source() == ('127.0.0.1', 0)
+    assert binding.socket_options() == []
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        binding.apply(sock)
+        assert sock.getsockname()[0] == '127.0.0.1'
+    finally:
+        sock.close()
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='只有Linux支持绑定网卡')
+def test_interface_binding_options():
+    binding = SourceBinding(interface='eth0')
+    assert binding.source() is None
+    assert binding.socket_options() == [(socket.SOL_SOCKET, SO_BINDTODEVICE, b'eth0\0')]
+
+
+def test_pool_stats():
+    stats = PoolStats()
+    assert stats.to_dict()['hit_rate'] is None
+    stats.record_connect(0.2)
+    stats.record_connect(0.4)
+    for _ in range(4):
+        stats.record_request()
+    data = stats.to_dict()
+    assert (data['requests'], data['connections'], data['pool_hits']) == (4, 2, 2)
+    assert data['hit_rate'] == 0.5
+    assert data['connect_time_mean'] == pytest.approx(0.3)
+    assert (data['connect_time_last'], data['connect_time_max']) == (0.4, 0.4)
+    # 预先建立的连接多于请求数时命中数不为负
+    stats.record_connect(0.1)
+    stats.record_connect(0.1)
+    stats.record_connect(0.1)
+    assert stats.to_dict()['pool_hits'] == 0
+
+
+def test_session_reuses_connections(portal):
+    session = create_session(headers={'User-Agent': 'test'})
+    try:
+        assert isinstance(session.get_adapter(portal.url), PooledAdapter)
+        assert session.headers['User-Agent'] == 'test'
+        for _ in range(3):
+            assert session.get(f'{portal.url}/', timeout=2).status_code == 200
+        stats = session.pool_stats.to_dict()
+        assert (stats['requests'], stats['connections'], stats['pool_hits']) == (3, 1, 2)
+    finally:
+        session.close()
+
+
+def test_prewarm_opens_connection_before_first_request(portal):
+    session = create_session()
+    try:
+        assert prewarm(session, [f'{portal.url}/']) == 1
+        assert session.pool_stats.to_dict()['connections'] == 1
+        session.get(f'{portal.url}/', timeout=2)
+        stats = session.pool_stats.to_dict()
+        assert (stats['requests'], stats['connections']) == (1, 1)
+    finally:
+        session.close()
+
+
+def test_prewarm_failure_is_not_counted():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    session = create_session()
+    try:
+        assert prewarm(session, [f'http://127.0.0.1:{port}/'], timeout=1) == 0
+    finally:
+        session.close()
+
+
+def test_bound_session_connects_from_source_address(portal):
+    session = create_session(binding=SourceBinding('127.0.0.1'))
+    try:
+        assert session.binding.source_address == '127.0.0.1'
+        assert session.get(f'{portal.url}/', timeout=2).status_code == 200
+    finally:
+        session.close()
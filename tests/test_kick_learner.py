@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+from kick_learner import BUCKET_SECONDS, KickLearner
+
+
+def day_start(timestamp):
+    local = time.localtime(timestamp)
+    return timestamp - (local.tm_hour * 3600 + local.tm_min * 60 + local.tm_sec)
+
+
+BASE = day_start(1700000000)
+
+
+def test_session_age_limit_from_clustered_kicks():
+    learner = KickLearner()
+    for i, age in enumerate([3500, 3600, 3550, 3620, 3580, 9000]):
+        start = BASE + i * 3 * 3600 + 37 * 60 * i
+        learner.record_login(start)
+        learner.record_kick(start + age)
+    limit = learner.session_age_limit()
+    # 取聚集区间中较早的一端
+    assert limit == 3500
+    learner.record_login(BASE + 100000)
+    when, action = learner.next_action(now=BASE + 100000)
+    assert action == 'relogin'
+    assert when == BASE + 100000 + limit - max(30, limit * 0.05)
+
+
+def test_no_limit_without_enough_or_clustered_samples():
+    learner = KickLearner()
+    for age in [100, 200, 300]:
+        learner.record_login(BASE)
+        learner.record_kick(BASE + age)
+    assert learner.session_age_limit() is None
+    for age in [1000, 5000]:
+        learner.record_login(BASE)
+        learner.record_kick(BASE + age)
+    assert learner.session_age_limit() is None
+
+
+def test_kick_without_login_has_no_age():
+    learner = KickLearner()
+    learner.record_login(BASE)
+    learner.forget_session()
+    learner.record_kick(BASE + 60)
+    assert learner.records == [{'time': BASE + 60, 'session_age': None}]
+    assert learner.login_time is None
+
+
+def test_hot_bucket_schedules_check():
+    learner = KickLearner()
+    # 每天 08:00 左右掉线，会话时长没有规律
+    for day in range(5):
+        learner.record_login(BASE + day * 86400 + 8 * 3600 - 100 * (day + 1) ** 3)
+        learner.record_kick(BASE + day * 86400 + 8 * 3600 + day * 30)
+    bucket = 8 * 3600 // BUCKET_SECONDS
+    assert learner.hot_buckets() == [bucket]
+    assert learner.session_age_limit() is None
+    now = BASE + 6 * 86400 + 3600
+    assert learner.next_action(now=now) == (BASE + 6 * 86400 + bucket * BUCKET_SECONDS, 'check')
+    # 时段已经开始时安排到第二天
+    now = BASE + 6 * 86400 + 9 * 3600
+    assert learner.next_action(now=now) == (BASE + 7 * 86400 + bucket * BUCKET_SECONDS, 'check')
+    assert learner.summary()['hot_buckets'] == ['08:00']
+
+
+def test_no_action_without_history():
+    assert KickLearner().next_action(now=BASE) is None
+
+
+def test_history_is_persisted(tmp_path):
+    path = tmp_path / 'kicks.json'
+    learner = KickLearner(path=str(path), max_records=3)
+    for i in range(5):
+        learner.record_login(BASE + i * 1000)
+        learner.record_kick(BASE + i * 1000 + 600)
+    assert len(learner.records) == 3
+    loaded = KickLearner(path=str(path))
+    assert loaded.records == learner.records
+    path.write_text('not json')
+    assert KickLearner(path=str(path)).records == []
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+import linkmon
+from linkmon import PassiveLinkMonitor, read_net_dev, read_tcp_snmp
+
+NET_DEV = """Inter-|   Receive                                                |  Transmit
+ face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed
+    lo:    1000      10    0    0    0     0          0         0     1000      10    0    0    0     0       0          0
+  eth0: {rx_bytes} {rx} 0 0 0 0 0 0 {tx_bytes} {tx} 0 0 0 0 0 0
+ wlan0:     500       5    0    0    0     0          0         0      700       7    0    0    0     0       0          0
+"""
+
+SNMP = """Ip: Forwarding DefaultTTL
+Ip: 1 64
+Tcp: RtoAlgorithm RtoMin OutSegs RetransSegs
+Tcp: 1 200 {out} {retrans}
+"""
+
+
+class FakeProc:
+    """可修改计数的 /proc/net/dev 和 /proc/net/snmp"""
+    def __init__(self, tmp_path):
+        self.dev = tmp_path / 'dev'
+        self.snmp = tmp_path / 'snmp'
+        self.set(rx=100, tx=100, out=100, retrans=0)
+
+    def set(self, rx, tx, out, retrans):
+        self.dev.write_text(NET_DEV.format(rx_bytes=rx * 100, rx=rx, tx_bytes=tx * 100, tx=tx))
+        self.snmp.write_text(SNMP.format(out=out, retrans=retrans))
+
+
+@pytest.fixture
+def proc(tmp_path, monkeypatch):
+    proc = FakeProc(tmp_path)
+    monkeypatch.setattr(linkmon, 'read_net_dev', lambda: read_net_dev(str(proc.dev)))
+    monkeypatch.setattr(linkmon, 'read_tcp_snmp', lambda: read_tcp_snmp(str(proc.snmp)))
+    return proc
+
+
+def test_read_counters(proc):
+    devices = read_net_dev(str(proc.dev))
+    assert set(devices) == {'lo', 'eth0', 'wlan0'}
+    assert devices['eth0'] == {'rx_bytes': 10000, 'rx_packets': 100, 'tx_bytes': 10000, 'tx_packets': 100}
+    assert read_tcp_snmp(str(proc.snmp)) == {'RtoAlgorithm': 1, 'RtoMin': 200, 'OutSegs': 100, 'RetransSegs': 0}
+
+
+def test_sample_excludes_loopback(proc):
+    sample = PassiveLinkMonitor().sample()
+    assert (sample['rx_packets'], sample['tx_packets']) == (105, 107)
+    sample = PassiveLinkMonitor(interface='eth0').sample()
+    assert (sample['rx_packets'], sample['tx_packets']) == (100, 100)
+    # 指定的网卡不存在时计数为0
+    assert PassiveLinkMonitor(interface='usb0').sample()['tx_packets'] == 0
+
+
+def test_check_needs_baseline_and_recent_active_check(proc):
+    monitor = PassiveLinkMonitor(interface='eth0')
+    assert monitor.check() == (True, '距离上次主动检查时间过长')
+    monitor.mark_active_check()
+    assert monitor.check() == (False, '计数器正常')
+    monitor.max_passive_time = 0
+    assert monitor.check()[0]
+
+
+def test_check_reports_suspicious_counters(proc):
+    monitor = PassiveLinkMonitor(interface='eth0')
+    monitor.mark_active_check()
+    monitor.check()
+    # 发出很多数据包却几乎收不到回应
+    proc.set(rx=101, tx=150, out=100, retrans=0)
+    assert monitor.check() == (True, '发出 50 个数据包只收到 1 个')
+    # TCP重传比例过高
+    proc.set(rx=200, tx=200, out=150, retrans=20)
+    assert monitor.check() == (True, 'TCP重传 20/50')
+    proc.set(rx=250, tx=250, out=200, retrans=21)
+    assert monitor.check() == (False, '计数器正常')
+
+
+def test_unreadable_counters_are_suspicious(proc):
+    monitor = PassiveLinkMonitor()
+    monitor.mark_active_check()
+    proc.dev.unlink()
+    suspicious, reason = monitor.check()
+    assert suspicious
+    assert reason.startswith('读取计数器失败')
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+import pytest
+
+from conftest import wait_until, portal_events, portal_checks
+from connection_state import ONLINE, OFFLINE
+from multi_account import LoginRateLimiter, MultiAccountSupervisor, load_profiles
+from scheduler import AdaptiveScheduler
+
+
+ACCOUNTS_XML = '''<Accounts>
+    <Config name="lab1">
+        <username>user1</username>
+        <password>pass1</password>
+        <bind_address>10.0.1.2</bind_address>
+    </Config>
+    <Config>
+        <username>user2</username>
+        <password>pass2</password>
+    </Config>
+    <Config name="empty">
+        <username></username>
+    </Config>
+</Accounts>
+'''
+
+
+@pytest.fixture
+def make_supervisor(make_config):
+    supervisors = []
+
+    def make(*bind_addresses, **kwargs):
+        profiles = [(address, make_config(username=address, bind_address=address)) for address in bind_addresses]
+        supervisor = MultiAccountSupervisor(profiles, link_events=False, **kwargs)
+        for account in supervisor.accounts.values():
+            account.scheduler = AdaptiveScheduler(fast_interval=0.02, fast_checks=1000, min_interval=0.02,
+                                                  max_interval=1)
+        supervisors.append(supervisor)
+        return supervisor
+    yield make
+    for supervisor in supervisors:
+        supervisor.stop()
+
+
+def test_rate_limiter_reserves_later_slots():
+    limiter = LoginRateLimiter(rate=10, burst=2)
+    assert limiter.reserve() == 0
+    assert limiter.reserve() == 0
+    # 令牌用完后每个调用者预约各自的时刻，依次间隔 1/rate 秒
+    first, second = limiter.reserve(), limiter.reserve()
+    assert first == pytest.approx(0.1, abs=0.01)
+    assert second == pytest.approx(0.2, abs=0.01)
+    assert limiter.stats()['delayed'] == 2
+
+
+def test_rate_limiter_acquire_waits_for_token():
+    limiter = LoginRateLimiter(rate=20, burst=1)
+    limiter.acquire()
+    started = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - started == pytest.approx(0.05, abs=0.04)
+    # 空闲一段时间后令牌恢复，但不超过 burst
+    time.sleep(0.2)
+    assert limiter.stats()['tokens'] == pytest.approx(1)
+
+
+def test_load_profiles(tmp_path):
+    path = tmp_path / 'accounts.xml'
+    path.write_text(ACCOUNTS_XML, encoding='utf-8')
+    profiles = load_profiles(str(path))
+    # 名称默认为账号，没有账号的配置项被忽略
+    assert [name for name, _ in profiles] == ['lab1', 'user2']
+    assert profiles[0][1].bind_address == '10.0.1.2'
+
+    path.write_text(ACCOUNTS_XML.replace('name="lab1"', 'name="user2"'), encoding='utf-8')
+    with pytest.raises(ValueError):
+        load_profiles(str(path))
+
+
+def test_accounts_log_in_from_their_own_addresses(portal, make_supervisor):
+    supervisor = make_supervisor('127.0.0.1', '127.0.0.2', max_workers=1)
+    supervisor.start()
+    assert wait_until(lambda: all(item['online'] for item in supervisor.status()))
+    assert sorted(portal.sessions) == ['127.0.0.1', '127.0.0.2']
+
+    portal.kick('127.0.0.2')
+    assert wait_until(lambda: portal_events(portal).count('login') == 3)
+    assert wait_until(lambda: all(item['online'] for item in supervisor.status()))
+    assert [item['kicks'] for item in supervisor.status()] == [0, 1]
+
+
+def test_user_logout_stops_relogin_and_fast_checks(portal, make_supervisor):
+    supervisor = make_supervisor('127.0.0.1')
+    supervisor.start()
+    account = supervisor.accounts['127.0.0.1']
+    assert wait_until(lambda: account.state_machine.state == ONLINE)
+
+    assert supervisor.logout('127.0.0.1')['success']
+    supervisor.check_now()
+    assert wait_until(lambda: account.last_check_time is not None and account.last_check_time > time.time() - 0.1)
+    before = portal_checks(portal)
+    time.sleep(0.5)
+    # 注销后不重新登录，不计为被踢，也不进入频繁检查
+    assert portal_checks(portal) - before <= 2
+    assert portal_events(portal) == ['login', 'logout']
+    assert account.state_machine.state == OFFLINE
+    assert account.kicks == 0
+    assert account.scheduler.disconnect_time is None
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+import socket
+import struct
+
+from netlink_events import (IFA_LABEL, IFA_LOCAL, IFF_LOOPBACK, IFF_RUNNING, IFF_UP, IFLA_IFNAME, IFINFO_MSG,
+                            IFADDR_MSG, NLMSG_DONE, NLMSG_HEADER, RT_ATTR, RTM_DELADDR, RTM_DELLINK, RTM_NEWADDR,
+                            RTM_NEWLINK, NetlinkListener, parse_messages)
+
+
+def attr(attr_type, value):
+    """一个rtattr，按4字节对齐"""
+    data = RT_ATTR.pack(RT_ATTR.size + len(value), attr_type) + value
+    return data + b'\x00' * (-len(data) % 4)
+
+
+def message(msg_type, body):
+    """一条netlink消息，按4字节对齐"""
+    data = NLMSG_HEADER.pack(NLMSG_HEADER.size + len(body), msg_type, 0, 0, 0) + body
+    return data + b'\x00' * (-len(data) % 4)
+
+
+def link(msg_type, index, flags, ifname):
+    return message(msg_type, IFINFO_MSG.pack(0, 1, index, flags, 0) + attr(IFLA_IFNAME, ifname.encode() + b'\x00'))
+
+
+def addr(msg_type, index, address, label=None, family=socket.AF_INET):
+    body = IFADDR_MSG.pack(family, 24, 0, 0, index) + attr(IFA_LOCAL, socket.inet_aton(address))
+    if label:
+        body += attr(IFA_LABEL, label.encode() + b'\x00')
+    return message(msg_type, body)
+
+
+def test_link_messages():
+    data = link(RTM_NEWLINK, 2, IFF_UP | IFF_RUNNING, 'eth0') + link(RTM_NEWLINK, 3, IFF_UP, 'wlan0') \
+        + link(RTM_DELLINK, 4, IFF_UP | IFF_RUNNING, 'usb0')
+    events = parse_messages(data)
+    assert [(e.kind, e.action, e.index, e.ifname, e.up) for e in events] == [
+        ('link', 'new', 2, 'eth0', True),
+        # 没有RUNNING（网线未插）不算可用
+        ('link', 'new', 3, 'wlan0', False),
+        ('link', 'del', 4, 'usb0', False),
+    ]
+
+
+def test_loopback_and_host_addresses_are_ignored():
+    data = link(RTM_NEWLINK, 1, IFF_UP | IFF_RUNNING | IFF_LOOPBACK, 'lo') + addr(RTM_NEWADDR, 1, '127.0.0.1', 'lo')
+    assert parse_messages(data) == []
+
+
+def test_address_messages():
+    ipv6 = message(RTM_NEWADDR, IFADDR_MSG.pack(socket.AF_INET6, 64, 0, 0, 2) + attr(IFA_LOCAL, b'\x00' * 16))
+    data = addr(RTM_NEWADDR, 2, '10.0.1.2', 'eth0') + ipv6 + addr(RTM_DELADDR, 2, '10.0.1.3')
+    events = parse_messages(data)
+    assert [(e.kind, e.action, e.index, e.ifname, e.address) for e in events] == [
+        ('addr', 'new', 2, 'eth0', '10.0.1.2'),
+        ('addr', 'del', 2, None, '10.0.1.3'),
+    ]
+
+
+def test_done_and_truncated_messages():
+    done = message(NLMSG_DONE, struct.pack('=i', 0))
+    assert parse_messages(done + link(RTM_NEWLINK, 2, IFF_UP | IFF_RUNNING, 'eth0')) == []
+    # 长度字段小于头部长度或数据被截断时停止解析
+    assert parse_messages(NLMSG_HEADER.pack(4, RTM_NEWLINK, 0, 0, 0)) == []
+    assert parse_messages(link(RTM_NEWLINK, 2, IFF_UP | IFF_RUNNING, 'eth0')[:10]) == []
+
+
+def test_listener_reports_transitions_to_online():
+    online = []
+    listener = NetlinkListener(online.append, interface='eth0')
+    events = parse_messages(
+        link(RTM_NEWLINK, 2, IFF_UP | IFF_RUNNING, 'eth0')
+        + link(RTM_NEWLINK, 2, IFF_UP | IFF_RUNNING, 'eth0')
+        + link(RTM_NEWLINK, 3, IFF_UP | IFF_RUNNING, 'eth1')
+        + link(RTM_NEWLINK, 2, IFF_UP, 'eth0')
+        + link(RTM_NEWLINK, 2, IFF_UP | IFF_RUNNING, 'eth0')
+        + addr(RTM_NEWADDR, 2, '10.0.1.2'))
+    results = [listener.handle(event) for event in events]
+    # 已经可用时重复的通知、其他网卡的事件不触发；没有标签的地址事件按网卡序号找到名称
+    assert results == [True, False, False, False, True, True]
+    assert online[-1].ifname == 'eth0'
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+from portal_parser import PortalReply, declared_encodings, parse_html, parse_jsonp, parse_reply
+
+
+class HeadersOnly:
+    """只有响应头和编码的响应"""
+    def __init__(self, content_type, encoding):
+        self.headers = {'content-type': content_type}
+        self.encoding = encoding
+
+
+def test_jsonp_login_success():
+    reply = parse_reply(b'dr1003({"result":1,"msg":"","uid":"user","v46ip":"10.0.0.2","time":15,"flow":2048})')
+    assert reply.kind == 'jsonp'
+    assert reply.success
+    assert reply.result == 1
+    assert reply.uid == 'user'
+    assert reply.v4ip == '10.0.0.2'
+    assert (reply.time, reply.flow) == (15, 2048)
+
+
+def test_jsonp_failure_with_escaped_message():
+    reply = parse_reply(b'dr1003({"result":"0","msg":"\\u5bc6\\u7801\\u9519\\u8bef \\"x\\"","ret_code":"1"})')
+    assert not reply.success
+    assert reply.result == 0
+    assert reply.ret_code == 1
+    assert reply.message == '密码错误 "x"'
+
+
+def test_jsonp_gbk_message():
+    data = 'dr1({"result":0,"msga":"账号不存在","msg":"other"})'.encode('gbk')
+    reply = parse_jsonp(data)
+    # msga 优先于 msg
+    assert reply.message == '账号不存在'
+    assert parse_jsonp(data, ('gbk',)).message == '账号不存在'
+
+
+def test_jsonp_null_and_boolean_fields():
+    reply = parse_jsonp(b'({"result":null,"ok":true,"msg":"  "})')
+    assert reply.result is None
+    assert reply.fields['ok'] is True
+    assert reply.message is None
+    assert not reply.success
+
+
+def test_html_logged_in_page():
+    page = ("<html><head><title>注销页</title></head><script>time='123';flow='4567    ';"
+            "fee=0;uid='user';v4ip='10.0.0.2';</script></html>").encode('gbk')
+    reply = parse_reply(page, ('gbk',))
+    assert reply.kind == 'html'
+    assert reply.logged_in and reply.success
+    assert reply.title == '注销页'
+    assert (reply.time, reply.flow) == (123, 4567)
+    assert reply.fields['fee'] == 0
+    assert reply.uid == 'user'
+
+
+def test_html_login_page():
+    reply = parse_html('<html><title>上网登录页</title></html>'.encode('utf-8'))
+    assert not reply.logged_in
+    assert not reply.success
+    assert reply.result is None
+
+
+def test_parse_reply_accepts_str_and_unknown_content():
+    assert parse_reply('<title>注销页</title>').logged_in
+    reply = parse_reply(b'not a portal reply')
+    assert reply.kind == 'jsonp' and reply.fields == {}
+
+
+def test_to_dict():
+    data = PortalReply('jsonp', {'result': 1, 'msg': 'ok', 'v6ip': '::1'}).to_dict()
+    assert data['result'] == 1 and data['message'] == 'ok' and data['v6ip'] == '::1'
+
+
+def test_declared_encodings():
+    assert declared_encodings(HeadersOnly('text/html; charset=GBK', 'GBK')) == ('GBK',)
+    # requests 对没有声明编码的 text/* 响应给出 ISO-8859-1，不能当作声明的编码
+    assert declared_encodings(HeadersOnly('text/html', 'ISO-8859-1')) == ()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from config import Config
+from probe import (HttpProbe, TcpProbe, DnsProbe, ProbeEngine, default_expect, make_probe, parse_probe,
+                   probes_from_config)
+
+
+class CaptiveHandler(BaseHTTPRequestHandler):
+    """未认证时对所有请求都以200返回登录页的强制门户"""
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        body = '<html><title>登录</title></html>'.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_HEAD = do_GET
+
+
+@pytest.fixture
+def captive():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CaptiveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def test_default_expect():
+    assert default_expect('http://connect.rom.miui.com/generate_204') == (204,)
+    assert default_expect('http://www.google.cn/generate_204/') == (204,)
+    assert default_expect('https://www.gstatic.com/gen_204?x=1') == (204,)
+    assert default_expect('http://www.baidu.com') == (200, 204)
+
+
+def test_generate_204_rejects_captive_portal_page(captive):
+    session = requests.Session()
+    with pytest.raises(RuntimeError):
+        HttpProbe(f'{captive}/generate_204').check(session)
+    # 明确指定接受200时按配置处理
+    HttpProbe(f'{captive}/generate_204', expect=[200]).check(session)
+    HttpProbe(captive, method='HEAD').check(session)
+
+
+def test_engine_follows_portal_state(portal):
+    engine = ProbeEngine([f'{portal.url}/generate_204'], timeout=1)
+    result = engine.run()
+    assert not result
+    assert f'{portal.url}/generate_204' in result.failures
+
+    portal.login('127.0.0.1', 'user', 'pass')
+    result = engine.run()
+    assert result
+    assert result.target == f'{portal.url}/generate_204'
+    assert result.rtt is not None
+
+
+def test_parse_probe():
+    assert isinstance(parse_probe('http://example.com/generate_204'), HttpProbe)
+    head = parse_probe('head:http://example.com')
+    assert head.method == 'HEAD' and head.name == 'head:http://example.com'
+    assert parse_probe('tcp:223.5.5.5:53').address == ('223.5.5.5', 53)
+    dns = parse_probe('dns:223.5.5.5/www.baidu.com')
+    assert isinstance(dns, DnsProbe) and dns.server == ('223.5.5.5', 53) and dns.qname == 'www.baidu.com'
+    assert isinstance(parse_probe('tcp:[::1]:80'), TcpProbe)
+
+
+def test_make_probe_expect():
+    assert make_probe('head', 'http://example.com', expect=[200]).expect == (200,)
+    with pytest.raises(ValueError):
+        make_probe('tcp', '223.5.5.5:53', expect=[200])
+    with pytest.raises(ValueError):
+        make_probe('icmp', '223.5.5.5')
+
+
+def test_probes_from_config_round_trip(tmp_path):
+    config = Config()
+    config.config_file = str(tmp_path / 'config.xml')
+    config.probes = [
+        {'type': 'http', 'target': 'http://example.com/generate_204', 'timeout': 2},
+        {'type': 'head', 'target': 'http://www.baidu.com', 'timeout': 3, 'expect': [200]},
+        {'type': 'tcp', 'target': '223.5.5.5:53', 'timeout': 1},
+    ]
+    assert config.save_config()
+
+    loaded = Config()
+    loaded.config_file = config.config_file
+    assert loaded.load_config()
+    probes = probes_from_config(loaded)
+    assert [probe.name for probe in probes] == [
+        'http://example.com/generate_204', 'head:http://www.baidu.com', 'tcp:223.5.5.5:53']
+    assert probes[0].expect == (204,)
+    assert probes[1].expect == (200,)
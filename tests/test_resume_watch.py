@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+import resume_watch
+from resume_watch import ResumeDetector
+
+
+class FakeClocks:
+    """可控的 (单调时钟, 包含休眠的时钟, 系统时间)"""
+    def __init__(self):
+        self.monotonic = 100.0
+        self.suspend = 1000.0
+        self.wall = 1700000000.0
+
+    def advance(self, seconds, slept=0, jump=0):
+        self.monotonic += seconds
+        self.suspend += seconds + slept
+        self.wall += seconds + slept + jump
+
+    def read(self):
+        return self.monotonic, self.suspend, self.wall
+
+
+@pytest.fixture
+def detector(monkeypatch):
+    monkeypatch.setattr(resume_watch, 'HAS_BOOTTIME', True)
+    events = []
+    detector = ResumeDetector(lambda slept: events.append(('resume', slept)),
+                              on_clock_jump=lambda jump: events.append(('jump', jump)))
+    clocks = FakeClocks()
+    detector._read = clocks.read
+    detector.poll()
+    return detector, clocks, events
+
+
+def test_resume_is_detected(detector):
+    detector, clocks, events = detector
+    clocks.advance(2)
+    assert detector.poll() == (0, 0)
+    clocks.advance(2, slept=600)
+    assert detector.poll() == (600, 0)
+    assert events == [('resume', 600)]
+    assert detector.resumes == 1
+
+
+def test_clock_jump_is_not_a_resume(detector):
+    detector, clocks, events = detector
+    clocks.advance(2, jump=-3600)
+    assert detector.poll() == (0, -3600)
+    assert events == [('jump', -3600)]
+    assert detector.resumes == 0
+
+
+def test_small_differences_are_ignored(detector):
+    detector, clocks, events = detector
+    clocks.advance(2, slept=1, jump=1)
+    assert detector.poll() == (0, 0)
+    assert events == []
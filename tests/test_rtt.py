@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+import time
+import socket
+import threading
+
+import pytest
+import requests
+
+from http_pool import create_session
+from rtt import RttEstimator, RttTracker, Timeouts, BufferedResponse, is_timeout, request_with_deadline
+
+
+def test_estimator_follows_rfc6298():
+    estimator = RttEstimator(initial=3, min_rto=0.1, max_rto=30)
+    assert estimator.rto() == 3
+    estimator.update(0.2)
+    assert estimator.srtt == pytest.approx(0.2)
+    assert estimator.rttvar == pytest.approx(0.1)
+    assert estimator.rto() == pytest.approx(0.2 + 4 * 0.1)
+    estimator.update(0.4)
+    assert estimator.rttvar == pytest.approx(0.75 * 0.1 + 0.25 * 0.2)
+    assert estimator.srtt == pytest.approx(0.875 * 0.2 + 0.125 * 0.4)
+
+
+def test_estimator_backoff_and_bounds():
+    estimator = RttEstimator(initial=3, min_rto=1, max_rto=30)
+    estimator.update(0.01)
+    # 很快的接口也不低于 min_rto
+    assert estimator.rto() == 1
+    estimator.timed_out()
+    estimator.timed_out()
+    assert estimator.rto() == 4
+    for _ in range(10):
+        estimator.timed_out()
+    assert estimator.rto() == 30
+    # 成功一次后退避清零
+    estimator.update(0.01)
+    assert estimator.rto() == 1
+
+
+def test_tracker_timeouts():
+    tracker = RttTracker(min_rto=0.5)
+    timeouts = tracker.timeouts('GET /', 2)
+    assert (timeouts.connect, timeouts.read, timeouts.total) == (2, 2, 4)
+    assert timeouts.as_requests() == (2, 2)
+    tracker.record_timeout('GET /', 2)
+    assert tracker.timeouts('GET /', 2).read == 4
+    tracker.record('GET /', 0.1, 2)
+    assert tracker.stats()['GET /']['samples'] == 1
+    assert tracker.timeouts('GET /', 2).read == pytest.approx(0.5)
+
+
+def test_is_timeout():
+    assert is_timeout(requests.exceptions.ReadTimeout())
+    assert is_timeout(TimeoutError())
+    assert not is_timeout(requests.exceptions.ConnectionError())
+
+
+def test_request_with_deadline_buffers_response(portal):
+    session = create_session()
+    try:
+        response = request_with_deadline(session, 'GET', f'{portal.url}/', Timeouts(2, 2, 4))
+        assert isinstance(response, BufferedResponse)
+        assert response.status_code == 200
+        assert b'<title>' in response.content
+        assert response.encoding == 'utf-8'
+        # 正文读完后连接放回连接池，第二个请求不再建立连接
+        request_with_deadline(session, 'GET', f'{portal.url}/', Timeouts(2, 2, 4))
+        stats = session.pool_stats.to_dict()
+        assert stats['requests'] == 2
+        assert stats['connections'] == 1
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def slow_server():
+    """持续缓慢返回正文的服务器，每次读取都不超时，但整个请求很久才能完成"""
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(1)
+
+    def serve():
+        try:
+            connection, _ = sock.accept()
+        except OSError:
+            return
+        with connection:
+            connection.recv(4096)
+            try:
+                connection.sendall(b'HTTP/1.1 200 OK\r\nContent-Length: 65536\r\n\r\n')
+                for _ in range(16):
+                    connection.sendall(b'x' * 4096)
+                    time.sleep(0.1)
+            except OSError:
+                pass
+    threading.Thread(target=serve, daemon=True).start()
+    yield f'http://127.0.0.1:{sock.getsockname()[1]}/'
+    sock.close()
+
+
+def test_request_with_deadline_enforces_total(slow_server):
+    session = requests.Session()
+    started = time.monotonic()
+    with pytest.raises(requests.exceptions.Timeout):
+        request_with_deadline(session, 'GET', slow_server, Timeouts(1, 1, 0.3))
+    assert time.monotonic() - started < 1
+    session.close()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+import time
+import threading
+
+from scheduler import AdaptiveScheduler, FixedScheduler, percentile, summarize
+
+
+def test_fast_checks_then_stable_growth():
+    scheduler = AdaptiveScheduler(fast_interval=5, fast_checks=2, min_interval=10, max_interval=20, growth=1.5)
+    intervals = [scheduler.next_interval() for _ in range(6)]
+    assert intervals == [5, 5, 10, 15, 20, 20]
+
+
+def test_disconnect_and_login_restart_fast_mode():
+    scheduler = AdaptiveScheduler(fast_interval=5, fast_checks=1, min_interval=10)
+    assert [scheduler.next_interval() for _ in range(2)] == [5, 10]
+    scheduler.record_disconnect()
+    assert scheduler.next_interval() == 5
+    scheduler.next_interval()
+    scheduler.record_login()
+    assert scheduler.next_interval() == 5
+
+
+def test_failure_backoff_bounds():
+    scheduler = AdaptiveScheduler(failure_base=5, failure_cap=40)
+    for failures in range(1, 8):
+        scheduler.record_portal_failure()
+        ceiling = min(40, 5 * 2 ** (failures - 1))
+        for _ in range(20):
+            assert 5 <= scheduler.next_interval() <= ceiling
+    assert scheduler.backing_off()
+    scheduler.record_ok()
+    assert not scheduler.backing_off()
+
+
+def test_idle_interval():
+    scheduler = AdaptiveScheduler(fast_interval=5, fast_checks=3, max_interval=60, failure_base=5, failure_cap=8)
+    assert scheduler.idle_interval() == 60
+    # 不再消耗频繁检查次数
+    assert scheduler.next_interval() == scheduler.min_interval
+    scheduler.record_portal_failure()
+    scheduler.record_portal_failure()
+    assert 5 <= scheduler.idle_interval() <= 8
+    assert FixedScheduler(30).idle_interval() == 30
+
+
+def test_sleep_does_not_consume_schedule():
+    scheduler = AdaptiveScheduler(fast_interval=5, fast_checks=1, min_interval=10)
+    assert not scheduler.sleep(0.01)
+    assert scheduler.next_interval() == 5
+
+
+class RacingEvent(threading.Event):
+    """等待超时的同时另一个线程调用了 wake()"""
+    def wait(self, timeout=None):
+        woken = super().wait(timeout)
+        self.set()
+        return woken
+
+
+def test_wake_racing_timeout_is_not_lost():
+    scheduler = FixedScheduler(30)
+    scheduler._wake_event = RacingEvent()
+    assert not scheduler.sleep(0.01)
+    scheduler._wake_event.__class__ = threading.Event
+    started = time.monotonic()
+    assert scheduler.sleep(5)
+    assert time.monotonic() - started < 1
+    assert not scheduler.sleep(0.01)
+
+
+def test_wake_interrupts_wait():
+    scheduler = FixedScheduler(30)
+    threading.Timer(0.05, scheduler.wake).start()
+    started = time.monotonic()
+    assert scheduler.wait()
+    assert time.monotonic() - started < 5
+
+
+def test_detect_and_recover_stats():
+    scheduler = FixedScheduler()
+    scheduler.record_ok()
+    scheduler.record_disconnect()
+    # 重复发现掉线不重复计数
+    scheduler.record_disconnect()
+    scheduler.record_login()
+    stats = scheduler.stats()
+    assert stats['time_to_detect']['count'] == 1
+    assert stats['time_to_recover']['count'] == 1
+
+    scheduler.record_disconnect()
+    scheduler.record_logout()
+    scheduler.record_login()
+    assert scheduler.stats()['time_to_recover']['count'] == 1
+
+
+def test_percentile_and_summarize():
+    assert percentile([], 50) is None
+    assert percentile([3, 1, 2, 4], 50) == 2
+    assert percentile([3, 1, 2, 4], 95) == 4
+    assert summarize([])['count'] == 0
+    assert summarize([1, 3]) == {'count': 2, 'mean': 2, 'p50': 1, 'p95': 3, 'max': 3}
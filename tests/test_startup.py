@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_sync_client_does_not_import_asyncio():
+    # 同步客户端、守护进程和本地状态接口启动时不应加载asyncio（导入耗时约50ms）
+    code = "import sys, drcom, supervisor, drcomd, status_api; print('asyncio' in sys.modules)"
+    output = subprocess.check_output([sys.executable, '-c', code], cwd=ROOT, text=True)
+    assert output.strip() == 'False'
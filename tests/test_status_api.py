@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import socket
+import http.client
+
+import pytest
+
+from conftest import portal_events
+from drcom import DrcomClient
+from kick_learner import KickLearner
+from multi_account import MultiAccountSupervisor
+from scheduler import FixedScheduler
+from status_api import StatusServer, start_status_server
+from supervisor import ConnectionSupervisor
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def request(address, method, path, headers=None):
+    """向TCP接口发送请求，返回 (状态码, JSON)"""
+    connection = http.client.HTTPConnection(*address, timeout=5)
+    try:
+        connection.request(method, path, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read().decode('utf-8'))
+    finally:
+        connection.close()
+
+
+def unix_request(path, method, url):
+    """向Unix套接字接口发送请求，返回 (状态码, JSON)"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(5)
+    try:
+        sock.connect(path)
+        sock.sendall(f'{method} {url} HTTP/1.0\r\nHost: localhost\r\n\r\n'.encode('ascii'))
+        data = b''
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    finally:
+        sock.close()
+    head, body = data.split(b'\r\n\r\n', 1)
+    return int(head.split()[1]), json.loads(body.decode('utf-8'))
+
+
+@pytest.fixture
+def make_server():
+    servers = []
+
+    def make(supervisor, **kwargs):
+        server = StatusServer(supervisor, **kwargs)
+        server.start()
+        servers.append(server)
+        return server
+    yield make
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def supervisor(make_config):
+    supervisor = ConnectionSupervisor(DrcomClient(make_config()), scheduler=FixedScheduler(0.05),
+                                      kick_learner=KickLearner())
+    yield supervisor
+    supervisor.stop()
+
+
+def test_status_login_and_logout(portal, supervisor, make_server):
+    server = make_server(supervisor, port=free_port())
+
+    status, payload = request(server.address, 'GET', '/status')
+    assert status == 200
+    assert payload['username'] == 'user'
+    assert not payload['online']
+
+    status, payload = request(server.address, 'POST', '/login')
+    assert status == 200 and payload['success']
+    assert request(server.address, 'GET', '/status')[1]['online']
+
+    status, payload = request(server.address, 'POST', '/logout')
+    assert status == 200 and payload['success']
+    assert request(server.address, 'GET', '/status')[1]['user_logged_out']
+    assert portal_events(portal) == ['login', 'logout']
+
+    assert request(server.address, 'GET', '/unknown')[0] == 404
+
+
+def test_post_with_origin_is_rejected(portal, supervisor, make_server):
+    server = make_server(supervisor, port=free_port())
+    status, payload = request(server.address, 'POST', '/login', headers={'Origin': 'http://example.com'})
+    assert status == 403
+    assert not payload['success']
+    assert portal_events(portal) == []
+    # 只读的状态查询不受影响
+    assert request(server.address, 'GET', '/status', headers={'Origin': 'http://example.com'})[0] == 200
+
+
+def test_multi_account_routes(portal, make_config, make_server):
+    profiles = [('lab1', make_config(username='lab1')), ('lab2', make_config(username='lab2'))]
+    supervisor = MultiAccountSupervisor(profiles, link_events=False)
+    try:
+        server = make_server(supervisor, port=free_port())
+        status, payload = request(server.address, 'GET', '/status')
+        assert status == 200
+        assert [item['name'] for item in payload['accounts']] == ['lab1', 'lab2']
+        assert request(server.address, 'GET', '/status?account=lab2')[1]['username'] == 'lab2'
+        assert request(server.address, 'GET', '/status?account=lab3')[0] == 404
+        # 多个账号时必须指定账号
+        assert request(server.address, 'POST', '/login')[0] == 400
+    finally:
+        supervisor.stop()
+
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='需要Unix套接字')
+def test_occupied_unix_socket_is_left_alone(portal, supervisor, make_server, tmp_path):
+    path = str(tmp_path / 'drcom.sock')
+    make_server(supervisor, unix_path=path)
+    assert unix_request(path, 'GET', '/status')[0] == 200
+
+    # 第二个实例启动失败，停止时不能删除第一个实例正在使用的套接字
+    assert start_status_server(supervisor, unix_path=path) is None
+    assert unix_request(path, 'GET', '/status')[0] == 200
+
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='需要Unix套接字')
+def test_stale_unix_socket_is_replaced(supervisor, make_server, tmp_path):
+    path = str(tmp_path / 'drcom.sock')
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+
+    server = make_server(supervisor, unix_path=path)
+    assert unix_request(path, 'GET', '/status')[0] == 200
+    server.stop()
+    assert not os.path.exists(path)
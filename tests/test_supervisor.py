@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+import pytest
+
+from conftest import wait_until, portal_events, portal_checks
+from connection_state import ONLINE, OFFLINE
+from drcom import DrcomClient
+from fake_portal import FakeKeepaliveServer
+from heartbeat import DrcomHeartbeat
+from kick_learner import KickLearner
+import supervisor as supervisor_module
+from scheduler import AdaptiveScheduler, FixedScheduler
+from supervisor import ConnectionSupervisor
+
+
+class StubLinkMonitor:
+    """固定返回采样结果的被动监测"""
+    def __init__(self, suspicious):
+        self.suspicious = suspicious
+        self.samples = 0
+
+    def check(self):
+        self.samples += 1
+        return self.suspicious, '发出 100 个数据包只收到 0 个' if self.suspicious else '计数器正常'
+
+    def mark_active_check(self):
+        pass
+
+
+def count_calls(obj, name):
+    """统计对象上某个方法的调用次数"""
+    calls = []
+    original = getattr(obj, name)
+
+    def wrapper(*args, **kwargs):
+        calls.append(1)
+        return original(*args, **kwargs)
+    setattr(obj, name, wrapper)
+    return calls
+
+
+def learned_limit(seconds):
+    """已经学到会话时长上限为 seconds 秒的掉线模型"""
+    learner = KickLearner()
+    learner.records = [{'time': i * 3600.0, 'session_age': seconds} for i in range(learner.min_samples)]
+    return learner
+
+
+@pytest.fixture
+def make_supervisor(make_config):
+    supervisors = []
+
+    def make(learner=None, scheduler=None, **overrides):
+        client = DrcomClient(make_config(**overrides))
+        supervisor = ConnectionSupervisor(client, scheduler=scheduler or FixedScheduler(0.05),
+                                          kick_learner=learner or KickLearner())
+        supervisors.append(supervisor)
+        return supervisor
+    yield make
+    for supervisor in supervisors:
+        supervisor.stop()
+
+
+def test_relogin_after_kick(portal, make_supervisor):
+    supervisor = make_supervisor()
+    supervisor.start_login_thread()
+    assert wait_until(lambda: supervisor.state_machine.state == ONLINE)
+
+    portal.kick()
+    assert wait_until(lambda: portal_events(portal) == ['login', 'kick', 'login'])
+    assert wait_until(lambda: supervisor.state_machine.state == ONLINE)
+    assert supervisor.status()['kicks'] == 1
+
+
+def test_user_logout_suppresses_relogin(portal, make_supervisor):
+    supervisor = make_supervisor()
+    supervisor.start_login_thread()
+    assert wait_until(lambda: supervisor.state_machine.state == ONLINE)
+
+    assert supervisor.logout_task()['success']
+    # 检查线程发现已离线，但用户主动注销后不再自动登录
+    supervisor.check_now()
+    assert not wait_until(lambda: portal_events(portal).count('login') > 1, timeout=0.5)
+    assert supervisor.state_machine.state == OFFLINE
+
+    # 用户再次登录后恢复自动重连
+    assert supervisor.login()['success']
+    portal.kick()
+    assert wait_until(lambda: portal_events(portal).count('login') == 3)
+
+
+def test_user_logout_slows_down_checks(portal, make_supervisor):
+    scheduler = AdaptiveScheduler(fast_interval=0.02, fast_checks=1000, min_interval=0.02, max_interval=1)
+    supervisor = make_supervisor(scheduler=scheduler)
+    supervisor.start_login_thread()
+    assert wait_until(lambda: supervisor.state_machine.state == ONLINE)
+    assert wait_until(lambda: portal_checks(portal) >= 3)
+
+    assert supervisor.logout_task()['success']
+    supervisor.check_now()
+    assert wait_until(lambda: supervisor.status()['last_check_time'] is not None
+                      and supervisor.status()['last_check_time'] > time.time() - 0.1)
+    # 注销后的离线不是掉线：不进入频繁检查，也不计入被踢和恢复耗时
+    before = portal_checks(portal)
+    time.sleep(0.5)
+    assert portal_checks(portal) - before <= 2
+    assert supervisor.status()['kicks'] == 0
+    assert scheduler.disconnect_time is None
+
+
+def test_preemptive_relogin_before_learned_limit(portal, make_supervisor):
+    supervisor = make_supervisor(learner=learned_limit(1.0))
+    supervisor.start_login_thread()
+    # 在预计的掉线时刻之前主动注销并重新登录，重置会话时长
+    assert wait_until(lambda: portal_events(portal)[:3] == ['login', 'logout', 'login'], timeout=3)
+    assert wait_until(lambda: supervisor.state_machine.state == ONLINE)
+
+
+def test_user_logout_cancels_preemptive_relogin(portal, make_supervisor):
+    supervisor = make_supervisor(learner=learned_limit(1.0))
+    supervisor.start_login_thread()
+    assert wait_until(lambda: supervisor.state_machine.state == ONLINE)
+
+    assert supervisor.logout_task()['success']
+    assert supervisor.kick_learner.login_time is None
+    # 超过学到的时长上限后仍保持注销状态
+    assert not wait_until(lambda: portal_events(portal).count('login') > 1, timeout=1.5)
+    assert portal_events(portal) == ['login', 'logout']
+    assert supervisor.state_machine.state == OFFLINE
+
+
+def test_failed_preemptive_logout_does_not_spin(portal, make_supervisor):
+    supervisor = make_supervisor(learner=learned_limit(1.0))
+    attempts = []
+
+    def failing_logout():
+        attempts.append(1)
+        return {'success': False, 'message': '注销失败: 未知错误'}
+    supervisor.client.logout = failing_logout
+    supervisor.start_login_thread()
+    assert wait_until(lambda: attempts, timeout=3)
+
+    # 注销失败后会话开始时间被清除，不会对同一个已过期的时刻反复主动重新登录
+    assert wait_until(lambda: supervisor.kick_learner.login_time is None)
+    time.sleep(1)
+    assert len(attempts) == 1
+    assert supervisor.state_machine.state == ONLINE
+
+
+def test_preemptive_relogin_is_rate_limited(portal, make_supervisor):
+    supervisor = make_supervisor(learner=learned_limit(1.0))
+    supervisor.last_preemptive_time = time.monotonic()
+    supervisor.kick_learner.record_login(time.time() - 10)
+    supervisor.preemptive_relogin()
+    assert 'logout' not in portal_events(portal)
+    assert supervisor.kick_learner.login_time is None
+
+
+def test_passive_samples_do_not_consume_schedule(portal, make_supervisor, monkeypatch):
+    monkeypatch.setattr(supervisor_module, 'PASSIVE_INTERVAL', 0.02)
+    supervisor = make_supervisor(scheduler=AdaptiveScheduler(fast_interval=0.05))
+    supervisor.link_monitor = StubLinkMonitor(suspicious=False)
+    intervals = count_calls(supervisor.scheduler, 'next_interval')
+    supervisor.start_login_thread()
+    # 登录成功会唤醒检查线程做一次主动检查，等它结束后再开始计数
+    assert wait_until(lambda: supervisor.last_check_time is not None)
+    time.sleep(0.1)
+
+    # 计数器正常的采样不执行主动检查，也不消耗频繁检查次数
+    calls_before = len(intervals)
+    samples_before = supervisor.link_monitor.samples
+    time.sleep(0.5)
+    assert supervisor.link_monitor.samples - samples_before >= 10
+    assert len(intervals) == calls_before
+
+
+def test_suspicious_samples_respect_failure_backoff(portal, make_supervisor, monkeypatch):
+    monkeypatch.setattr(supervisor_module, 'PASSIVE_INTERVAL', 0.02)
+    scheduler = AdaptiveScheduler(failure_base=1, failure_cap=1)
+    supervisor = make_supervisor(scheduler=scheduler)
+    # 认证服务器故障时计数器只发不收，每次采样都可疑
+    supervisor.link_monitor = StubLinkMonitor(suspicious=True)
+    portal.drop_rate = 1.0
+    checks = count_calls(supervisor.client, 'is_connected')
+    supervisor.start_login_thread()
+    assert wait_until(lambda: scheduler.backing_off(), timeout=3)
+
+    # 退避期间（每次1秒）不因可疑的采样提前检查和重新登录
+    checks_before = len(checks)
+    time.sleep(1.5)
+    assert len(checks) - checks_before <= 3
+
+
+def test_heartbeat_stops_on_logout_and_restarts_on_login(portal, make_supervisor):
+    with FakeKeepaliveServer(portal=portal) as keepalive:
+        supervisor = make_supervisor()
+        host, port = keepalive.address
+        supervisor.heartbeat = DrcomHeartbeat(host, port=port, interval=0.05, timeout=0.2,
+                                              on_failure=supervisor.scheduler.wake)
+        supervisor.start_login_thread()
+        assert wait_until(lambda: keepalive.counters.get('keep_alive2_type3', 0) > 0)
+
+        assert supervisor.logout_task()['success']
+        assert not supervisor.heartbeat.is_running()
+        sent = supervisor.heartbeat.sent
+        time.sleep(0.3)
+        assert supervisor.heartbeat.sent == sent
+
+        assert supervisor.login()['success']
+        assert supervisor.heartbeat.is_running()
+        assert wait_until(lambda: supervisor.heartbeat.sent > sent)